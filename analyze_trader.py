@@ -5,10 +5,12 @@ Analyzes trader behavior, performance, and provides copy trading recommendations
 """
 import sys
 import sqlite3
+import functools
 from datetime import datetime, timedelta
 from pathlib import Path
 from collections import defaultdict
-from typing import Dict, List, Optional
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
 
 # Add src directory to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
@@ -18,69 +20,350 @@ from metadata_manager import MetadataManager
 from gamma_client import GammaClient
 
 
+@dataclass(slots=True)
+class TraderOverview:
+    """Trade counts and activity window of one address"""
+    address: str
+    total_trades: int
+    buys: Optional[int]
+    sells: Optional[int]
+    unique_markets: int
+    first_trade: Optional[datetime]
+    last_trade: Optional[datetime]
+    trading_period_days: float
+    avg_trades_per_day: float
+
+
+@dataclass(slots=True)
+class PositionPerformance:
+    """Position outcome counts and value totals of one address"""
+    total_positions: int
+    active: int
+    closed: int
+    settled_win: int
+    settled_loss: int
+    win_rate: float
+    total_realized_pnl: float
+    total_invested: float
+    total_returned: float
+    roi_percent: float
+
+
+@dataclass(slots=True)
+class TradingPatterns:
+    """Atomicity, trading frequency and trader type of one address"""
+    total_markets_traded: int
+    atomic_markets: int
+    atomicity_ratio: float
+    avg_time_between_trades_seconds: float
+    frequency_class: str
+    trader_type: str
+
+
+@dataclass(slots=True)
+class CopyTradingScore:
+    """Copy trading feasibility score and the factors behind it"""
+    score: int
+    recommendation: str
+    confidence: str
+    factors: List[str]
+    trader_type: str
+    reason: Optional[str] = None
+
+
+@dataclass(slots=True)
+class MarketActivity:
+    """Trade activity of one address in one market"""
+    token_id: str
+    question: str
+    outcome: str
+    trade_count: int
+    buys: int
+    sells: int
+    avg_price: float
+
+
+def _memoized(method: Callable) -> Callable:
+    """
+    Cache a TraderAnalyzer method's result per arguments until the database changes
+
+    Args:
+        method: Method whose result depends only on its arguments and the database
+
+    Returns:
+        Wrapped method; cached results are shared, so callers must not mutate them
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        return self._cached(key, lambda: method(self, *args, **kwargs))
+    return wrapper
+
+
 class TraderAnalyzer:
     """Comprehensive trader analysis"""
 
-    def __init__(self, db_path: str):
+    # Query texts live on the class so every call hands sqlite3 the same
+    # string and its statement cache reuses the compiled program
+    _SQL_TRADE_STATS = """
+        WITH per_market AS (
+            -- Kept per (address, token) by the trades trigger; '' holds trades
+            -- without a token, which do not count as a market
+            SELECT
+                NULLIF(token_id, '') as token_id,
+                trade_count,
+                buys,
+                sells,
+                first_trade,
+                last_trade
+            FROM trader_market_summary
+            WHERE address = ?
+        ),
+        totals AS (
+            SELECT
+                COALESCE(SUM(trade_count), 0) as total_trades,
+                SUM(buys) as buys,
+                SUM(sells) as sells,
+                COUNT(token_id) as unique_markets,
+                MIN(first_trade) as first_trade,
+                MAX(last_trade) as last_trade,
+                COUNT(*) as total_markets,
+                SUM(CASE WHEN buys = 0 OR sells = 0 THEN 1 ELSE 0 END) as atomic_markets
+            FROM per_market
+        ),
+        timing AS (
+            -- Gaps between time-sorted trades telescope, so their mean is
+            -- (last - first) / (count - 1)
+            SELECT
+                *,
+                CASE
+                    WHEN total_trades > 1 THEN (last_trade - first_trade) * 1.0 / (total_trades - 1)
+                    ELSE 0
+                END as avg_time_between
+            FROM totals
+        )
+        SELECT
+            *,
+            CASE
+                WHEN avg_time_between < 3600 THEN 'high_frequency'
+                WHEN avg_time_between < 86400 THEN 'active'
+                WHEN avg_time_between < 604800 THEN 'moderate'
+                ELSE 'low_frequency'
+            END as frequency_class
+        FROM timing
+    """
+
+    _SQL_POSITION_PERFORMANCE = """
+        SELECT
+            COUNT(*) as total_positions,
+            SUM(CASE WHEN status = 'active' THEN 1 ELSE 0 END) as active,
+            SUM(CASE WHEN status = 'settled_win' THEN 1 ELSE 0 END) as settled_win,
+            SUM(CASE WHEN status = 'settled_loss' THEN 1 ELSE 0 END) as settled_loss,
+            SUM(CASE WHEN status = 'closed' THEN 1 ELSE 0 END) as closed,
+            SUM(realized_pnl) as total_realized_pnl,
+            SUM(total_buy_value) as total_invested,
+            SUM(total_sell_value) as total_returned
+        FROM positions
+        WHERE address = ?
+    """
+
+    _SQL_TOP_MARKETS = """
+        SELECT
+            token_id,
+            trade_count,
+            buys,
+            sells,
+            price_sum / NULLIF(price_count, 0) as avg_price
+        FROM trader_market_summary
+        WHERE address = ?
+        ORDER BY trade_count DESC
+        LIMIT ?
+    """
+
+    # Smallest table (per sqlite_stat1) whose full scan --debug reports as a regression
+    _PLAN_CHECK_MIN_ROWS = 1000
+
+    def __init__(self, db_path: str, debug: bool = False):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        # One long-lived read connection; the analyzer never writes, so it
+        # runs in autocommit mode and each query sees the latest WAL snapshot
+        self.conn = sqlite3.connect(
+            db_path,
+            isolation_level=None,
+            cached_statements=256,
+            check_same_thread=False
+        )
         self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA mmap_size=268435456")
+        self.conn.execute("PRAGMA cache_size=-65536")
         self.db_manager = DatabaseManager(db_path, 'data/trades.csv', auto_export=False)
         self.gamma_client = GammaClient(timeout=30)
         self.metadata_manager = MetadataManager(db_path, self.gamma_client)
 
-    def __del__(self):
-        if hasattr(self, 'conn'):
-            self.conn.close()
+        # After DatabaseManager has created the indexes, so they get statistics too
+        self._ensure_statistics()
+        # Nothing below writes through this connection; metadata is saved
+        # by MetadataManager on its own connection
+        self.conn.execute("PRAGMA query_only=ON")
+        if debug:
+            self._check_query_plans()
 
-    def get_trader_overview(self, address: str) -> Dict:
-        """Get comprehensive trader overview"""
-        cursor = self.conn.cursor()
+        # (method, args, kwargs) -> result of the @_memoized methods, valid
+        # while PRAGMA data_version is unchanged
+        self._cache: Dict[tuple, Any] = {}
+        self._cache_version: Optional[int] = None
 
-        cursor.execute("""
-            SELECT
-                COUNT(*) as total_trades,
-                SUM(CASE WHEN side = 'buy' THEN 1 ELSE 0 END) as buys,
-                SUM(CASE WHEN side = 'sell' THEN 1 ELSE 0 END) as sells,
-                COUNT(DISTINCT token_id) as unique_markets,
-                MIN(timestamp) as first_trade,
-                MAX(timestamp) as last_trade
-            FROM trades
-            WHERE from_address = ?
-        """, (address,))
+    def close(self):
+        """Close the database connections and the HTTP client"""
+        self.conn.close()
+        self.metadata_manager.close()
+        self.gamma_client.close()
 
-        row = cursor.fetchone()
+    def __enter__(self):
+        return self
 
-        trading_period_days = (row['last_trade'] - row['first_trade']) / 86400 if row['first_trade'] else 0
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _ensure_statistics(self):
+        """
+        Run ANALYZE once if the planner has no statistics for the trade tables
+
+        Without sqlite_stat1 SQLite guesses index selectivity, and on skewed
+        data (most trades from a few addresses) it can pick a poor index or
+        build an automatic one instead of using the per-trader indexes.
+        """
+        has_stats = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+        ).fetchone()
+        if has_stats:
+            has_stats = self.conn.execute(
+                "SELECT COUNT(DISTINCT tbl) = 2 FROM sqlite_stat1"
+                " WHERE tbl IN ('trades', 'trader_market_summary')"
+            ).fetchone()[0]
+
+        if not has_stats:
+            self.conn.execute("ANALYZE")
+
+    def _check_query_plans(self):
+        """
+        Verify the per-trader queries are served by an index
 
-        return {
-            'address': address,
-            'total_trades': row['total_trades'],
-            'buys': row['buys'],
-            'sells': row['sells'],
-            'unique_markets': row['unique_markets'],
-            'first_trade': datetime.fromtimestamp(row['first_trade']) if row['first_trade'] else None,
-            'last_trade': datetime.fromtimestamp(row['last_trade']) if row['last_trade'] else None,
-            'trading_period_days': trading_period_days,
-            'avg_trades_per_day': row['total_trades'] / trading_period_days if trading_period_days > 0 else 0
+        A full scan is only flagged once sqlite_stat1 reports the table at
+        _PLAN_CHECK_MIN_ROWS rows or more; below that a scan can be the
+        planner's right choice.
+
+        Raises:
+            RuntimeError: If a query plan scans a large table in full or falls
+                back to an automatic index
+        """
+        queries = {
+            '_SQL_TRADE_STATS': (self._SQL_TRADE_STATS, ('',)),
+            '_SQL_POSITION_PERFORMANCE': (self._SQL_POSITION_PERFORMANCE, ('',)),
+            '_SQL_TOP_MARKETS': (self._SQL_TOP_MARKETS, ('', 5)),
         }
+        # Leading integer of each stat is the row count of that table/index
+        table_rows = dict(self.conn.execute(
+            "SELECT tbl, MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 GROUP BY tbl"
+        ).fetchall())
+
+        for name, (sql, params) in queries.items():
+            plan = [row['detail'] for row in self.conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+            for detail in plan:
+                scanned = detail[5:] if detail.startswith('SCAN ') else None
+                if 'AUTOMATIC' in detail or table_rows.get(scanned, 0) >= self._PLAN_CHECK_MIN_ROWS:
+                    raise RuntimeError(f"Query plan regression in {name}: {'; '.join(plan)}")
+
+    def _cached(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        """
+        Return a cached analysis result, computing it on a miss
+
+        The cache is dropped whenever PRAGMA data_version on the analyzer's
+        connection changes, i.e. after the monitor or any other connection
+        commits new trades, position updates or market metadata.
+
+        Args:
+            key: (method name, positional args, keyword args)
+            compute: Produces the result on a miss
+
+        Returns:
+            Cached or freshly computed result
+        """
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._cache_version:
+            self._cache_version = version
+            self._cache = {}
+
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @_memoized
+    def _get_trade_stats(self, address: str) -> sqlite3.Row:
+        """
+        Aggregate an address's trades in one pass for the overview and atomicity
+
+        Per-market counts come from trader_market_summary, which the trades
+        trigger keeps current, so the overview totals and the single-sided
+        (atomic) market count cost one row per market, not one per trade.
 
-    def get_position_performance(self, address: str) -> Dict:
-        """Analyze position performance"""
-        positions = self.db_manager.get_all_positions(address)
+        Args:
+            address: Trader address
 
-        if not positions:
-            return {'error': 'No positions found'}
+        Returns:
+            Row with total_trades, buys, sells, unique_markets, first_trade,
+            last_trade, total_markets, atomic_markets, avg_time_between and
+            frequency_class
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(self._SQL_TRADE_STATS, (address,))
+        return cursor.fetchone()
+
+    @_memoized
+    def get_trader_overview(self, address: str) -> TraderOverview:
+        """Get comprehensive trader overview"""
+        row = self._get_trade_stats(address)
 
-        total_positions = len(positions)
-        active_positions = sum(1 for p in positions if p['status'] == 'active')
-        settled_win = sum(1 for p in positions if p['status'] == 'settled_win')
-        settled_loss = sum(1 for p in positions if p['status'] == 'settled_loss')
-        closed_positions = sum(1 for p in positions if p['status'] == 'closed')
+        trading_period_days = (row['last_trade'] - row['first_trade']) / 86400 if row['first_trade'] else 0
+
+        return TraderOverview(
+            address=address,
+            total_trades=row['total_trades'],
+            buys=row['buys'],
+            sells=row['sells'],
+            unique_markets=row['unique_markets'],
+            first_trade=datetime.fromtimestamp(row['first_trade']) if row['first_trade'] else None,
+            last_trade=datetime.fromtimestamp(row['last_trade']) if row['last_trade'] else None,
+            trading_period_days=trading_period_days,
+            avg_trades_per_day=row['total_trades'] / trading_period_days if trading_period_days > 0 else 0
+        )
+
+    @_memoized
+    def get_position_performance(self, address: str) -> Optional[PositionPerformance]:
+        """Analyze position performance (None if the address has no positions)"""
+        cursor = self.conn.cursor()
 
-        total_realized_pnl = sum(p['realized_pnl'] for p in positions)
-        total_invested = sum(p['total_buy_value'] for p in positions)
-        total_returned = sum(p['total_sell_value'] for p in positions)
+        # Status counts and value totals in one aggregate over the address's
+        # positions, instead of loading every position row into Python
+        cursor.execute(self._SQL_POSITION_PERFORMANCE, (address,))
+
+        row = cursor.fetchone()
+        total_positions = row['total_positions']
+
+        if not total_positions:
+            return None
+
+        active_positions = row['active']
+        settled_win = row['settled_win']
+        settled_loss = row['settled_loss']
+        closed_positions = row['closed']
+
+        total_realized_pnl = row['total_realized_pnl']
+        total_invested = row['total_invested']
+        total_returned = row['total_returned']
 
         # Calculate win rate from settled positions
         settled_total = settled_win + settled_loss
@@ -89,68 +372,35 @@ class TraderAnalyzer:
         # Calculate ROI
         roi = ((total_returned - total_invested) / total_invested * 100) if total_invested > 0 else 0
 
-        return {
-            'total_positions': total_positions,
-            'active': active_positions,
-            'closed': closed_positions,
-            'settled_win': settled_win,
-            'settled_loss': settled_loss,
-            'win_rate': win_rate,
-            'total_realized_pnl': total_realized_pnl,
-            'total_invested': total_invested,
-            'total_returned': total_returned,
-            'roi_percent': roi
-        }
-
-    def analyze_trading_patterns(self, address: str) -> Dict:
+        return PositionPerformance(
+            total_positions=total_positions,
+            active=active_positions,
+            closed=closed_positions,
+            settled_win=settled_win,
+            settled_loss=settled_loss,
+            win_rate=win_rate,
+            total_realized_pnl=total_realized_pnl,
+            total_invested=total_invested,
+            total_returned=total_returned,
+            roi_percent=roi
+        )
+
+    @_memoized
+    def analyze_trading_patterns(self, address: str) -> TradingPatterns:
         """Analyze trading patterns and behavior"""
-        cursor = self.conn.cursor()
-
-        # Get trades grouped by market
-        cursor.execute("""
-            SELECT
-                token_id,
-                COUNT(*) as trade_count,
-                SUM(CASE WHEN side = 'buy' THEN 1 ELSE 0 END) as buys,
-                SUM(CASE WHEN side = 'sell' THEN 1 ELSE 0 END) as sells,
-                AVG(CAST(price AS REAL)) as avg_price
-            FROM trades
-            WHERE from_address = ?
-            GROUP BY token_id
-        """, (address,))
-
-        markets = [dict(row) for row in cursor.fetchall()]
-
-        # Calculate atomicity (single-sided trading)
-        atomic_markets = sum(1 for m in markets if m['buys'] == 0 or m['sells'] == 0)
-        atomicity_ratio = (atomic_markets / len(markets) * 100) if markets else 0
-
-        # Analyze time between trades
-        cursor.execute("""
-            SELECT timestamp
-            FROM trades
-            WHERE from_address = ?
-            ORDER BY timestamp ASC
-        """, (address,))
-
-        timestamps = [row['timestamp'] for row in cursor.fetchall()]
-        time_diffs = [timestamps[i+1] - timestamps[i] for i in range(len(timestamps)-1)] if len(timestamps) > 1 else []
-
-        avg_time_between_trades = sum(time_diffs) / len(time_diffs) if time_diffs else 0
-
-        # Classify trading frequency
-        if avg_time_between_trades < 3600:  # < 1 hour
-            frequency_class = "high_frequency"
-        elif avg_time_between_trades < 86400:  # < 1 day
-            frequency_class = "active"
-        elif avg_time_between_trades < 604800:  # < 1 week
-            frequency_class = "moderate"
-        else:
-            frequency_class = "low_frequency"
+        # Calculate atomicity (single-sided trading): markets with no buys or
+        # no sells, counted in SQL so no per-market rows reach Python
+        row = self._get_trade_stats(address)
+        total_markets = row['total_markets']
+        atomic_markets = row['atomic_markets'] or 0
+        atomicity_ratio = (atomic_markets / total_markets * 100) if total_markets else 0
+
+        # Mean time between trades and its frequency class (< 1 hour, < 1 day,
+        # < 1 week) come classified from the trade-stats query
+        avg_time_between_trades = row['avg_time_between']
+        frequency_class = row['frequency_class']
 
         # Classify trader type
-        buy_sell_ratio = markets[0]['buys'] / markets[0]['sells'] if markets and markets[0]['sells'] > 0 else float('inf')
-
         if atomicity_ratio >= 70:
             if frequency_class in ['high_frequency', 'active']:
                 trader_type = "MOMENTUM_TRADER"
@@ -162,16 +412,17 @@ class TraderAnalyzer:
             else:
                 trader_type = "BALANCED_TRADER"
 
-        return {
-            'total_markets_traded': len(markets),
-            'atomic_markets': atomic_markets,
-            'atomicity_ratio': atomicity_ratio,
-            'avg_time_between_trades_seconds': avg_time_between_trades,
-            'frequency_class': frequency_class,
-            'trader_type': trader_type
-        }
-
-    def calculate_copy_trading_score(self, address: str) -> Dict:
+        return TradingPatterns(
+            total_markets_traded=total_markets,
+            atomic_markets=atomic_markets,
+            atomicity_ratio=atomicity_ratio,
+            avg_time_between_trades_seconds=avg_time_between_trades,
+            frequency_class=frequency_class,
+            trader_type=trader_type
+        )
+
+    @_memoized
+    def calculate_copy_trading_score(self, address: str) -> CopyTradingScore:
         """
         Calculate copy trading feasibility score (0-100)
         Based on multiple factors
@@ -180,14 +431,21 @@ class TraderAnalyzer:
         performance = self.get_position_performance(address)
         patterns = self.analyze_trading_patterns(address)
 
-        if 'error' in performance:
-            return {'score': 0, 'recommendation': 'NOT_RECOMMENDED', 'reason': 'No position data available', 'trader_type': 'UNKNOWN', 'factors': ['❌ No position data available']}
+        if performance is None:
+            return CopyTradingScore(
+                score=0,
+                recommendation='NOT_RECOMMENDED',
+                confidence='N/A',
+                factors=['❌ No position data available'],
+                trader_type='UNKNOWN',
+                reason='No position data available'
+            )
 
         score = 0
         factors = []
 
         # 1. Win Rate (0-30 points)
-        win_rate = performance['win_rate']
+        win_rate = performance.win_rate
         if win_rate >= 70:
             score += 30
             factors.append(f"✅ Excellent win rate ({win_rate:.1f}%)")
@@ -201,7 +459,7 @@ class TraderAnalyzer:
             factors.append(f"❌ Poor win rate ({win_rate:.1f}%)")
 
         # 2. ROI (0-25 points)
-        roi = performance['roi_percent']
+        roi = performance.roi_percent
         if roi >= 20:
             score += 25
             factors.append(f"✅ Strong ROI ({roi:+.1f}%)")
@@ -215,7 +473,7 @@ class TraderAnalyzer:
             factors.append(f"❌ Negative ROI ({roi:+.1f}%)")
 
         # 3. Sample Size (0-20 points)
-        settled_total = performance['settled_win'] + performance['settled_loss']
+        settled_total = performance.settled_win + performance.settled_loss
         if settled_total >= 20:
             score += 20
             factors.append(f"✅ Large sample size ({settled_total} settled)")
@@ -230,7 +488,7 @@ class TraderAnalyzer:
             factors.append(f"⚠️  Very small sample size ({settled_total} settled)")
 
         # 4. Trading Activity (0-15 points)
-        trades_per_day = overview['avg_trades_per_day']
+        trades_per_day = overview.avg_trades_per_day
         if trades_per_day >= 5:
             score += 15
             factors.append(f"✅ Very active ({trades_per_day:.1f} trades/day)")
@@ -245,7 +503,7 @@ class TraderAnalyzer:
             factors.append(f"⚠️  Low activity ({trades_per_day:.1f} trades/day)")
 
         # 5. Consistency (0-10 points)
-        atomicity = patterns['atomicity_ratio']
+        atomicity = patterns.atomicity_ratio
         if atomicity >= 80:
             score += 10
             factors.append(f"✅ High atomicity ({atomicity:.1f}%) - Strong conviction")
@@ -273,46 +531,39 @@ class TraderAnalyzer:
             recommendation = "STRONGLY_NOT_RECOMMENDED"
             confidence = "Very Low"
 
-        return {
-            'score': score,
-            'recommendation': recommendation,
-            'confidence': confidence,
-            'factors': factors,
-            'trader_type': patterns['trader_type']
-        }
+        return CopyTradingScore(
+            score=score,
+            recommendation=recommendation,
+            confidence=confidence,
+            factors=factors,
+            trader_type=patterns.trader_type
+        )
 
-    def get_top_markets(self, address: str, limit: int = 5) -> List[Dict]:
+    @_memoized
+    def get_top_markets(self, address: str, limit: int = 5) -> List[MarketActivity]:
         """Get top markets by trade count"""
         cursor = self.conn.cursor()
 
-        cursor.execute("""
-            SELECT
-                token_id,
-                COUNT(*) as trade_count,
-                SUM(CASE WHEN side = 'buy' THEN 1 ELSE 0 END) as buys,
-                SUM(CASE WHEN side = 'sell' THEN 1 ELSE 0 END) as sells,
-                AVG(CAST(price AS REAL)) as avg_price
-            FROM trades
-            WHERE from_address = ?
-            GROUP BY token_id
-            ORDER BY trade_count DESC
-            LIMIT ?
-        """, (address, limit))
+        cursor.execute(self._SQL_TOP_MARKETS, (address, limit))
+
+        rows = cursor.fetchall()
+        # One batched metadata lookup for all listed markets
+        market_infos = self.metadata_manager.get_markets_for_tokens([row['token_id'] for row in rows])
 
         markets = []
-        for row in cursor.fetchall():
+        for row in rows:
             token_id = row['token_id']
-            market_info = self.metadata_manager.get_market_for_token(token_id)
-
-            markets.append({
-                'token_id': token_id,
-                'question': market_info.get('question', 'N/A') if market_info else 'N/A',
-                'outcome': market_info.get('outcome_name', 'N/A') if market_info else 'N/A',
-                'trade_count': row['trade_count'],
-                'buys': row['buys'],
-                'sells': row['sells'],
-                'avg_price': row['avg_price']
-            })
+            market_info = market_infos.get(token_id)
+
+            markets.append(MarketActivity(
+                token_id=token_id,
+                question=market_info.get('question', 'N/A') if market_info else 'N/A',
+                outcome=market_info.get('outcome_name', 'N/A') if market_info else 'N/A',
+                trade_count=row['trade_count'],
+                buys=row['buys'],
+                sells=row['sells'],
+                avg_price=row['avg_price']
+            ))
 
         return markets
 
@@ -329,68 +580,68 @@ class TraderAnalyzer:
         overview = self.get_trader_overview(address)
         print("📈 TRADER OVERVIEW")
         print("-" * 100)
-        print(f"Total Trades:        {overview['total_trades']}")
-        print(f"Buy Trades:          {overview['buys']}")
-        print(f"Sell Trades:         {overview['sells']}")
-        print(f"Unique Markets:      {overview['unique_markets']}")
-        print(f"First Trade:         {overview['first_trade'].strftime('%Y-%m-%d %H:%M:%S') if overview['first_trade'] else 'N/A'}")
-        print(f"Last Trade:          {overview['last_trade'].strftime('%Y-%m-%d %H:%M:%S') if overview['last_trade'] else 'N/A'}")
-        print(f"Trading Period:      {overview['trading_period_days']:.1f} days")
-        print(f"Avg Trades/Day:      {overview['avg_trades_per_day']:.2f}")
+        print(f"Total Trades:        {overview.total_trades}")
+        print(f"Buy Trades:          {overview.buys}")
+        print(f"Sell Trades:         {overview.sells}")
+        print(f"Unique Markets:      {overview.unique_markets}")
+        print(f"First Trade:         {overview.first_trade.strftime('%Y-%m-%d %H:%M:%S') if overview.first_trade else 'N/A'}")
+        print(f"Last Trade:          {overview.last_trade.strftime('%Y-%m-%d %H:%M:%S') if overview.last_trade else 'N/A'}")
+        print(f"Trading Period:      {overview.trading_period_days:.1f} days")
+        print(f"Avg Trades/Day:      {overview.avg_trades_per_day:.2f}")
         print()
 
         # Performance
         performance = self.get_position_performance(address)
-        if 'error' not in performance:
+        if performance is not None:
             print("💰 PERFORMANCE METRICS")
             print("-" * 100)
-            print(f"Total Positions:     {performance['total_positions']}")
-            print(f"  🟢 Active:         {performance['active']}")
-            print(f"  ⚪ Closed:         {performance['closed']}")
-            print(f"  🟩 Settled (Win):  {performance['settled_win']}")
-            print(f"  🟥 Settled (Loss): {performance['settled_loss']}")
+            print(f"Total Positions:     {performance.total_positions}")
+            print(f"  🟢 Active:         {performance.active}")
+            print(f"  ⚪ Closed:         {performance.closed}")
+            print(f"  🟩 Settled (Win):  {performance.settled_win}")
+            print(f"  🟥 Settled (Loss): {performance.settled_loss}")
             print()
-            print(f"Win Rate:            {performance['win_rate']:.1f}%")
-            print(f"Total Invested:      ${performance['total_invested']:.2f}")
-            print(f"Total Returned:      ${performance['total_returned']:.2f}")
-            print(f"Realized P&L:        ${performance['total_realized_pnl']:+.2f}")
-            print(f"ROI:                 {performance['roi_percent']:+.1f}%")
+            print(f"Win Rate:            {performance.win_rate:.1f}%")
+            print(f"Total Invested:      ${performance.total_invested:.2f}")
+            print(f"Total Returned:      ${performance.total_returned:.2f}")
+            print(f"Realized P&L:        ${performance.total_realized_pnl:+.2f}")
+            print(f"ROI:                 {performance.roi_percent:+.1f}%")
             print()
 
         # Trading Patterns
         patterns = self.analyze_trading_patterns(address)
         print("🎯 TRADING PATTERNS")
         print("-" * 100)
-        print(f"Markets Traded:      {patterns['total_markets_traded']}")
-        print(f"Atomic Markets:      {patterns['atomic_markets']} ({patterns['atomicity_ratio']:.1f}%)")
-        print(f"Avg Time Between:    {patterns['avg_time_between_trades_seconds']:.0f}s ({patterns['avg_time_between_trades_seconds']/3600:.1f}h)")
-        print(f"Frequency Class:     {patterns['frequency_class'].replace('_', ' ').upper()}")
-        print(f"Trader Type:         {patterns['trader_type']}")
+        print(f"Markets Traded:      {patterns.total_markets_traded}")
+        print(f"Atomic Markets:      {patterns.atomic_markets} ({patterns.atomicity_ratio:.1f}%)")
+        print(f"Avg Time Between:    {patterns.avg_time_between_trades_seconds:.0f}s ({patterns.avg_time_between_trades_seconds/3600:.1f}h)")
+        print(f"Frequency Class:     {patterns.frequency_class.replace('_', ' ').upper()}")
+        print(f"Trader Type:         {patterns.trader_type}")
         print()
 
         # Copy Trading Score
         score_data = self.calculate_copy_trading_score(address)
         print("🎓 COPY TRADING FEASIBILITY SCORE")
         print("-" * 100)
-        print(f"Score: {score_data['score']}/100")
-        print(f"Recommendation: {score_data['recommendation'].replace('_', ' ')}")
-        print(f"Confidence: {score_data['confidence']}")
+        print(f"Score: {score_data.score}/100")
+        print(f"Recommendation: {score_data.recommendation.replace('_', ' ')}")
+        print(f"Confidence: {score_data.confidence}")
         print()
         print("Factors:")
-        for factor in score_data['factors']:
+        for factor in score_data.factors:
             print(f"  {factor}")
         print()
 
         # Score interpretation
         print("📊 SCORE INTERPRETATION")
         print("-" * 100)
-        if score_data['score'] >= 75:
+        if score_data.score >= 75:
             print("🟢 HIGH CONFIDENCE - This trader shows strong performance and consistency.")
             print("   Recommended for copy trading with moderate position sizing.")
-        elif score_data['score'] >= 60:
+        elif score_data.score >= 60:
             print("🟡 MEDIUM CONFIDENCE - This trader shows promising results.")
             print("   Consider copy trading with reduced position sizing and close monitoring.")
-        elif score_data['score'] >= 45:
+        elif score_data.score >= 45:
             print("🟠 LOW CONFIDENCE - This trader has mixed results.")
             print("   Only for experienced traders willing to accept higher risk.")
         else:
@@ -403,9 +654,9 @@ class TraderAnalyzer:
         print("-" * 100)
         top_markets = self.get_top_markets(address, limit=5)
         for i, market in enumerate(top_markets, 1):
-            print(f"{i}. {market['question']}")
-            print(f"   Outcome: {market['outcome']} | Trades: {market['trade_count']} "
-                  f"(Buy: {market['buys']}, Sell: {market['sells']}) | Avg Price: ${market['avg_price']:.4f}")
+            print(f"{i}. {market.question}")
+            print(f"   Outcome: {market.outcome} | Trades: {market.trade_count} "
+                  f"(Buy: {market.buys}, Sell: {market.sells}) | Avg Price: ${market.avg_price:.4f}")
             print()
 
         print("=" * 100)
@@ -418,6 +669,7 @@ def main():
     parser = argparse.ArgumentParser(description='Comprehensive trader analysis and copy trading feasibility')
     parser.add_argument('--address', type=str, help='Trader address to analyze')
     parser.add_argument('--quick', action='store_true', help='Show quick summary only')
+    parser.add_argument('--debug', action='store_true', help='Verify query plans use indexes')
 
     args = parser.parse_args()
 
@@ -442,21 +694,20 @@ def main():
         print(f"Analyzing default address: {address}\n")
 
     # Initialize analyzer
-    analyzer = TraderAnalyzer(db_path)
-
-    if args.quick:
-        # Quick summary
-        score_data = analyzer.calculate_copy_trading_score(address)
-        print(f"\n{'🎯 QUICK ANALYSIS':^60}")
-        print("=" * 60)
-        print(f"Address: {address[:10]}...{address[-8:]}")
-        print(f"Score: {score_data['score']}/100")
-        print(f"Recommendation: {score_data['recommendation'].replace('_', ' ')}")
-        print(f"Trader Type: {score_data['trader_type']}")
-        print("=" * 60)
-    else:
-        # Full report
-        analyzer.generate_full_report(address)
+    with TraderAnalyzer(db_path, debug=args.debug) as analyzer:
+        if args.quick:
+            # Quick summary
+            score_data = analyzer.calculate_copy_trading_score(address)
+            print(f"\n{'🎯 QUICK ANALYSIS':^60}")
+            print("=" * 60)
+            print(f"Address: {address[:10]}...{address[-8:]}")
+            print(f"Score: {score_data.score}/100")
+            print(f"Recommendation: {score_data.recommendation.replace('_', ' ')}")
+            print(f"Trader Type: {score_data.trader_type}")
+            print("=" * 60)
+        else:
+            # Full report
+            analyzer.generate_full_report(address)
 
 
 if __name__ == '__main__':
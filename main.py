@@ -318,6 +318,7 @@ def main():
         def signal_handler(sig, frame):
             logger.info("Received shutdown signal...")
             monitor.stop()
+            db_manager.close()
             sys.exit(0)
 
         signal.signal(signal.SIGINT, signal_handler)
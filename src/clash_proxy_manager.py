@@ -5,13 +5,21 @@ Manages proxy connectivity and region rotation
 
 import logging
 import os
+import re
 import subprocess
 import time
 import requests
-from typing import List, Optional, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Dict, Tuple
 
 logger = logging.getLogger(__name__)
 
+# 网络相关错误（预编译，一次扫描，无需 lower() 复制字符串）
+_NETWORK_ERROR_RE = re.compile(
+    r"connection|timeout|proxy|refused|network|unreachable|ssl|reset",
+    re.IGNORECASE
+)
+
 
 class ClashProxyManager:
     """
@@ -33,6 +41,9 @@ class ClashProxyManager:
     # 区域优先级 (不包含美国) - 日本最稳定，放第一位
     REGIONS = ["日本", "新加坡", "台湾", "香港"]
 
+    # 区域 -> 在 REGIONS 中的下标（用作位掩码的位号）
+    REGION_INDEX = {region: index for index, region in enumerate(REGIONS)}
+
     # 区域对应的proxy-group名称
     REGION_GROUPS = {
         "新加坡": "🇸🇬 新加坡节点",
@@ -59,6 +70,8 @@ class ClashProxyManager:
         self.test_timeout = test_timeout
         self.max_retries = max_retries
         self.current_region_index = 0
+        # 轮换顺序（REGIONS 下标）；rank_regions() 按实测延迟重排
+        self.region_order: List[int] = list(range(len(self.REGIONS)))
         self._clash_process = None
 
     def start_clash(self) -> bool:
@@ -84,8 +97,8 @@ class ClashProxyManager:
                 start_new_session=True
             )
 
-            # 等待启动
-            time.sleep(3)
+            # 等待 API 就绪（就绪即返回，不固定等待）
+            self._wait_for_api()
 
             if self.is_clash_running():
                 logger.info("Clash started successfully")
@@ -98,6 +111,29 @@ class ClashProxyManager:
             logger.error(f"Failed to start Clash: {e}")
             return False
 
+    def _wait_for_api(self, timeout: float = 10.0, interval: float = 0.2) -> bool:
+        """
+        Clash 启动后轮询其 API，响应即返回（代替固定等待）
+
+        Args:
+            timeout: 最长等待时间（秒）
+            interval: 轮询间隔（秒）
+
+        Returns:
+            bool: 超时前 API 是否已响应
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                # Clash API must bypass proxy (direct connection to localhost)
+                resp = requests.get(f"{self.CLASH_API_URL}/version", timeout=1, proxies={})
+                if resp.status_code == 200:
+                    return True
+            except Exception:
+                pass
+            time.sleep(interval)
+        return False
+
     def is_clash_running(self) -> bool:
         """
         检查Clash是否在运行（并检测僵尸进程）
@@ -221,8 +257,8 @@ class ClashProxyManager:
                 start_new_session=True
             )
 
-            # 等待启动
-            time.sleep(4)
+            # 等待 API 就绪（通常 1-3 秒，就绪即返回）
+            self._wait_for_api()
 
             # 验证启动成功
             if not self.is_clash_running():
@@ -233,8 +269,9 @@ class ClashProxyManager:
 
             # 测试并选择最佳区域
             logger.info("[CLASH] Testing connectivity to all regions...")
-            for region in self.REGIONS:
+            for index, region in enumerate(self.REGIONS):
                 if self.switch_to_region(region):
+                    self.current_region_index = index
                     logger.info(f"[CLASH] ✓ Restart complete, using region: {region}")
                     logger.info("=" * 50)
                     return True
@@ -377,30 +414,111 @@ class ClashProxyManager:
             logger.warning(f"Failed to switch to region: {region}")
             return False
 
-    def rotate_region(self) -> Tuple[bool, str]:
+    def _probe_region_delay(self, region: str, timeout: int) -> Optional[int]:
+        """
+        经 Clash 延迟测试 API 测量某区域访问 Polymarket 的延迟（不切换当前节点）
+
+        Args:
+            region: 区域名称
+            timeout: 超时时间（秒）
+
+        Returns:
+            int: 延迟（毫秒），不可达时为 None
+        """
+        try:
+            # Clash API must bypass proxy (direct connection to localhost)
+            resp = requests.get(
+                f"{self.CLASH_API_URL}/proxies/{self.REGION_GROUPS[region]}/delay",
+                params={"url": self.POLYMARKET_TEST_URL, "timeout": timeout * 1000},
+                timeout=timeout + 1,
+                proxies={}  # Force direct connection
+            )
+            if resp.status_code == 200:
+                return resp.json().get("delay")
+            return None
+        except Exception as e:
+            logger.debug(f"[DIAG] Delay probe for {region} failed: {e}")
+            return None
+
+    def rank_regions(self, timeout: int = None) -> List[Tuple[str, Optional[int]]]:
+        """
+        并行测量所有区域的延迟，并按延迟重排轮换顺序（不可达的区域排最后）
+
+        Args:
+            timeout: 单个区域的测量超时（秒）
+
+        Returns:
+            List[Tuple[str, Optional[int]]]: 按延迟升序的 (区域, 延迟毫秒)
+        """
+        timeout = timeout or self.test_timeout
+        with ThreadPoolExecutor(max_workers=len(self.REGIONS)) as pool:
+            delays = list(pool.map(lambda region: self._probe_region_delay(region, timeout), self.REGIONS))
+
+        self.region_order = sorted(
+            range(len(self.REGIONS)),
+            key=lambda index: (delays[index] is None, delays[index] or 0, index)
+        )
+        ranked = [(self.REGIONS[index], delays[index]) for index in self.region_order]
+        logger.info(f"[DIAG] Region ranking: {ranked}")
+        return ranked
+
+    def use_fastest_region(self) -> bool:
+        """
+        测量所有区域并切换到延迟最低的可达区域
+
+        Returns:
+            bool: 是否已在使用最快区域（没有可达区域时为 False）
+        """
+        best, delay = self.rank_regions()[0]
+        if delay is None:
+            logger.warning("[DIAG] No region answered the delay probe")
+            return False
+        if best == self.current_region:
+            return True
+        if self.switch_to_region(best):
+            self.current_region_index = self.REGION_INDEX[best]
+            return True
+        return False
+
+    @property
+    def current_region(self) -> str:
+        """当前区域名称（按本地索引，不请求 Clash API）"""
+        return self.REGIONS[self.current_region_index]
+
+    def rotate_region(self, is_available: Optional[Callable[[str], bool]] = None) -> Tuple[bool, str]:
         """
         轮换到下一个区域
 
-        注意：每次调用都会先递增索引，确保真正切换到不同区域
+        按 region_order（rank_regions() 测得的延迟顺序）从当前区域的下一个开始尝试；
+        每次调用都会先前进一个区域，确保真正切换到不同区域
         这对于处理 Cloudflare 阻止 POST 但 GET 仍可用的情况很重要
 
+        Args:
+            is_available: 可选过滤函数，返回 False 的区域直接跳过（如熔断中的区域）
+
         Returns:
             Tuple[bool, str]: (是否成功, 当前区域)
         """
-        # 先递增索引，确保切换到不同区域
-        self.current_region_index = (self.current_region_index + 1) % len(self.REGIONS)
-        logger.info(f"[DIAG] Region rotation started - new index: {self.current_region_index}")
+        order = self.region_order
+        # 先前进一个位置，确保切换到不同区域
+        start = order.index(self.current_region_index) + 1
+        logger.info(f"[DIAG] Region rotation started - order: {[self.REGIONS[i] for i in order]}")
 
-        for i in range(len(self.REGIONS)):
+        for i in range(len(order)):
+            self.current_region_index = order[(start + i) % len(order)]
             region = self.REGIONS[self.current_region_index]
-            logger.info(f"[DIAG] Trying region {i+1}/{len(self.REGIONS)}: {region}")
+
+            if is_available is not None and not is_available(region):
+                logger.info(f"[DIAG] Skipping region {i+1}/{len(order)}: {region} (unavailable)")
+                continue
+
+            logger.info(f"[DIAG] Trying region {i+1}/{len(order)}: {region}")
 
             if self.switch_to_region(region):
                 logger.info(f"[DIAG] Region rotation SUCCESS - now using: {region}")
                 return True, region
 
             # 尝试下一个区域
-            self.current_region_index = (self.current_region_index + 1) % len(self.REGIONS)
             logger.info(f"[DIAG] Region {region} failed, rotating to next...")
 
         logger.error("[DIAG] Region rotation FAILED - all regions exhausted")
@@ -426,17 +544,9 @@ class ClashProxyManager:
 
             except Exception as e:
                 last_error = e
-                error_str = str(e).lower()
 
                 # 检查是否是网络相关错误
-                network_errors = [
-                    "connection", "timeout", "proxy", "refused",
-                    "network", "unreachable", "ssl", "reset"
-                ]
-
-                is_network_error = any(err in error_str for err in network_errors)
-
-                if is_network_error:
+                if _NETWORK_ERROR_RE.search(str(e)):
                     logger.warning(f"Network error on attempt {attempt + 1}: {e}")
 
                     # 测试当前连通性
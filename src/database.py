@@ -3,13 +3,69 @@ Database manager for storing and exporting trade data
 """
 import sqlite3
 import csv
+import itertools
 import logging
-from datetime import datetime
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from typing import List, Dict, Optional
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Position quantities are accumulated as integer micro-units (1e-6 shares/USDC,
+# matching on-chain token decimals) so that buys and sells cancel exactly.
+MICRO = 1_000_000
+
+
+def _to_micro(value: Optional[float]) -> int:
+    """Convert a share amount or price to integer micro-units"""
+    return int(round((value or 0) * MICRO))
+
+
+def _mul_micro(a: int, b: int) -> int:
+    """Multiply two micro-unit values, rounding half away from zero like _to_micro"""
+    product = a * b
+    quotient = (abs(product) + MICRO // 2) // MICRO
+    return quotient if product >= 0 else -quotient
+
+
+def now_iso() -> str:
+    """Current UTC time as an ISO-8601 string (second precision)"""
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime())
+
+
+# trades columns populated straight from trade_data, in INSERT order
+_TRADE_KEYS = (
+    'tx_hash', 'block_number', 'timestamp', 'from_address', 'to_address',
+    'method', 'token_id', 'amount', 'price', 'side', 'gas_used', 'gas_price',
+    'value', 'status', 'capture_delay_seconds'
+)
+
+# RETURNING yields the new row id, or no row when OR IGNORE skipped a stored tx_hash
+_INSERT_TRADE_SQL = """
+    INSERT OR IGNORE INTO trades (
+        tx_hash, block_number, timestamp, from_address, to_address,
+        method, token_id, amount, price, side, gas_used, gas_price,
+        value, status, capture_delay_seconds, created_at, trade_type
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    RETURNING id
+"""
+
+# Max (kind, address) entries kept in each thread's positions cache
+_POSITIONS_CACHE_SIZE = 32
+
+# Seconds a get_copy_order_stats() result is reused when nothing was saved
+_STATS_CACHE_TTL = 5.0
+
+# checkpoint_if_due() runs a PASSIVE checkpoint after this many inserted
+# trades to keep the WAL bounded
+_CHECKPOINT_INTERVAL = 5000
+
+# Sentinel telling the CSV writer thread to flush and exit
+_CSV_STOP = object()
+
 
 class DatabaseManager:
     """Manages SQLite database and CSV export for trade data"""
@@ -31,144 +87,332 @@ class DatabaseManager:
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         Path(csv_path).parent.mkdir(parents=True, exist_ok=True)
 
+        # One serialized writer connection shared by all threads, plus a
+        # lazily opened reader connection per thread
+        self._writer = self._connect(check_same_thread=False)
+        self._writer_lock = threading.Lock()
+        self._local = threading.local()
+
         self._init_database()
         self._init_csv()
 
-    def _init_database(self):
-        """Initialize SQLite database and create tables"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+        # Memo for _format_timestamp (trades in one block share a timestamp)
+        self._last_ts: Optional[int] = None
+        self._last_ts_iso: str = ''
 
-            # Create trades table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS trades (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    tx_hash TEXT UNIQUE NOT NULL,
-                    block_number INTEGER NOT NULL,
-                    timestamp INTEGER NOT NULL,
-                    from_address TEXT NOT NULL,
-                    to_address TEXT NOT NULL,
-                    method TEXT,
-                    token_id TEXT,
-                    amount TEXT,
-                    price TEXT,
-                    side TEXT,
-                    gas_used TEXT,
-                    gas_price TEXT,
-                    value TEXT,
-                    status TEXT,
-                    created_at TEXT NOT NULL,
-                    UNIQUE(tx_hash)
-                )
-            """)
+        self._inserts_since_checkpoint = 0
 
-            # Create index for faster queries
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_from_address ON trades(from_address)
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_block_number ON trades(block_number)
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_timestamp ON trades(timestamp)
-            """)
+        # get_copy_order_stats() cache, cleared by save_copy_order
+        self._copy_stats_cache: Optional[Dict] = None
+        self._copy_stats_ts = 0.0
 
-            # Create positions table for tracking holdings
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS positions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    address TEXT NOT NULL,
-                    token_id TEXT NOT NULL,
-                    market_id TEXT,
-                    current_position REAL NOT NULL DEFAULT 0,
-                    total_bought REAL NOT NULL DEFAULT 0,
-                    total_sold REAL NOT NULL DEFAULT 0,
-                    avg_buy_price REAL,
-                    total_buy_value REAL NOT NULL DEFAULT 0,
-                    total_sell_value REAL NOT NULL DEFAULT 0,
-                    realized_pnl REAL NOT NULL DEFAULT 0,
-                    first_trade_at INTEGER,
-                    last_trade_at INTEGER,
-                    status TEXT NOT NULL DEFAULT 'active',
-                    settled_at INTEGER,
-                    settlement_price REAL,
-                    settlement_type TEXT,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL,
-                    UNIQUE(address, token_id)
-                )
-            """)
+        # Highest block number seen; kept current by insert_trade
+        self._latest_block: Optional[int] = self.get_stats()['latest_block']
 
-            # Create index for positions
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_positions_address ON positions(address)
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_positions_status ON positions(status)
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_positions_token ON positions(token_id)
-            """)
+        # CSV rows are appended by a background writer so file I/O stays off
+        # the insert path
+        self._csv_queue: Optional[queue.Queue] = None
+        self._csv_thread: Optional[threading.Thread] = None
+        if self.auto_export:
+            self._csv_queue = queue.Queue(maxsize=10000)
+            self._csv_thread = threading.Thread(
+                target=self._csv_worker, name="csv-writer", daemon=True
+            )
+            self._csv_thread.start()
 
-            # Create copy_orders table for tracking copy trading execution
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS copy_orders (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    original_tx_hash TEXT,
-                    token_id TEXT NOT NULL,
-                    side TEXT NOT NULL,
-                    amount REAL,
-                    price REAL,
-                    order_id TEXT,
-                    status TEXT NOT NULL DEFAULT 'pending',
-                    error_message TEXT,
-                    created_at TEXT NOT NULL,
-                    executed_at TEXT
-                )
-            """)
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        """
+        Open a connection in autocommit mode
 
-            # Create index for copy_orders
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_copy_orders_status ON copy_orders(status)
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_copy_orders_token ON copy_orders(token_id)
-            """)
+        Transactions are started explicitly (BEGIN IMMEDIATE) where a method
+        needs several statements to apply atomically.
+
+        Args:
+            check_same_thread: Passed through to sqlite3.connect
+
+        Returns:
+            sqlite3.Connection
+        """
+        conn = sqlite3.connect(
+            self.db_path, isolation_level=None, check_same_thread=check_same_thread,
+            cached_statements=256
+        )
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA foreign_keys=ON")
+        # Connection-scoped cache tuning: 256MB mmap window, 64MB page cache
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-65536")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """
+        Get this thread's read connection, opening it on first use
+
+        Returns:
+            sqlite3.Connection
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
 
-            # Add capture_delay_seconds column if it doesn't exist (migration)
+    @contextmanager
+    def _write_cursor(self):
+        """
+        Yield a cursor on the shared writer connection while holding the write lock
+
+        Any transaction left open by a failing statement is rolled back so
+        the writer is clean for the next caller.
+        """
+        with self._writer_lock:
+            cursor = self._writer.cursor()
             try:
+                yield cursor
+            except Exception:
+                if self._writer.in_transaction:
+                    self._writer.execute("ROLLBACK")
+                raise
+
+    def _init_database(self):
+        """Initialize SQLite database and create tables"""
+        try:
+            # Larger pages for new databases; only takes effect before the
+            # file is first written (existing databases keep their page size)
+            self._writer.execute("PRAGMA page_size=16384")
+            # WAL lets the per-thread readers run alongside the writer
+            self._writer.execute("PRAGMA journal_mode=WAL")
+            self._writer.execute("PRAGMA synchronous=NORMAL")
+            # Checkpoint less often than the 1000-page default during insert bursts
+            self._writer.execute("PRAGMA wal_autocheckpoint=2000")
+
+            with self._write_cursor() as cursor:
+                cursor.execute("BEGIN IMMEDIATE")
+
+                # Create trades table
                 cursor.execute("""
-                    ALTER TABLE trades ADD COLUMN capture_delay_seconds INTEGER
+                    CREATE TABLE IF NOT EXISTS trades (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        tx_hash TEXT UNIQUE NOT NULL,
+                        block_number INTEGER NOT NULL,
+                        timestamp INTEGER NOT NULL,
+                        from_address TEXT NOT NULL,
+                        to_address TEXT NOT NULL,
+                        method TEXT,
+                        token_id TEXT,
+                        amount TEXT,
+                        price TEXT,
+                        side TEXT,
+                        gas_used TEXT,
+                        gas_price TEXT,
+                        value TEXT,
+                        status TEXT,
+                        created_at TEXT NOT NULL,
+                        UNIQUE(tx_hash)
+                    )
                 """)
-                logger.info("✓ Added capture_delay_seconds column to trades table")
-            except sqlite3.OperationalError as e:
-                # Column already exists, that's fine
-                if "duplicate column" not in str(e).lower():
-                    logger.debug(f"Column migration: {e}")
 
-            # Add trade_type column (TAKER=主动交易, MAKER=挂单被执行)
-            try:
+                # Create index for faster queries
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_from_address ON trades(from_address)
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_block_number ON trades(block_number)
+                """)
                 cursor.execute("""
-                    ALTER TABLE trades ADD COLUMN trade_type TEXT DEFAULT 'TAKER'
+                    CREATE INDEX IF NOT EXISTS idx_timestamp ON trades(timestamp)
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_trades_token_id ON trades(token_id)
+                """)
+                # Composite index so per-(address, token) lookups are a single range
+                # scan; side and price are included so per-trader aggregates over
+                # trades are answered from the index alone. It supersedes the
+                # earlier (from_address, token_id, timestamp) index.
+                cursor.execute("DROP INDEX IF EXISTS idx_trades_addr_token_ts")
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_trades_addr_token_cover
+                    ON trades(from_address, token_id, timestamp, side, price)
                 """)
-                logger.info("✓ Added trade_type column to trades table")
-            except sqlite3.OperationalError as e:
-                if "duplicate column" not in str(e).lower():
-                    logger.debug(f"Column migration: {e}")
 
-            # Add trade_type to copy_orders table
-            try:
+                # Per-(address, token) trade totals kept up to date by a trigger on
+                # trades, so per-trader reports (analyze_trader.py) read one row per
+                # market instead of every trade. Trades without a token are
+                # grouped under token_id ''.
                 cursor.execute("""
-                    ALTER TABLE copy_orders ADD COLUMN trade_type TEXT DEFAULT 'TAKER'
+                    CREATE TABLE IF NOT EXISTS trader_market_summary (
+                        address TEXT NOT NULL,
+                        token_id TEXT NOT NULL,
+                        trade_count INTEGER NOT NULL,
+                        buys INTEGER NOT NULL,
+                        sells INTEGER NOT NULL,
+                        first_trade INTEGER NOT NULL,
+                        last_trade INTEGER NOT NULL,
+                        price_sum REAL NOT NULL,
+                        price_count INTEGER NOT NULL,
+                        PRIMARY KEY (address, token_id)
+                    )
+                """)
+                summary_trigger_exists = cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trades_trader_market_summary'"
+                ).fetchone() is not None
+
+                if not summary_trigger_exists:
+                    # INSERT OR IGNORE duplicates never fire AFTER INSERT, so each
+                    # stored trade is counted exactly once
+                    cursor.execute("""
+                        CREATE TRIGGER trades_trader_market_summary AFTER INSERT ON trades
+                        BEGIN
+                            INSERT INTO trader_market_summary (
+                                address, token_id, trade_count, buys, sells,
+                                first_trade, last_trade, price_sum, price_count
+                            ) VALUES (
+                                NEW.from_address, IFNULL(NEW.token_id, ''), 1,
+                                NEW.side IS 'buy', NEW.side IS 'sell',
+                                NEW.timestamp, NEW.timestamp,
+                                IFNULL(CAST(NEW.price AS REAL), 0), NEW.price IS NOT NULL
+                            )
+                            ON CONFLICT(address, token_id) DO UPDATE SET
+                                trade_count = trade_count + 1,
+                                buys = buys + excluded.buys,
+                                sells = sells + excluded.sells,
+                                first_trade = MIN(first_trade, excluded.first_trade),
+                                last_trade = MAX(last_trade, excluded.last_trade),
+                                price_sum = price_sum + excluded.price_sum,
+                                price_count = price_count + excluded.price_count;
+                        END
+                    """)
+                    # Seed with trades stored before the trigger existed
+                    cursor.execute("DELETE FROM trader_market_summary")
+                    cursor.execute("""
+                        INSERT INTO trader_market_summary (
+                            address, token_id, trade_count, buys, sells,
+                            first_trade, last_trade, price_sum, price_count
+                        )
+                        SELECT
+                            from_address,
+                            IFNULL(token_id, ''),
+                            COUNT(*),
+                            SUM(side IS 'buy'),
+                            SUM(side IS 'sell'),
+                            MIN(timestamp),
+                            MAX(timestamp),
+                            IFNULL(SUM(CAST(price AS REAL)), 0),
+                            COUNT(price)
+                        FROM trades
+                        GROUP BY from_address, IFNULL(token_id, '')
+                    """)
+                    logger.info("✓ Created trader_market_summary trigger on trades")
+
+                # Create positions table for tracking holdings
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS positions (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        address TEXT NOT NULL,
+                        token_id TEXT NOT NULL,
+                        market_id TEXT,
+                        current_position REAL NOT NULL DEFAULT 0,
+                        total_bought REAL NOT NULL DEFAULT 0,
+                        total_sold REAL NOT NULL DEFAULT 0,
+                        avg_buy_price REAL,
+                        total_buy_value REAL NOT NULL DEFAULT 0,
+                        total_sell_value REAL NOT NULL DEFAULT 0,
+                        realized_pnl REAL NOT NULL DEFAULT 0,
+                        first_trade_at INTEGER,
+                        last_trade_at INTEGER,
+                        status TEXT NOT NULL DEFAULT 'active',
+                        settled_at INTEGER,
+                        settlement_price REAL,
+                        settlement_type TEXT,
+                        created_at TEXT NOT NULL,
+                        updated_at TEXT NOT NULL,
+                        UNIQUE(address, token_id)
+                    )
                 """)
-                logger.info("✓ Added trade_type column to copy_orders table")
-            except sqlite3.OperationalError as e:
-                if "duplicate column" not in str(e).lower():
-                    logger.debug(f"Column migration: {e}")
 
-            conn.commit()
-            conn.close()
+                # Create index for positions
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_positions_address ON positions(address)
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_positions_status ON positions(status)
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_positions_token ON positions(token_id)
+                """)
+
+                # Create copy_orders table for tracking copy trading execution
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS copy_orders (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        original_tx_hash TEXT,
+                        token_id TEXT NOT NULL,
+                        side TEXT NOT NULL,
+                        amount REAL,
+                        price REAL,
+                        order_id TEXT,
+                        status TEXT NOT NULL DEFAULT 'pending',
+                        error_message TEXT,
+                        created_at TEXT NOT NULL,
+                        executed_at TEXT
+                    )
+                """)
+
+                # Create index for copy_orders
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_copy_orders_status ON copy_orders(status)
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_copy_orders_token ON copy_orders(token_id)
+                """)
+
+                # Create monitor_checkpoints table (monitor progress checkpoints).
+                # sync_state belongs to the legacy single-row layout
+                # (id, last_block_processed, ...), so checkpoints live apart
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS monitor_checkpoints (
+                        key TEXT PRIMARY KEY,
+                        value INTEGER NOT NULL,
+                        updated_at TEXT NOT NULL
+                    )
+                """)
+
+                sync_state_columns = {row[1] for row in cursor.execute("PRAGMA table_info(sync_state)")}
+                if 'last_block_processed' in sync_state_columns:
+                    # Resume from a block recorded by the legacy layout
+                    cursor.execute("""
+                        INSERT OR IGNORE INTO monitor_checkpoints (key, value, updated_at)
+                        SELECT 'last_block_processed', last_block_processed, ?
+                        FROM sync_state
+                        WHERE id = 1 AND last_block_processed > 0
+                    """, (now_iso(),))
+
+                # Column migrations: check the schema once instead of relying on
+                # duplicate-column errors from ALTER TABLE
+                trade_columns = {row[1] for row in cursor.execute("PRAGMA table_info(trades)")}
+                copy_order_columns = {row[1] for row in cursor.execute("PRAGMA table_info(copy_orders)")}
+
+                if 'capture_delay_seconds' not in trade_columns:
+                    cursor.execute("ALTER TABLE trades ADD COLUMN capture_delay_seconds INTEGER")
+                    logger.info("✓ Added capture_delay_seconds column to trades table")
+
+                # Add trade_type column (TAKER=主动交易, MAKER=挂单被执行)
+                if 'trade_type' not in trade_columns:
+                    cursor.execute("ALTER TABLE trades ADD COLUMN trade_type TEXT DEFAULT 'TAKER'")
+                    logger.info("✓ Added trade_type column to trades table")
+
+                # Add trade_type to copy_orders table
+                if 'trade_type' not in copy_order_columns:
+                    cursor.execute("ALTER TABLE copy_orders ADD COLUMN trade_type TEXT DEFAULT 'TAKER'")
+                    logger.info("✓ Added trade_type column to copy_orders table")
+
+                # Link copy orders back to the trade row that triggered them
+                if 'original_trade_id' not in copy_order_columns:
+                    cursor.execute(
+                        "ALTER TABLE copy_orders ADD COLUMN original_trade_id INTEGER REFERENCES trades(id)"
+                    )
+                    logger.info("✓ Added original_trade_id column to copy_orders table")
+
+                cursor.execute("COMMIT")
             logger.info(f"✓ Database initialized: {self.db_path}")
         except Exception as e:
             logger.error(f"Failed to initialize database: {e}")
@@ -196,6 +440,8 @@ class DatabaseManager:
         """
         Insert a new trade record
 
+        On success the new row id is stored in trade_data['trade_id'].
+
         Args:
             trade_data: Dictionary containing trade information
 
@@ -203,83 +449,213 @@ class DatabaseManager:
             bool: True if insert successful
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            return self.insert_trades_bulk([trade_data]) == 1
+        except Exception:
+            return False
 
-            cursor.execute("""
-                INSERT OR IGNORE INTO trades (
-                    tx_hash, block_number, timestamp, from_address, to_address,
-                    method, token_id, amount, price, side, gas_used, gas_price,
-                    value, status, created_at, capture_delay_seconds, trade_type
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                trade_data.get('tx_hash'),
-                trade_data.get('block_number'),
-                trade_data.get('timestamp'),
-                trade_data.get('from_address'),
-                trade_data.get('to_address'),
-                trade_data.get('method'),
-                trade_data.get('token_id'),
-                trade_data.get('amount'),
-                trade_data.get('price'),
-                trade_data.get('side'),
-                trade_data.get('gas_used'),
-                trade_data.get('gas_price'),
-                trade_data.get('value'),
-                trade_data.get('status'),
-                datetime.utcnow().isoformat(),
-                trade_data.get('capture_delay_seconds'),
-                trade_data.get('trade_type', 'TAKER')
-            ))
+    def insert_trades_bulk(self, trades: List[Dict]) -> int:
+        """
+        Insert many trade records in a single transaction (one commit)
 
-            inserted = cursor.rowcount > 0
-            conn.commit()
-            conn.close()
+        Each newly inserted trade gets its row id in trade['trade_id'];
+        trades whose tx_hash is already stored are left without one.
 
-            if inserted:
-                logger.info(f"✓ Trade recorded: {trade_data.get('tx_hash')[:10]}...")
+        Args:
+            trades: List of trade dictionaries, as for insert_trade
+
+        Returns:
+            int: Number of trades inserted
 
-                if self.auto_export:
-                    self._append_to_csv(trade_data)
+        Raises:
+            Exception: If the transaction failed; none of the trades were stored
+        """
+        if not trades:
+            return 0
 
-            return inserted
+        inserted = []
+        try:
+            created_at = now_iso()
+            with self._write_cursor() as cursor:
+                cursor.execute("BEGIN IMMEDIATE")
+                for trade_data in trades:
+                    cursor.execute(_INSERT_TRADE_SQL, tuple(map(trade_data.get, _TRADE_KEYS)) + (
+                        created_at,
+                        trade_data.get('trade_type', 'TAKER')
+                    ))
+
+                    # OR IGNORE returns no row when the tx_hash is already stored
+                    row = cursor.fetchone()
+                    if row is not None:
+                        inserted.append((trade_data, row[0]))
+                cursor.execute("COMMIT")
 
         except Exception as e:
-            logger.error(f"Failed to insert trade: {e}")
-            return False
+            logger.error(f"Failed to insert trades: {e}")
+            raise
+
+        for trade_data, trade_id in inserted:
+            trade_data['trade_id'] = trade_id
+
+            block_number = trade_data.get('block_number')
+            if block_number and (self._latest_block is None or block_number > self._latest_block):
+                self._latest_block = block_number
+
+            logger.info(f"✓ Trade recorded: {trade_data.get('tx_hash')[:10]}...")
+
+            if self.auto_export:
+                self._append_to_csv(trade_data)
+
+        # Checkpointing is left to checkpoint_if_due(), off the insert path
+        self._inserts_since_checkpoint += len(inserted)
+
+        return len(inserted)
 
     def _append_to_csv(self, trade_data: Dict):
         """
-        Append trade data to CSV file
+        Queue trade data for the background CSV writer
 
         Args:
             trade_data: Dictionary containing trade information
         """
+        row = [
+            trade_data.get('tx_hash'),
+            trade_data.get('block_number'),
+            trade_data.get('timestamp'),
+            self._format_timestamp(trade_data.get('timestamp', 0)),
+            trade_data.get('from_address'),
+            trade_data.get('to_address'),
+            trade_data.get('method'),
+            trade_data.get('token_id'),
+            trade_data.get('amount'),
+            trade_data.get('price'),
+            trade_data.get('side'),
+            trade_data.get('gas_used'),
+            trade_data.get('gas_price'),
+            trade_data.get('value'),
+            trade_data.get('status'),
+            trade_data.get('capture_delay_seconds'),
+            trade_data.get('trade_type', 'TAKER')
+        ]
+
+        if self._csv_queue is None:
+            self._write_csv_rows([row])
+            return
+
+        try:
+            self._csv_queue.put_nowait(row)
+        except queue.Full:
+            # Writer has fallen behind; write inline rather than drop the row
+            logger.warning("CSV queue full, writing row synchronously")
+            self._write_csv_rows([row])
+
+    def _format_timestamp(self, ts: int) -> str:
+        """
+        Format a unix timestamp as a local-time ISO string, reusing the last result
+
+        Args:
+            ts: Unix timestamp in seconds
+
+        Returns:
+            str: ISO-8601 local time without microseconds
+        """
+        if ts != self._last_ts:
+            self._last_ts_iso = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(ts))
+            self._last_ts = ts
+        return self._last_ts_iso
+
+    def _write_csv_rows(self, rows: List[list]):
+        """
+        Append rows to the CSV file
+
+        Args:
+            rows: Rows in CSV column order
+        """
         try:
             with open(self.csv_path, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    trade_data.get('tx_hash'),
-                    trade_data.get('block_number'),
-                    trade_data.get('timestamp'),
-                    datetime.fromtimestamp(trade_data.get('timestamp', 0)).isoformat(),
-                    trade_data.get('from_address'),
-                    trade_data.get('to_address'),
-                    trade_data.get('method'),
-                    trade_data.get('token_id'),
-                    trade_data.get('amount'),
-                    trade_data.get('price'),
-                    trade_data.get('side'),
-                    trade_data.get('gas_used'),
-                    trade_data.get('gas_price'),
-                    trade_data.get('value'),
-                    trade_data.get('status'),
-                    trade_data.get('capture_delay_seconds'),
-                    trade_data.get('trade_type', 'TAKER')
-                ])
+                csv.writer(f).writerows(rows)
         except Exception as e:
             logger.error(f"Failed to append to CSV: {e}")
 
+    def _csv_worker(self, batch_size: int = 500, max_wait: float = 0.1):
+        """
+        Background loop draining queued CSV rows in batches
+
+        Args:
+            batch_size: Maximum rows written per batch
+            max_wait: Seconds to wait for more rows before flushing a batch
+        """
+        csv_queue = self._csv_queue
+        stop = False
+        while not stop:
+            item = csv_queue.get()
+            if item is _CSV_STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + max_wait
+            while len(batch) < batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = csv_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _CSV_STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._write_csv_rows(batch)
+
+    def checkpoint_if_due(self) -> bool:
+        """
+        Run a PASSIVE WAL checkpoint once enough trades were inserted since the last one
+
+        PASSIVE copies what it can without waiting on readers or writers, so
+        it never stalls behind the dashboard or analyzer connections. Call it
+        from background work, not from the insert path.
+
+        Returns:
+            bool: True if a checkpoint was run
+        """
+        if self._inserts_since_checkpoint < _CHECKPOINT_INTERVAL:
+            return False
+        try:
+            with self._write_cursor() as cursor:
+                cursor.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            self._inserts_since_checkpoint = 0
+            return True
+        except Exception as e:
+            logger.warning(f"WAL checkpoint failed: {e}")
+            return False
+
+    def maintenance(self):
+        """Truncate the WAL file and refresh query planner statistics (run at close)"""
+        try:
+            with self._write_cursor() as cursor:
+                cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                cursor.execute("PRAGMA optimize")
+            self._inserts_since_checkpoint = 0
+        except Exception as e:
+            logger.warning(f"Database maintenance failed: {e}")
+
+    def close(self):
+        """Flush pending CSV rows, stop the background writer and close connections"""
+        if self._csv_thread is not None and self._csv_thread.is_alive():
+            self._csv_queue.put(_CSV_STOP)
+            self._csv_thread.join(timeout=5)
+        self._csv_thread = None
+        self._csv_queue = None
+
+        self.maintenance()
+        with self._writer_lock:
+            self._writer.close()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
     def export_all_to_csv(self, output_path: Optional[str] = None):
         """
         Export all trades from database to CSV
@@ -290,20 +666,20 @@ class DatabaseManager:
         output_path = output_path or self.csv_path
 
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self._reader().cursor()
 
+            # Let SQLite format the datetime column (local time, as the live CSV uses)
             cursor.execute("""
-                SELECT tx_hash, block_number, timestamp, from_address, to_address,
+                SELECT tx_hash, block_number, timestamp,
+                       strftime('%Y-%m-%dT%H:%M:%S', timestamp, 'unixepoch', 'localtime'),
+                       from_address, to_address,
                        method, token_id, amount, price, side, gas_used, gas_price,
                        value, status, capture_delay_seconds
                 FROM trades
                 ORDER BY timestamp DESC
             """)
 
-            rows = cursor.fetchall()
-            conn.close()
-
+            count = 0
             with open(output_path, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
                 writer.writerow([
@@ -313,17 +689,36 @@ class DatabaseManager:
                     'value', 'status', 'capture_delay_seconds'
                 ])
 
-                for row in rows:
-                    row_list = list(row)
-                    # Insert datetime after timestamp
-                    row_list.insert(3, datetime.fromtimestamp(row[2]).isoformat())
-                    writer.writerow(row_list)
+                # Stream in fixed-size chunks instead of materializing every row
+                rows = iter(cursor)
+                while True:
+                    chunk = list(itertools.islice(rows, 1000))
+                    if not chunk:
+                        break
+                    writer.writerows(chunk)
+                    count += len(chunk)
 
-            logger.info(f"✓ Exported {len(rows)} trades to {output_path}")
+            logger.info(f"✓ Exported {count} trades to {output_path}")
 
         except Exception as e:
             logger.error(f"Failed to export to CSV: {e}")
 
+    def get_stats(self) -> Dict:
+        """
+        Get trade count and latest block in a single query
+
+        Returns:
+            Dictionary with 'trade_count' and 'latest_block'
+        """
+        try:
+            cursor = self._reader().cursor()
+            cursor.execute("SELECT COUNT(*), MAX(block_number) FROM trades")
+            count, latest_block = cursor.fetchone()
+            return {'trade_count': count, 'latest_block': latest_block}
+        except Exception as e:
+            logger.error(f"Failed to get trade stats: {e}")
+            return {'trade_count': 0, 'latest_block': None}
+
     def get_trade_count(self) -> int:
         """
         Get total number of trades in database
@@ -331,16 +726,52 @@ class DatabaseManager:
         Returns:
             int: Number of trades
         """
+        return self.get_stats()['trade_count']
+
+    def trade_exists(self, tx_hash: str) -> bool:
+        """
+        Check whether a trade with this transaction hash is stored
+
+        Args:
+            tx_hash: Transaction hash
+
+        Returns:
+            bool: True if the trade exists
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM trades")
-            count = cursor.fetchone()[0]
-            conn.close()
-            return count
+            return self._reader().execute(
+                "SELECT 1 FROM trades WHERE tx_hash = ? LIMIT 1", (tx_hash,)
+            ).fetchone() is not None
+
         except Exception as e:
-            logger.error(f"Failed to get trade count: {e}")
-            return 0
+            logger.error(f"Failed to look up trade {tx_hash[:10]}...: {e}")
+            return False
+
+    def get_recent_trades(self, limit: int = 5) -> List[Dict]:
+        """
+        Get the most recent trades
+
+        Args:
+            limit: Maximum number of trades to return
+
+        Returns:
+            List of trade dictionaries (tx_hash, timestamp, from_address,
+            token_id, amount, price, side, capture_delay_seconds), newest first
+        """
+        try:
+            cursor = self._reader().cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute("""
+                SELECT tx_hash, timestamp, from_address, token_id, amount, price, side, capture_delay_seconds
+                FROM trades
+                ORDER BY timestamp DESC
+                LIMIT ?
+            """, (limit,))
+            return [dict(row) for row in cursor]
+
+        except Exception as e:
+            logger.error(f"Failed to get recent trades: {e}")
+            return []
 
     def get_latest_block(self) -> Optional[int]:
         """
@@ -349,19 +780,53 @@ class DatabaseManager:
         Returns:
             Optional[int]: Latest block number or None
         """
+        return self._latest_block
+
+    def get_monitor_checkpoint(self, key: str = 'last_block_processed') -> Optional[int]:
+        """
+        Get the last block the monitor fully processed
+
+        Args:
+            key: Checkpoint name
+
+        Returns:
+            Optional[int]: Checkpointed block number or None
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT MAX(block_number) FROM trades")
-            result = cursor.fetchone()[0]
-            conn.close()
-            return result
+            row = self._reader().execute(
+                "SELECT value FROM monitor_checkpoints WHERE key = ?", (key,)
+            ).fetchone()
+            return row[0] if row else None
+
         except Exception as e:
-            logger.error(f"Failed to get latest block: {e}")
+            logger.error(f"Failed to get monitor checkpoint: {e}")
             return None
 
+    def set_monitor_checkpoint(self, block_number: int, key: str = 'last_block_processed') -> bool:
+        """
+        Record the last block the monitor fully processed
+
+        Args:
+            block_number: Block number
+            key: Checkpoint name
+
+        Returns:
+            bool: True if saved successfully
+        """
+        try:
+            with self._write_cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO monitor_checkpoints (key, value, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+                """, (key, block_number, now_iso()))
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to save monitor checkpoint: {e}")
+            return False
+
     def update_position(self, address: str, token_id: str, side: str,
-                       amount: float, price: float, timestamp: int, market_id: str = None) -> bool:
+                       amount: float, price: float, timestamp: int, market_id: str = None) -> Optional[Dict]:
         """
         Update position for an address and token based on a trade
 
@@ -375,113 +840,115 @@ class DatabaseManager:
             market_id: Market ID (optional)
 
         Returns:
-            bool: True if update successful
+            Optional[Dict]: The position's new current_position, avg_buy_price and
+            realized_pnl (so callers need no follow-up read), or None on failure
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self._write_cursor() as cursor:
+                # Take the write lock up front so the read-modify-write below is
+                # atomic and never has to upgrade a read lock mid-transaction
+                cursor.execute("BEGIN IMMEDIATE")
 
-            # Get current position
-            cursor.execute("""
-                SELECT current_position, total_bought, total_sold, avg_buy_price,
-                       total_buy_value, total_sell_value, realized_pnl, first_trade_at
-                FROM positions
-                WHERE address = ? AND token_id = ?
-            """, (address, token_id))
+                # Get current position
+                cursor.execute("""
+                    SELECT current_position, total_bought, total_sold, avg_buy_price,
+                           total_buy_value, total_sell_value, realized_pnl, first_trade_at
+                    FROM positions
+                    WHERE address = ? AND token_id = ?
+                """, (address, token_id))
 
-            row = cursor.fetchone()
-            now = datetime.utcnow().isoformat()
+                row = cursor.fetchone()
+                now = now_iso()
+
+                if row:
+                    current_pos, total_bought, total_sold, avg_buy_price, \
+                    total_buy_value, total_sell_value, realized_pnl, first_trade_at = row
+                else:
+                    # New positions start from zero and take the same arithmetic path
+                    current_pos = total_bought = total_sold = 0
+                    total_buy_value = total_sell_value = realized_pnl = 0
+                    avg_buy_price = None
 
-            if row:
-                # Update existing position
-                current_pos, total_bought, total_sold, avg_buy_price, \
-                total_buy_value, total_sell_value, realized_pnl, first_trade_at = row
+                amount_u = _to_micro(amount)
+                price_u = _to_micro(price)
+                position_u = _to_micro(current_pos)
+                bought_u = _to_micro(total_bought)
+                sold_u = _to_micro(total_sold)
+                buy_value_u = _to_micro(total_buy_value)
+                sell_value_u = _to_micro(total_sell_value)
+                pnl_u = _to_micro(realized_pnl)
+                trade_value_u = _mul_micro(amount_u, price_u)
 
                 if side == 'buy':
-                    new_position = current_pos + amount
-                    new_total_bought = total_bought + amount
-                    new_total_buy_value = total_buy_value + (amount * price)
-                    new_avg_buy_price = new_total_buy_value / new_total_bought if new_total_bought > 0 else 0
-                    new_total_sold = total_sold
-                    new_total_sell_value = total_sell_value
-                    new_realized_pnl = realized_pnl
-                else:  # sell
-                    new_position = current_pos - amount
-                    new_total_sold = total_sold + amount
-                    new_total_sell_value = total_sell_value + (amount * price)
+                    position_u += amount_u
+                    bought_u += amount_u
+                    buy_value_u += trade_value_u
+                    new_avg_buy_price = buy_value_u / bought_u if bought_u > 0 else 0
+                else:  # sell (unusual to start with a sell, but handle it)
+                    position_u -= amount_u
+                    sold_u += amount_u
+                    sell_value_u += trade_value_u
                     # Calculate realized PnL for this sale
                     if avg_buy_price:
-                        new_realized_pnl = realized_pnl + (amount * (price - avg_buy_price))
-                    else:
-                        new_realized_pnl = realized_pnl
-                    new_total_bought = total_bought
-                    new_total_buy_value = total_buy_value
+                        pnl_u += _mul_micro(amount_u, price_u - _to_micro(avg_buy_price))
                     new_avg_buy_price = avg_buy_price
 
-                # Determine status
-                if new_position <= 0.0001:  # Close enough to zero (accounting for floating point)
-                    new_position = 0
-                    status = 'closed'
-                else:
-                    status = 'active'
-
-                cursor.execute("""
-                    UPDATE positions
-                    SET current_position = ?,
-                        total_bought = ?,
-                        total_sold = ?,
-                        avg_buy_price = ?,
-                        total_buy_value = ?,
-                        total_sell_value = ?,
-                        realized_pnl = ?,
-                        last_trade_at = ?,
-                        status = ?,
-                        updated_at = ?,
-                        market_id = COALESCE(?, market_id)
-                    WHERE address = ? AND token_id = ?
-                """, (new_position, new_total_bought, new_total_sold, new_avg_buy_price,
-                      new_total_buy_value, new_total_sell_value, new_realized_pnl,
-                      timestamp, status, now, market_id, address, token_id))
-
-            else:
-                # Create new position
-                if side == 'buy':
-                    current_pos = amount
-                    total_bought = amount
-                    total_sold = 0
-                    avg_buy_price = price
-                    total_buy_value = amount * price
-                    total_sell_value = 0
-                    realized_pnl = 0
-                else:  # sell (unusual to start with a sell, but handle it)
-                    current_pos = -amount
-                    total_bought = 0
-                    total_sold = amount
-                    avg_buy_price = None
-                    total_buy_value = 0
-                    total_sell_value = amount * price
-                    realized_pnl = 0
+                new_position = position_u / MICRO
+                new_total_bought = bought_u / MICRO
+                new_total_sold = sold_u / MICRO
+                new_total_buy_value = buy_value_u / MICRO
+                new_total_sell_value = sell_value_u / MICRO
+                new_realized_pnl = pnl_u / MICRO
+
+                if row:
+                    # Determine status (exact in micro-units, no float tolerance needed)
+                    if position_u <= 0:
+                        new_position = 0
+                        status = 'closed'
+                    else:
+                        status = 'active'
+
+                    cursor.execute("""
+                        UPDATE positions
+                        SET current_position = ?,
+                            total_bought = ?,
+                            total_sold = ?,
+                            avg_buy_price = ?,
+                            total_buy_value = ?,
+                            total_sell_value = ?,
+                            realized_pnl = ?,
+                            last_trade_at = ?,
+                            status = ?,
+                            updated_at = ?,
+                            market_id = COALESCE(?, market_id)
+                        WHERE address = ? AND token_id = ?
+                    """, (new_position, new_total_bought, new_total_sold, new_avg_buy_price,
+                          new_total_buy_value, new_total_sell_value, new_realized_pnl,
+                          timestamp, status, now, market_id, address, token_id))
 
-                cursor.execute("""
-                    INSERT INTO positions (
-                        address, token_id, market_id, current_position,
-                        total_bought, total_sold, avg_buy_price,
-                        total_buy_value, total_sell_value, realized_pnl,
-                        first_trade_at, last_trade_at, status,
-                        created_at, updated_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (address, token_id, market_id, current_pos,
-                      total_bought, total_sold, avg_buy_price,
-                      total_buy_value, total_sell_value, realized_pnl,
-                      timestamp, timestamp, 'active', now, now))
-
-            conn.commit()
-            conn.close()
-            return True
+                else:
+                    # Create new position (a first sell keeps its negative balance)
+                    cursor.execute("""
+                        INSERT INTO positions (
+                            address, token_id, market_id, current_position,
+                            total_bought, total_sold, avg_buy_price,
+                            total_buy_value, total_sell_value, realized_pnl,
+                            first_trade_at, last_trade_at, status,
+                            created_at, updated_at
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (address, token_id, market_id, new_position,
+                          new_total_bought, new_total_sold, new_avg_buy_price,
+                          new_total_buy_value, new_total_sell_value, new_realized_pnl,
+                          timestamp, timestamp, 'active', now, now))
+
+                updated = (new_position, new_avg_buy_price, new_realized_pnl)
+
+                cursor.execute("COMMIT")
+            return dict(zip(('current_position', 'avg_buy_price', 'realized_pnl'), updated))
 
         except Exception as e:
             logger.error(f"Failed to update position: {e}")
-            return False
+            return None
 
     def check_settlement(self, address: str, token_id: str, price: float, timestamp: int) -> Optional[str]:
         """
@@ -498,39 +965,35 @@ class DatabaseManager:
             timestamp: Settlement timestamp
 
         Returns:
-            Optional[str]: Settlement type ('win', 'loss', None if not a settlement)
-        """
-        settlement_type = None
-
-        # Detect settlement based on price
-        if price >= 0.95:
-            settlement_type = 'win'
-            settlement_price = 1.0
-        elif price <= 0.05:
-            settlement_type = 'loss'
-            settlement_price = 0.0
-        else:
+            Optional[str]: Settlement type ('win', 'loss', None if not a settlement
+            or there is no position to settle)
+        """
+        # Cheap precheck so mid-range prices never touch the database
+        if 0.05 < price < 0.95:
             return None  # Not a settlement
 
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            now = datetime.utcnow().isoformat()
-
-            cursor.execute("""
-                UPDATE positions
-                SET status = ?,
-                    settled_at = ?,
-                    settlement_price = ?,
-                    settlement_type = ?,
-                    updated_at = ?
-                WHERE address = ? AND token_id = ?
-            """, (f'settled_{settlement_type}', timestamp, settlement_price,
-                  settlement_type, now, address, token_id))
-
-            conn.commit()
-            conn.close()
-
+            with self._write_cursor() as cursor:
+                # Thresholds are repeated in SQL so the statement is a no-op for
+                # non-settlements and RETURNING tells us whether a row changed
+                cursor.execute("""
+                    UPDATE positions
+                    SET status = CASE WHEN :price >= 0.95 THEN 'settled_win' ELSE 'settled_loss' END,
+                        settled_at = :ts,
+                        settlement_price = CASE WHEN :price >= 0.95 THEN 1.0 ELSE 0.0 END,
+                        settlement_type = CASE WHEN :price >= 0.95 THEN 'win' ELSE 'loss' END,
+                        updated_at = :now
+                    WHERE address = :address AND token_id = :token_id
+                      AND (:price >= 0.95 OR :price <= 0.05)
+                    RETURNING settlement_type, settlement_price
+                """, {'price': price, 'ts': timestamp, 'now': now_iso(),
+                      'address': address, 'token_id': token_id})
+                row = cursor.fetchone()
+
+            if row is None:
+                return None  # No position to settle
+
+            settlement_type, settlement_price = row
             logger.info(f"📊 Position settled ({settlement_type.upper()}): {token_id[:10]}... at ${settlement_price}")
             return settlement_type
 
@@ -538,6 +1001,42 @@ class DatabaseManager:
             logger.error(f"Failed to mark settlement: {e}")
             return None
 
+    def _get_cached_positions(self, key: tuple) -> Optional[List[Dict]]:
+        """
+        Look up a cached positions result for this thread
+
+        The cache is dropped whenever PRAGMA data_version on the reader
+        connection changes, i.e. after any commit by the writer connection
+        or another process.
+
+        Args:
+            key: (query kind, address filter)
+
+        Returns:
+            Copy of the cached rows, or None on a miss
+        """
+        version = self._reader().execute("PRAGMA data_version").fetchone()[0]
+        if getattr(self._local, 'pos_version', None) != version:
+            self._local.pos_version = version
+            self._local.pos_cache = {}
+            return None
+
+        cached = self._local.pos_cache.get(key)
+        return [dict(p) for p in cached] if cached is not None else None
+
+    def _cache_positions(self, key: tuple, rows: List[Dict]):
+        """
+        Store a positions result in this thread's cache
+
+        Args:
+            key: (query kind, address filter)
+            rows: Rows returned to the caller (copied before storing)
+        """
+        cache = self._local.pos_cache
+        if len(cache) >= _POSITIONS_CACHE_SIZE:
+            cache.clear()
+        cache[key] = [dict(p) for p in rows]
+
     def get_active_positions(self, address: str = None) -> List[Dict]:
         """
         Get all active positions (current_position > 0)
@@ -549,9 +1048,13 @@ class DatabaseManager:
             List of position dictionaries
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cache_key = ('active', address)
+            cached = self._get_cached_positions(cache_key)
+            if cached is not None:
+                return cached
+
+            cursor = self._reader().cursor()
+            cursor.row_factory = sqlite3.Row
 
             if address:
                 cursor.execute("""
@@ -566,10 +1069,11 @@ class DatabaseManager:
                     ORDER BY last_trade_at DESC
                 """)
 
-            rows = cursor.fetchall()
-            conn.close()
+            # Build dicts straight off the cursor so Row objects are freed as we go
+            rows = [dict(row) for row in cursor]
+            self._cache_positions(cache_key, rows)
 
-            return [dict(row) for row in rows]
+            return rows
 
         except Exception as e:
             logger.error(f"Failed to get active positions: {e}")
@@ -587,9 +1091,8 @@ class DatabaseManager:
             Position dictionary or None
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._reader().cursor()
+            cursor.row_factory = sqlite3.Row
 
             cursor.execute("""
                 SELECT * FROM positions
@@ -597,7 +1100,6 @@ class DatabaseManager:
             """, (address, token_id))
 
             row = cursor.fetchone()
-            conn.close()
 
             return dict(row) if row else None
 
@@ -616,9 +1118,13 @@ class DatabaseManager:
             List of position dictionaries
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cache_key = ('all', address)
+            cached = self._get_cached_positions(cache_key)
+            if cached is not None:
+                return cached
+
+            cursor = self._reader().cursor()
+            cursor.row_factory = sqlite3.Row
 
             if address:
                 cursor.execute("""
@@ -632,10 +1138,11 @@ class DatabaseManager:
                     ORDER BY last_trade_at DESC
                 """)
 
-            rows = cursor.fetchall()
-            conn.close()
+            # Build dicts straight off the cursor so Row objects are freed as we go
+            rows = [dict(row) for row in cursor]
+            self._cache_positions(cache_key, rows)
 
-            return [dict(row) for row in rows]
+            return rows
 
         except Exception as e:
             logger.error(f"Failed to get all positions: {e}")
@@ -653,20 +1160,22 @@ class DatabaseManager:
             List of incomplete position dictionaries with trade metadata
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._reader().cursor()
+            cursor.row_factory = sqlite3.Row
 
             # Build query
+            # Aggregate trades once per (address, token) instead of two
+            # correlated subqueries per position row
             query = """
-                SELECT p.*,
-                       (SELECT COUNT(*) FROM trades t
-                        WHERE t.from_address = p.address
-                        AND t.token_id = p.token_id) as trade_count,
-                       (SELECT MIN(timestamp) FROM trades t
-                        WHERE t.from_address = p.address
-                        AND t.token_id = p.token_id) as first_trade_ts
+                SELECT p.*, t.trade_count, t.first_trade_ts
                 FROM positions p
+                LEFT JOIN (
+                    SELECT from_address, token_id,
+                           COUNT(*) AS trade_count,
+                           MIN(timestamp) AS first_trade_ts
+                    FROM trades
+                    GROUP BY from_address, token_id
+                ) t ON t.from_address = p.address AND t.token_id = p.token_id
                 WHERE (p.total_sold > p.total_bought + 0.01
                        OR (p.total_bought = 0 AND p.total_sold > 0))
                   AND (p.is_complete IS NULL OR p.is_complete = 0)
@@ -680,8 +1189,7 @@ class DatabaseManager:
             else:
                 cursor.execute(query + " ORDER BY p.updated_at DESC")
 
-            positions = [dict(row) for row in cursor.fetchall()]
-            conn.close()
+            positions = [dict(row) for row in cursor]
 
             return positions
 
@@ -699,19 +1207,14 @@ class DatabaseManager:
             success: True if backfill found missing trades, False if not found after 7 days
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                UPDATE positions
-                SET backfill_attempted = 1,
-                    backfill_date = ?,
-                    is_complete = ?
-                WHERE address = ? AND token_id = ?
-            """, (datetime.utcnow().isoformat(), 1 if success else 0, address, token_id))
-
-            conn.commit()
-            conn.close()
+            with self._write_cursor() as cursor:
+                cursor.execute("""
+                    UPDATE positions
+                    SET backfill_attempted = 1,
+                        backfill_date = ?,
+                        is_complete = ?
+                    WHERE address = ? AND token_id = ?
+                """, (now_iso(), 1 if success else 0, address, token_id))
 
             status = "COMPLETE" if success else "INCOMPLETE (>7 days old)"
             logger.info(f"✓ Position marked as {status}: {address[:10]}.../{token_id[:16]}...")
@@ -729,7 +1232,8 @@ class DatabaseManager:
         order_id: str = None,
         status: str = 'pending',
         error_message: str = None,
-        trade_type: str = 'TAKER'
+        trade_type: str = 'TAKER',
+        original_trade_id: int = None
     ) -> bool:
         """
         Save a copy trade order record
@@ -744,40 +1248,74 @@ class DatabaseManager:
             status: 'pending', 'success', or 'failed'
             error_message: Error message if failed
             trade_type: 'TAKER' (主动交易) or 'MAKER' (挂单被执行)
+            original_trade_id: trades.id of the original trade, if known
 
         Returns:
             bool: True if save successful
         """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            now = datetime.utcnow().isoformat()
+        return self.save_copy_orders_batch([{
+            'original_tx_hash': original_tx_hash,
+            'token_id': token_id,
+            'side': side,
+            'amount': amount,
+            'price': price,
+            'order_id': order_id,
+            'status': status,
+            'error_message': error_message,
+            'trade_type': trade_type,
+            'original_trade_id': original_trade_id,
+        }]) == 1
+
+    def save_copy_orders_batch(self, orders: List[Dict]) -> int:
+        """
+        Save many copy trade order records in a single transaction (one commit)
 
-            executed_at = now if status in ('success', 'failed') else None
+        Args:
+            orders: List of dicts keyed like save_copy_order's arguments
+                (status defaults to 'pending', trade_type to 'TAKER')
 
-            cursor.execute("""
-                INSERT INTO copy_orders (
-                    original_tx_hash, token_id, side, amount, price,
-                    order_id, status, error_message, created_at, executed_at, trade_type
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                original_tx_hash, token_id, side, amount, price,
-                order_id, status, error_message, now, executed_at, trade_type
+        Returns:
+            int: Number of orders saved (0 if the transaction failed)
+        """
+        if not orders:
+            return 0
+
+        now = now_iso()
+        rows = []
+        for order in orders:
+            status = order.get('status', 'pending')
+            rows.append((
+                order.get('original_tx_hash'), order['token_id'], order['side'],
+                order['amount'], order['price'], order.get('order_id'), status,
+                order.get('error_message'), now,
+                now if status in ('success', 'failed') else None,
+                order.get('trade_type', 'TAKER'), order.get('original_trade_id')
             ))
 
-            conn.commit()
-            conn.close()
+        try:
+            with self._write_cursor() as cursor:
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.executemany("""
+                    INSERT INTO copy_orders (
+                        original_tx_hash, token_id, side, amount, price,
+                        order_id, status, error_message, created_at, executed_at, trade_type,
+                        original_trade_id
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                cursor.execute("COMMIT")
+            self._copy_stats_cache = None
 
-            if status == 'success':
-                logger.info(f"✓ Copy order saved: {side} {amount} @ ${price:.4f}")
-            else:
-                logger.warning(f"✗ Copy order failed: {error_message}")
+        except Exception as e:
+            logger.error(f"Failed to save copy orders: {e}")
+            return 0
 
-            return True
+        for order in orders:
+            if order.get('status') == 'success':
+                logger.info(f"✓ Copy order saved: {order['side']} {order['amount']} @ ${order['price']:.4f}")
+            else:
+                logger.warning(f"✗ Copy order failed: {order.get('error_message')}")
 
-        except Exception as e:
-            logger.error(f"Failed to save copy order: {e}")
-            return False
+        return len(rows)
 
     def get_copy_orders(self, status: str = None, limit: int = 100) -> List[Dict]:
         """
@@ -791,9 +1329,8 @@ class DatabaseManager:
             List of copy order dictionaries
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._reader().cursor()
+            cursor.row_factory = sqlite3.Row
 
             if status:
                 cursor.execute("""
@@ -809,10 +1346,10 @@ class DatabaseManager:
                     LIMIT ?
                 """, (limit,))
 
-            rows = cursor.fetchall()
-            conn.close()
+            # Build dicts straight off the cursor so Row objects are freed as we go
+            rows = [dict(row) for row in cursor]
 
-            return [dict(row) for row in rows]
+            return rows
 
         except Exception as e:
             logger.error(f"Failed to get copy orders: {e}")
@@ -825,34 +1362,34 @@ class DatabaseManager:
         Returns:
             Dictionary with success/failure counts and rates
         """
+        if (self._copy_stats_cache is not None
+                and time.monotonic() - self._copy_stats_ts < _STATS_CACHE_TTL):
+            return dict(self._copy_stats_cache)
+
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self._reader().cursor()
 
+            # One row per status, counted straight off idx_copy_orders_status
             cursor.execute("""
-                SELECT
-                    COUNT(*) as total,
-                    SUM(CASE WHEN status = 'success' THEN 1 ELSE 0 END) as success_count,
-                    SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed_count,
-                    SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) as pending_count
-                FROM copy_orders
+                SELECT status, COUNT(*) FROM copy_orders GROUP BY status
             """)
+            counts = dict(cursor.fetchall())
 
-            row = cursor.fetchone()
-            conn.close()
-
-            total = row[0] or 0
-            success = row[1] or 0
-            failed = row[2] or 0
-            pending = row[3] or 0
+            total = sum(counts.values())
+            success = counts.get('success', 0)
+            failed = counts.get('failed', 0)
+            pending = counts.get('pending', 0)
 
-            return {
+            stats = {
                 'total': total,
                 'success': success,
                 'failed': failed,
                 'pending': pending,
                 'success_rate': (success / total * 100) if total > 0 else 0
             }
+            self._copy_stats_cache = stats
+            self._copy_stats_ts = time.monotonic()
+            return dict(stats)
 
         except Exception as e:
             logger.error(f"Failed to get copy order stats: {e}")
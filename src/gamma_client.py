@@ -4,18 +4,47 @@ Fetches market metadata from Gamma API
 """
 import logging
 import httpx
-import json
-from typing import Dict, List, Optional
+import orjson
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
 from datetime import datetime
 
+try:
+    import h2  # noqa: F401  httpx needs h2 for HTTP/2
+    _HTTP2 = True
+except ImportError:  # Fall back to HTTP/1.1
+    _HTTP2 = False
+
 logger = logging.getLogger(__name__)
 
 
+def _hex_to_int(token_id: str) -> int:
+    """
+    Convert a hexadecimal token ID (with or without 0x prefix) to an integer
+
+    Args:
+        token_id: Hexadecimal token ID
+
+    Returns:
+        Integer value of the token ID
+
+    Raises:
+        ValueError: If token_id is not valid hex
+    """
+    digits = token_id[2:] if token_id[:2] in ('0x', '0X') else token_id
+    if not digits:
+        raise ValueError(f"empty hex token_id: {token_id!r}")
+    if len(digits) % 2:
+        digits = '0' + digits  # bytes.fromhex needs whole bytes
+    return int.from_bytes(bytes.fromhex(digits), 'big')
+
+
 class GammaClient:
     """Client for Polymarket Gamma Markets API"""
 
     BASE_URL = "https://gamma-api.polymarket.com"
     MARKETS_ENDPOINT = f"{BASE_URL}/markets"
+    MAX_CONCURRENT_BATCHES = 8  # Parallel batch requests to stay polite to the API
 
     def __init__(self, timeout: int = 30):
         """
@@ -28,11 +57,23 @@ class GammaClient:
         # Explicitly bypass proxy - Gamma API should always go direct
         # This prevents issues when HTTP_PROXY is set for copy trading
         # Use mounts to force direct transport without proxy
+        # Keep connections alive between batches so each request skips the
+        # TCP/TLS handshake; pool sized well above MAX_CONCURRENT_BATCHES.
+        # With HTTP/2 the parallel batches multiplex over one connection
+        transport = httpx.HTTPTransport(
+            http2=_HTTP2,
+            retries=1,
+            limits=httpx.Limits(
+                max_keepalive_connections=32,
+                max_connections=32,
+                keepalive_expiry=60
+            )
+        )
         self.client = httpx.Client(
             timeout=timeout,
-            mounts={'all://': httpx.HTTPTransport()}  # Force direct connection
+            mounts={'all://': transport}  # Force direct connection
         )
-        logger.info("Gamma API client initialized (direct connection)")
+        logger.info(f"Gamma API client initialized (direct connection, {'HTTP/2' if _HTTP2 else 'HTTP/1.1'})")
 
     def get_market_by_token_id(self, token_id: str) -> Optional[Dict]:
         """
@@ -46,7 +87,7 @@ class GammaClient:
         """
         try:
             # Convert hex token_id to decimal
-            token_id_int = int(token_id, 16)
+            token_id_int = _hex_to_int(token_id)
 
             # Query Gamma API
             params = {
@@ -58,7 +99,7 @@ class GammaClient:
             response = self.client.get(self.MARKETS_ENDPOINT, params=params)
             response.raise_for_status()
 
-            markets = response.json()
+            markets = orjson.loads(response.content)
             if markets and len(markets) > 0:
                 market = markets[0]
                 logger.info(f"Found market: {market.get('question', 'N/A')[:50]}...")
@@ -91,7 +132,7 @@ class GammaClient:
             response = self.client.get(self.MARKETS_ENDPOINT, params=params)
             response.raise_for_status()
 
-            markets = response.json()
+            markets = orjson.loads(response.content)
             if markets and len(markets) > 0:
                 # Return the first active market
                 for market in markets:
@@ -107,33 +148,48 @@ class GammaClient:
             logger.error(f"Error fetching market for condition_id {condition_id}: {e}")
             return None
 
-    def _parse_market(self, market_data: Dict, specific_token_id: Optional[str] = None) -> Dict:
+    def _parse_market(self, market_data: Dict, specific_token_id: Optional[str] = None,
+                      specific_token_dec: Optional[str] = None,
+                      preparsed: Optional[Dict] = None) -> Dict:
         """
         Parse and extract relevant market information
 
         Args:
             market_data: Raw market data from Gamma API
             specific_token_id: Specific token ID to determine outcome
+            specific_token_dec: Decimal form of specific_token_id, if already known
+            preparsed: Already-decoded 'outcomes' / 'clob_token_ids' / 'outcome_prices'
+                lists, used instead of decoding the raw JSON strings again
 
         Returns:
             Parsed market dictionary
         """
         try:
-            # Parse outcomes and token IDs
-            outcomes = json.loads(market_data.get('outcomes', '[]'))
-            clob_token_ids_str = market_data.get('clobTokenIds', '[]')
-            clob_token_ids = json.loads(clob_token_ids_str) if clob_token_ids_str else []
+            # Parse outcomes and token IDs (fields are JSON-encoded strings, may be empty)
+            preparsed = preparsed or {}
+            outcomes = preparsed.get('outcomes')
+            if outcomes is None:
+                outcomes_str = market_data.get('outcomes')
+                outcomes = orjson.loads(outcomes_str) if outcomes_str else []
+            clob_token_ids = preparsed.get('clob_token_ids')
+            if clob_token_ids is None:
+                clob_token_ids_str = market_data.get('clobTokenIds')
+                clob_token_ids = orjson.loads(clob_token_ids_str) if clob_token_ids_str else []
 
             # Parse outcome prices
-            outcome_prices = json.loads(market_data.get('outcomePrices', '[]'))
+            outcome_prices = preparsed.get('outcome_prices')
+            if outcome_prices is None:
+                outcome_prices_str = market_data.get('outcomePrices')
+                outcome_prices = orjson.loads(outcome_prices_str) if outcome_prices_str else []
 
             # Determine which outcome this token_id represents
             outcome_index = None
             outcome_name = None
             if specific_token_id:
-                token_id_int = int(specific_token_id, 16)
+                if specific_token_dec is None:
+                    specific_token_dec = str(_hex_to_int(specific_token_id))
                 try:
-                    outcome_index = clob_token_ids.index(str(token_id_int))
+                    outcome_index = clob_token_ids.index(specific_token_dec)
                     if outcome_index < len(outcomes):
                         outcome_name = outcomes[outcome_index]
                 except (ValueError, IndexError):
@@ -176,12 +232,37 @@ class GammaClient:
             logger.error(f"Error parsing market data: {e}")
             return {}
 
-    def batch_get_markets(self, token_ids: List[str]) -> Dict[str, Dict]:
+    def _fetch_batch(self, batch: List[str]) -> List[Dict]:
+        """
+        Fetch the raw markets for one batch of decimal token IDs
+
+        Args:
+            batch: Decimal token ID strings
+
+        Returns:
+            List of raw market dictionaries from the API
+        """
+        # Build params with multiple clob_token_ids parameters
+        # Format: ?clob_token_ids=ID1&clob_token_ids=ID2&...
+        params = [('clob_token_ids', token_id) for token_id in batch]
+        params.append(('limit', str(len(batch) * 2)))  # Allow room for multi-outcome markets
+
+        logger.info(f"Batch querying {len(batch)} token IDs...")
+        response = self.client.get(self.MARKETS_ENDPOINT, params=params)
+        response.raise_for_status()
+
+        return orjson.loads(response.content)
+
+    def batch_get_markets(self, token_ids: List[str],
+                          on_batch: Optional[Callable[[Dict[str, Dict]], None]] = None) -> Dict[str, Dict]:
         """
         Batch fetch market data for multiple token IDs
 
         Args:
             token_ids: List of hexadecimal token IDs
+            on_batch: Optional callback invoked with each batch's token_id -> market
+                data as soon as that batch completes, so callers can start
+                processing before the remaining batches return
 
         Returns:
             Dictionary mapping token_id -> market data
@@ -193,7 +274,7 @@ class GammaClient:
         token_id_map = {}  # decimal -> hex
         for token_id in token_ids:
             try:
-                token_id_int = int(token_id, 16)
+                token_id_int = _hex_to_int(token_id)
                 token_id_decimals.append(str(token_id_int))
                 token_id_map[str(token_id_int)] = token_id
             except ValueError:
@@ -202,38 +283,66 @@ class GammaClient:
         # Batch query (API supports multiple clob_token_ids parameters)
         # Note: We'll query in batches to avoid URL length limits
         batch_size = 20  # Smaller batch to avoid URL length issues
-        for i in range(0, len(token_id_decimals), batch_size):
-            batch = token_id_decimals[i:i+batch_size]
-
-            try:
-                # Build params with multiple clob_token_ids parameters
-                # Format: ?clob_token_ids=ID1&clob_token_ids=ID2&...
-                params = [('clob_token_ids', token_id) for token_id in batch]
-                params.append(('limit', str(len(batch) * 2)))  # Allow room for multi-outcome markets
-
-                logger.info(f"Batch querying {len(batch)} token IDs...")
-                response = self.client.get(self.MARKETS_ENDPOINT, params=params)
-                response.raise_for_status()
-
-                markets = response.json()
-
-                # Map markets back to token IDs
-                for market in markets:
-                    market_token_ids = json.loads(market.get('clobTokenIds', '[]'))
-                    for token_id_dec in batch:
-                        if token_id_dec in market_token_ids:
-                            token_id_hex = token_id_map[token_id_dec]
-                            results[token_id_hex] = self._parse_market(market, token_id_hex)
-
-            except Exception as e:
-                logger.error(f"Error in batch query: {e}")
-                # Fall back to individual queries on error
-                logger.info("Falling back to individual queries...")
-                for token_id_hex in [token_id_map[tid] for tid in batch if tid in token_id_map]:
-                    if token_id_hex not in results:
-                        market_data = self.get_market_by_token_id(token_id_hex)
-                        if market_data:
-                            results[token_id_hex] = market_data
+        batches = [token_id_decimals[i:i+batch_size]
+                   for i in range(0, len(token_id_decimals), batch_size)]
+        if not batches:
+            return results
+
+        # Batches are independent network round-trips, so issue them concurrently
+        max_workers = min(self.MAX_CONCURRENT_BATCHES, len(batches))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self._fetch_batch, batch): batch for batch in batches}
+
+            for future in as_completed(futures):
+                batch = futures[future]
+                batch_results = {}
+                try:
+                    markets = future.result()
+
+                    # Map markets back to token IDs with a dict lookup per outcome token;
+                    # the market's JSON fields are decoded at most once, however many
+                    # of its outcome tokens were requested
+                    for market in markets:
+                        market_token_ids = orjson.loads(market.get('clobTokenIds') or '[]')
+                        preparsed = None
+                        for token_id_dec in market_token_ids:
+                            token_id_hex = token_id_map.get(token_id_dec)
+                            if (token_id_hex and token_id_hex not in results
+                                    and token_id_hex not in batch_results):
+                                if preparsed is None:
+                                    outcomes_str = market.get('outcomes')
+                                    prices_str = market.get('outcomePrices')
+                                    preparsed = {
+                                        'clob_token_ids': market_token_ids,
+                                        'outcomes': orjson.loads(outcomes_str) if outcomes_str else [],
+                                        'outcome_prices': orjson.loads(prices_str) if prices_str else [],
+                                    }
+                                batch_results[token_id_hex] = self._parse_market(
+                                    market, token_id_hex, specific_token_dec=token_id_dec,
+                                    preparsed=preparsed
+                                )
+
+                except Exception as e:
+                    logger.error(f"Error in batch query: {e}")
+                    # Fall back to individual queries on error, only for tokens
+                    # still unresolved, issued concurrently
+                    failed = [token_id_map[tid] for tid in batch
+                              if token_id_map[tid] not in results
+                              and token_id_map[tid] not in batch_results]
+                    if failed:
+                        logger.info(f"Falling back to {len(failed)} individual queries...")
+                        with ThreadPoolExecutor(
+                            max_workers=min(self.MAX_CONCURRENT_BATCHES, len(failed))
+                        ) as fallback_executor:
+                            for token_id_hex, market_data in zip(
+                                failed, fallback_executor.map(self.get_market_by_token_id, failed)
+                            ):
+                                if market_data:
+                                    batch_results[token_id_hex] = market_data
+
+                results.update(batch_results)
+                if on_batch and batch_results:
+                    on_batch(batch_results)
 
         logger.info(f"Successfully fetched {len(results)}/{len(token_ids)} markets")
         return results
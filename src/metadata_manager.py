@@ -4,13 +4,101 @@ Handles fetching and storing market metadata from Gamma API
 """
 import sqlite3
 import logging
-import json
+import orjson
+import queue
+import threading
+import time
+from collections import OrderedDict
 from typing import List, Dict, Optional, Set
 from pathlib import Path
 from gamma_client import GammaClient
+from database import now_iso
 
 logger = logging.getLogger(__name__)
 
+# Token ids seen in trades that have no token_outcomes row yet.
+# Set difference over the token_id indexes; EXCEPT also de-duplicates.
+MISSING_TOKENS_SQL = """
+    SELECT token_id FROM trades
+    WHERE token_id IS NOT NULL AND token_id != ''
+    EXCEPT
+    SELECT token_id FROM token_outcomes
+"""
+
+PENDING_TOKENS_SQL = "SELECT token_id FROM pending_tokens"
+
+PENDING_TOKEN_DELETE_SQL = "DELETE FROM pending_tokens WHERE token_id = ?"
+
+ALL_TOKENS_SQL = """
+    SELECT DISTINCT token_id FROM trades
+    WHERE token_id IS NOT NULL AND token_id != ''
+"""
+
+_MARKET_COLUMNS = """
+        m.market_id, m.condition_id, m.question, m.slug,
+        m.description, m.outcomes, m.outcome_prices,
+        m.category, m.image, m.icon, m.end_date,
+        m.volume, m.liquidity, m.active, m.closed,
+        m.event_title,
+        o.outcome_index, o.outcome_name
+"""
+
+MARKET_FOR_TOKEN_SQL = f"""
+    SELECT {_MARKET_COLUMNS}
+    FROM token_outcomes o
+    JOIN markets m ON o.market_id = m.market_id
+    WHERE o.token_id = ?
+"""
+
+# Same columns for many tokens at once, prefixed by the token_id;
+# {} is filled with one placeholder per token
+MARKETS_FOR_TOKENS_SQL = f"""
+    SELECT o.token_id, {_MARKET_COLUMNS}
+    FROM token_outcomes o
+    JOIN markets m ON o.market_id = m.market_id
+    WHERE o.token_id IN ({{}})
+"""
+
+# Tokens per IN (...) query, well under SQLite's bound-variable limit
+MARKETS_QUERY_CHUNK = 500
+
+# Seconds a get_metadata_stats() result is reused; trades are written by
+# another connection, so saves here can't invalidate it on their own
+STATS_CACHE_TTL = 5.0
+TOKEN_CACHE_SIZE = 10000         # Max get_market_for_token results kept in memory
+BACKFILL_FLUSH_SIZE = 200       # Markets per backfill write transaction
+BACKFILL_FLUSH_INTERVAL = 1.0   # Max seconds fetched markets wait before being saved
+
+MARKET_UPSERT_SQL = """
+    INSERT INTO markets (
+        market_id, condition_id, question, slug, description,
+        outcomes, outcome_prices, clob_token_ids, category,
+        image, icon, start_date, end_date, volume, liquidity,
+        active, closed, event_slug, event_title, neg_risk,
+        market_type, fetched_at, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(market_id) DO UPDATE SET
+        question=excluded.question,
+        description=excluded.description,
+        outcome_prices=excluded.outcome_prices,
+        volume=excluded.volume,
+        liquidity=excluded.liquidity,
+        active=excluded.active,
+        closed=excluded.closed,
+        updated_at=excluded.updated_at
+"""
+
+# Every outcome token of a market; a known outcome name always wins, so a
+# row saved earlier with a wrong or missing name gets corrected
+TOKEN_UPSERT_SQL = """
+    INSERT INTO token_outcomes (
+        token_id, market_id, condition_id, outcome_index, outcome_name, created_at
+    ) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(token_id) DO UPDATE SET
+        outcome_name=excluded.outcome_name
+    WHERE excluded.outcome_name IS NOT NULL
+"""
+
 
 class MetadataManager:
     """Manages market metadata storage and backfilling"""
@@ -29,72 +117,139 @@ class MetadataManager:
         # Ensure database exists
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
 
+        # One connection for the lifetime of the manager; the lock keeps
+        # statements from different threads from interleaving on it
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=256)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA mmap_size=268435456")
+        self.conn.execute("PRAGMA cache_size=-65536")
+        self._lock = threading.Lock()
+
+        # get_metadata_stats() cache, cleared whenever metadata is saved
+        self._stats_cache: Optional[Dict] = None
+        self._stats_ts = 0.0
+
+        # get_market_for_token() LRU, entries dropped when their market is saved
+        self._token_cache: OrderedDict = OrderedDict()
+
         self._init_metadata_table()
 
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self.conn.close()
+
+    def invalidate(self, token_id: str):
+        """
+        Drop a cached get_market_for_token result
+
+        Args:
+            token_id: Token ID whose cached market info is stale
+        """
+        with self._lock:
+            self._token_cache.pop(token_id, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     def _init_metadata_table(self):
         """Initialize markets metadata table"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # Create markets table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS markets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    market_id TEXT UNIQUE NOT NULL,
-                    condition_id TEXT,
-                    question TEXT,
-                    slug TEXT,
-                    description TEXT,
-                    outcomes TEXT,
-                    outcome_prices TEXT,
-                    clob_token_ids TEXT,
-                    category TEXT,
-                    image TEXT,
-                    icon TEXT,
-                    start_date TEXT,
-                    end_date TEXT,
-                    volume REAL,
-                    liquidity REAL,
-                    active INTEGER,
-                    closed INTEGER,
-                    event_slug TEXT,
-                    event_title TEXT,
-                    neg_risk INTEGER,
-                    market_type TEXT,
-                    fetched_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL,
-                    UNIQUE(market_id)
-                )
-            """)
-
-            # Create index on condition_id for faster lookups
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_condition_id ON markets(condition_id)
-            """)
-
-            # Create token_outcomes table to map token_id -> market + outcome
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS token_outcomes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    token_id TEXT UNIQUE NOT NULL,
-                    market_id TEXT NOT NULL,
-                    condition_id TEXT,
-                    outcome_index INTEGER,
-                    outcome_name TEXT,
-                    created_at TEXT NOT NULL,
-                    FOREIGN KEY (market_id) REFERENCES markets(market_id),
-                    UNIQUE(token_id)
-                )
-            """)
+            with self._lock:
+                cursor = self.conn.cursor()
 
-            # Create index on token_id for fast lookups
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_token_id ON token_outcomes(token_id)
-            """)
+                # Create markets table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS markets (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        market_id TEXT UNIQUE NOT NULL,
+                        condition_id TEXT,
+                        question TEXT,
+                        slug TEXT,
+                        description TEXT,
+                        outcomes TEXT,
+                        outcome_prices TEXT,
+                        clob_token_ids TEXT,
+                        category TEXT,
+                        image TEXT,
+                        icon TEXT,
+                        start_date TEXT,
+                        end_date TEXT,
+                        volume REAL,
+                        liquidity REAL,
+                        active INTEGER,
+                        closed INTEGER,
+                        event_slug TEXT,
+                        event_title TEXT,
+                        neg_risk INTEGER,
+                        market_type TEXT,
+                        fetched_at TEXT NOT NULL,
+                        updated_at TEXT NOT NULL,
+                        UNIQUE(market_id)
+                    )
+                """)
+
+                # Create index on condition_id for faster lookups
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_condition_id ON markets(condition_id)
+                """)
 
-            conn.commit()
-            conn.close()
+                # Create token_outcomes table to map token_id -> market + outcome
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS token_outcomes (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        token_id TEXT UNIQUE NOT NULL,
+                        market_id TEXT NOT NULL,
+                        condition_id TEXT,
+                        outcome_index INTEGER,
+                        outcome_name TEXT,
+                        created_at TEXT NOT NULL,
+                        FOREIGN KEY (market_id) REFERENCES markets(market_id),
+                        UNIQUE(token_id)
+                    )
+                """)
+
+                # Create index on token_id for fast lookups
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_token_id ON token_outcomes(token_id)
+                """)
+
+                # Queue of traded token_ids still lacking metadata, filled by a
+                # trigger on trades so finding them never has to scan trades
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS pending_tokens (
+                        token_id TEXT PRIMARY KEY
+                    )
+                """)
+                trades_exists = cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trades'"
+                ).fetchone() is not None
+                trigger_exists = cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trades_pending_tokens'"
+                ).fetchone() is not None
+
+                if trades_exists and not trigger_exists:
+                    cursor.execute("""
+                        CREATE TRIGGER trades_pending_tokens AFTER INSERT ON trades
+                        WHEN NEW.token_id IS NOT NULL AND NEW.token_id != ''
+                         AND NOT EXISTS (SELECT 1 FROM token_outcomes WHERE token_id = NEW.token_id)
+                        BEGIN
+                            INSERT OR IGNORE INTO pending_tokens (token_id) VALUES (NEW.token_id);
+                        END
+                    """)
+                    # Seed with tokens traded before the trigger existed
+                    cursor.execute("INSERT OR IGNORE INTO pending_tokens (token_id) " + MISSING_TOKENS_SQL)
+                    logger.info("✓ Created pending_tokens trigger on trades")
+
+                # Without a trades table there is nothing feeding the queue yet
+                self._use_pending_tokens = trades_exists
+
+                self.conn.commit()
             logger.info("✓ Metadata tables initialized")
 
         except Exception as e:
@@ -112,102 +267,153 @@ class MetadataManager:
         Returns:
             bool: True if saved successfully
         """
+        now = now_iso()
+
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            from datetime import datetime
-            now = datetime.utcnow().isoformat()
-
-            # Insert or update market
-            cursor.execute("""
-                INSERT INTO markets (
-                    market_id, condition_id, question, slug, description,
-                    outcomes, outcome_prices, clob_token_ids, category,
-                    image, icon, start_date, end_date, volume, liquidity,
-                    active, closed, event_slug, event_title, neg_risk,
-                    market_type, fetched_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(market_id) DO UPDATE SET
-                    question=excluded.question,
-                    description=excluded.description,
-                    outcome_prices=excluded.outcome_prices,
-                    volume=excluded.volume,
-                    liquidity=excluded.liquidity,
-                    active=excluded.active,
-                    closed=excluded.closed,
-                    updated_at=excluded.updated_at
-            """, (
-                market_data.get('market_id'),
-                market_data.get('condition_id'),
-                market_data.get('question'),
-                market_data.get('slug'),
-                market_data.get('description'),
-                json.dumps(market_data.get('outcomes', [])),
-                json.dumps(market_data.get('outcome_prices', [])),
-                json.dumps(market_data.get('clob_token_ids', [])),
-                market_data.get('category'),
-                market_data.get('image'),
-                market_data.get('icon'),
-                market_data.get('start_date'),
-                market_data.get('end_date'),
-                market_data.get('volume'),
-                market_data.get('liquidity'),
-                1 if market_data.get('active') else 0,
-                1 if market_data.get('closed') else 0,
-                market_data.get('event_slug'),
-                market_data.get('event_title'),
-                1 if market_data.get('neg_risk') else 0,
-                market_data.get('market_type'),
-                now,
+            # The connection is shared with other threads: commit or roll back
+            # only this write, while holding the lock
+            with self._lock:
+                with self.conn:
+                    cursor = self.conn.cursor()
+
+                    # Insert or update market
+                    cursor.execute(MARKET_UPSERT_SQL, self._market_row(market_data, now))
+
+                    # Save every outcome token of this market in one call
+                    token_rows = self._token_rows(market_data, token_id, now)
+                    cursor.executemany(TOKEN_UPSERT_SQL, token_rows)
+
+                    # These tokens now have metadata
+                    saved_tokens = [(row[0],) for row in token_rows]
+                    cursor.executemany(PENDING_TOKEN_DELETE_SQL, saved_tokens)
+                for (saved_token,) in saved_tokens:
+                    self._token_cache.pop(saved_token, None)
+            self._stats_cache = None
+
+            logger.info(f"✓ Saved metadata for market: {market_data.get('market_id')} - {market_data.get('question', 'N/A')[:50]}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to save market metadata: {e}")
+            return False
+
+    @staticmethod
+    def _market_row(market_data: Dict, now: str) -> tuple:
+        """
+        Build the MARKET_UPSERT_SQL parameters for one market
+
+        Boolean flags are bound as-is: bool is an int subclass, so sqlite3
+        stores True/False as 1/0 without an adapter.
+
+        Args:
+            market_data: Parsed market data from GammaClient
+            now: Timestamp for fetched_at/updated_at
+
+        Returns:
+            Parameter tuple
+        """
+        return (
+            market_data.get('market_id'),
+            market_data.get('condition_id'),
+            market_data.get('question'),
+            market_data.get('slug'),
+            market_data.get('description'),
+            orjson.dumps(market_data.get('outcomes', [])).decode(),
+            orjson.dumps(market_data.get('outcome_prices', [])).decode(),
+            orjson.dumps(market_data.get('clob_token_ids', [])).decode(),
+            market_data.get('category'),
+            market_data.get('image'),
+            market_data.get('icon'),
+            market_data.get('start_date'),
+            market_data.get('end_date'),
+            market_data.get('volume'),
+            market_data.get('liquidity'),
+            market_data.get('active', False),
+            market_data.get('closed', False),
+            market_data.get('event_slug'),
+            market_data.get('event_title'),
+            market_data.get('neg_risk', False),
+            market_data.get('market_type'),
+            now,
+            now
+        )
+
+    @staticmethod
+    def _token_rows(market_data: Dict, token_id: Optional[str], now: str) -> List[tuple]:
+        """
+        Build TOKEN_UPSERT_SQL parameters for every outcome token of a market
+
+        Args:
+            market_data: Parsed market data from GammaClient
+            token_id: Token ID that triggered the fetch, if any
+            now: Timestamp for created_at
+
+        Returns:
+            List of parameter tuples
+        """
+        market_id = market_data.get('market_id')
+        condition_id = market_data.get('condition_id')
+        outcomes = market_data.get('outcomes', [])
+        rows = [
+            # Convert decimal back to hex
+            (hex(int(token_id_dec)), market_id, condition_id, idx,
+             outcomes[idx] if idx < len(outcomes) else None, now)
+            for idx, token_id_dec in enumerate(market_data.get('clob_token_ids', []))
+        ]
+
+        # The triggering token is normally one of the rows above; keep it
+        # separately only if its hex spelling differs
+        if token_id and market_data.get('outcome_index') is not None \
+                and all(row[0] != token_id for row in rows):
+            rows.append((
+                token_id,
+                market_id,
+                condition_id,
+                market_data.get('outcome_index'),
+                market_data.get('outcome_name'),
                 now
             ))
+        return rows
 
-            # If we have token_id and outcome info, save token mapping
-            if token_id and market_data.get('outcome_index') is not None:
-                cursor.execute("""
-                    INSERT INTO token_outcomes (
-                        token_id, market_id, condition_id, outcome_index, outcome_name, created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(token_id) DO UPDATE SET
-                        outcome_name=excluded.outcome_name
-                """, (
-                    token_id,
-                    market_data.get('market_id'),
-                    market_data.get('condition_id'),
-                    market_data.get('outcome_index'),
-                    market_data.get('outcome_name'),
-                    now
-                ))
-
-            # Also save all token IDs from this market
-            for idx, token_id_dec in enumerate(market_data.get('clob_token_ids', [])):
-                # Convert decimal back to hex
-                token_id_hex = hex(int(token_id_dec))
-                outcome_name = market_data.get('outcomes', [])[idx] if idx < len(market_data.get('outcomes', [])) else None
+    def save_market_metadata_batch(self, items: List[tuple], now: Optional[str] = None) -> bool:
+        """
+        Save metadata for many markets in a single transaction
 
-                cursor.execute("""
-                    INSERT INTO token_outcomes (
-                        token_id, market_id, condition_id, outcome_index, outcome_name, created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(token_id) DO NOTHING
-                """, (
-                    token_id_hex,
-                    market_data.get('market_id'),
-                    market_data.get('condition_id'),
-                    idx,
-                    outcome_name,
-                    now
-                ))
-
-            conn.commit()
-            conn.close()
+        Args:
+            items: List of (market_data, token_id) pairs, as passed to save_market_metadata
+            now: Timestamp stamped on every row (defaults to current UTC time)
 
-            logger.info(f"✓ Saved metadata for market: {market_data.get('market_id')} - {market_data.get('question', 'N/A')[:50]}")
+        Returns:
+            bool: True if saved successfully
+        """
+        if not items:
+            return True
+
+        now = now or now_iso()
+
+        market_rows = []
+        token_rows = []
+        for market_data, token_id in items:
+            market_rows.append(self._market_row(market_data, now))
+            token_rows.extend(self._token_rows(market_data, token_id, now))
+
+        try:
+            with self._lock:
+                with self.conn:
+                    cursor = self.conn.cursor()
+                    cursor.executemany(MARKET_UPSERT_SQL, market_rows)
+                    cursor.executemany(TOKEN_UPSERT_SQL, token_rows)
+                    saved_tokens = [(row[0],) for row in token_rows]
+                    cursor.executemany(PENDING_TOKEN_DELETE_SQL, saved_tokens)
+                for (saved_token,) in saved_tokens:
+                    self._token_cache.pop(saved_token, None)
+            self._stats_cache = None
+
+            logger.info(f"✓ Saved metadata for {len(market_rows)} markets")
             return True
 
         except Exception as e:
-            logger.error(f"Failed to save market metadata: {e}")
+            logger.error(f"Failed to save market metadata batch: {e}")
             return False
 
     def get_missing_token_ids(self) -> List[str]:
@@ -218,21 +424,13 @@ class MetadataManager:
             List of token_ids needing metadata
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # Find token_ids in trades that are not in token_outcomes
-            cursor.execute("""
-                SELECT DISTINCT t.token_id
-                FROM trades t
-                LEFT JOIN token_outcomes o ON t.token_id = o.token_id
-                WHERE o.token_id IS NULL
-                  AND t.token_id IS NOT NULL
-                  AND t.token_id != ''
-            """)
-
-            rows = cursor.fetchall()
-            conn.close()
+            with self._lock:
+                cursor = self.conn.cursor()
+
+                # Find token_ids in trades that are not in token_outcomes
+                cursor.execute(PENDING_TOKENS_SQL if self._use_pending_tokens else MISSING_TOKENS_SQL)
+
+                rows = cursor.fetchall()
 
             token_ids = [row[0] for row in rows]
             logger.info(f"Found {len(token_ids)} token_ids missing metadata")
@@ -253,18 +451,15 @@ class MetadataManager:
             Dictionary with stats: {'success': int, 'failed': int, 'skipped': int}
         """
         stats = {'success': 0, 'failed': 0, 'skipped': 0, 'total': 0}
+        now = now_iso()
 
         try:
             # Get token_ids to process
             if force_refresh:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT DISTINCT token_id FROM trades
-                    WHERE token_id IS NOT NULL AND token_id != ''
-                """)
-                rows = cursor.fetchall()
-                conn.close()
+                with self._lock:
+                    cursor = self.conn.cursor()
+                    cursor.execute(ALL_TOKENS_SQL)
+                    rows = cursor.fetchall()
                 token_ids = [row[0] for row in rows]
             else:
                 token_ids = self.get_missing_token_ids()
@@ -280,19 +475,28 @@ class MetadataManager:
             logger.info(f"Token IDs to process: {len(token_ids)}")
             logger.info("=" * 60)
 
-            # Batch fetch markets
+            # Fetch and save concurrently: each Gamma batch is handed to a
+            # writer thread as soon as it returns, so SQLite commits overlap
+            # with the remaining network round-trips
+            save_queue = queue.Queue()
+            writer = threading.Thread(
+                target=self._backfill_writer, args=(save_queue, stats, now),
+                name="metadata-backfill-writer", daemon=True
+            )
+            writer.start()
+
             logger.info("Fetching market data from Gamma API...")
-            market_data_map = self.gamma_client.batch_get_markets(token_ids)
+            try:
+                market_data_map = self.gamma_client.batch_get_markets(
+                    token_ids,
+                    on_batch=lambda batch: save_queue.put(list(batch.items()))
+                )
+            finally:
+                save_queue.put(None)
+                writer.join()
 
-            # Save to database
             for token_id in token_ids:
-                if token_id in market_data_map:
-                    market_data = market_data_map[token_id]
-                    if self.save_market_metadata(market_data, token_id):
-                        stats['success'] += 1
-                    else:
-                        stats['failed'] += 1
-                else:
+                if token_id not in market_data_map:
                     logger.warning(f"No market data found for token_id: {token_id}")
                     stats['failed'] += 1
 
@@ -309,6 +513,42 @@ class MetadataManager:
             logger.error(f"Error during metadata backfill: {e}")
             return stats
 
+    def _backfill_writer(self, save_queue: queue.Queue, stats: Dict[str, int], now: str):
+        """
+        Drain fetched (token_id, market_data) pairs and save them in batches
+
+        Flushes every BACKFILL_FLUSH_SIZE markets or BACKFILL_FLUSH_INTERVAL
+        seconds, and exits after a None sentinel.
+
+        Args:
+            save_queue: Queue of lists of (token_id, market_data) pairs
+            stats: Backfill stats dict, updated with success/failed counts
+            now: Timestamp stamped on every saved row
+        """
+        pending = []
+        deadline = time.monotonic() + BACKFILL_FLUSH_INTERVAL
+        done = False
+
+        while not done:
+            try:
+                chunk = save_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if chunk is None:
+                    done = True
+                else:
+                    pending.extend((market_data, token_id) for token_id, market_data in chunk)
+            except queue.Empty:
+                pass
+
+            if pending and (done or len(pending) >= BACKFILL_FLUSH_SIZE
+                            or time.monotonic() >= deadline):
+                if self.save_market_metadata_batch(pending, now=now):
+                    stats['success'] += len(pending)
+                else:
+                    stats['failed'] += len(pending)
+                pending = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + BACKFILL_FLUSH_INTERVAL
+
     def get_market_for_token(self, token_id: str) -> Optional[Dict]:
         """
         Get market metadata for a specific token_id
@@ -320,53 +560,101 @@ class MetadataManager:
             Dictionary with market and outcome info, or None
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                SELECT
-                    m.market_id, m.condition_id, m.question, m.slug,
-                    m.description, m.outcomes, m.outcome_prices,
-                    m.category, m.image, m.icon, m.end_date,
-                    m.volume, m.liquidity, m.active, m.closed,
-                    m.event_title,
-                    o.outcome_index, o.outcome_name
-                FROM token_outcomes o
-                JOIN markets m ON o.market_id = m.market_id
-                WHERE o.token_id = ?
-            """, (token_id,))
-
-            row = cursor.fetchone()
-            conn.close()
-
-            if row:
-                return {
-                    'market_id': row[0],
-                    'condition_id': row[1],
-                    'question': row[2],
-                    'slug': row[3],
-                    'description': row[4],
-                    'outcomes': json.loads(row[5]) if row[5] else [],
-                    'outcome_prices': json.loads(row[6]) if row[6] else [],
-                    'category': row[7],
-                    'image': row[8],
-                    'icon': row[9],
-                    'end_date': row[10],
-                    'volume': row[11],
-                    'liquidity': row[12],
-                    'active': bool(row[13]),
-                    'closed': bool(row[14]),
-                    'event_title': row[15],
-                    'outcome_index': row[16],
-                    'outcome_name': row[17]
-                }
-            else:
-                return None
+            with self._lock:
+                cached = self._token_cache.get(token_id)
+                if cached is not None:
+                    self._token_cache.move_to_end(token_id)
+                    return dict(cached)
+
+                cursor = self.conn.cursor()
+
+                cursor.execute(MARKET_FOR_TOKEN_SQL, (token_id,))
+
+                row = cursor.fetchone()
+                if not row:
+                    return None
+
+                market = self._market_from_row(row)
+                self._cache_market(token_id, market)
+
+            return dict(market)
 
         except Exception as e:
             logger.error(f"Error getting market for token_id {token_id}: {e}")
             return None
 
+    def get_markets_for_tokens(self, token_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Get market metadata for many token_ids with one query per chunk
+
+        Cached tokens are served from memory; the rest are looked up with a
+        single IN (...) query instead of one query per token.
+
+        Args:
+            token_ids: Token IDs to lookup (duplicates and empty ids are ignored)
+
+        Returns:
+            Dictionary mapping token_id to market and outcome info; tokens
+            without metadata are left out
+        """
+        markets = {}
+        try:
+            with self._lock:
+                missing = []
+                for token_id in dict.fromkeys(filter(None, token_ids)):
+                    cached = self._token_cache.get(token_id)
+                    if cached is not None:
+                        self._token_cache.move_to_end(token_id)
+                        markets[token_id] = dict(cached)
+                    else:
+                        missing.append(token_id)
+
+                cursor = self.conn.cursor()
+                for i in range(0, len(missing), MARKETS_QUERY_CHUNK):
+                    chunk = missing[i:i + MARKETS_QUERY_CHUNK]
+                    cursor.execute(
+                        MARKETS_FOR_TOKENS_SQL.format(','.join('?' * len(chunk))), chunk
+                    )
+                    for row in cursor.fetchall():
+                        market = self._market_from_row(row[1:])
+                        self._cache_market(row[0], market)
+                        markets[row[0]] = dict(market)
+
+        except Exception as e:
+            logger.error(f"Error getting markets for {len(token_ids)} token_ids: {e}")
+
+        return markets
+
+    @staticmethod
+    def _market_from_row(row: tuple) -> Dict:
+        """Build a market info dict from a _MARKET_COLUMNS row"""
+        return {
+            'market_id': row[0],
+            'condition_id': row[1],
+            'question': row[2],
+            'slug': row[3],
+            'description': row[4],
+            'outcomes': orjson.loads(row[5]) if row[5] else [],
+            'outcome_prices': orjson.loads(row[6]) if row[6] else [],
+            'category': row[7],
+            'image': row[8],
+            'icon': row[9],
+            'end_date': row[10],
+            'volume': row[11],
+            'liquidity': row[12],
+            'active': bool(row[13]),
+            'closed': bool(row[14]),
+            'event_title': row[15],
+            'outcome_index': row[16],
+            'outcome_name': row[17]
+        }
+
+    def _cache_market(self, token_id: str, market: Dict):
+        """Remember a looked-up market in the token LRU (caller holds self._lock)"""
+        self._token_cache[token_id] = market
+        if len(self._token_cache) > TOKEN_CACHE_SIZE:
+            self._token_cache.popitem(last=False)
+
     def get_metadata_stats(self) -> Dict:
         """
         Get statistics about metadata coverage
@@ -374,37 +662,42 @@ class MetadataManager:
         Returns:
             Dictionary with coverage stats
         """
+        if self._stats_cache is not None and time.monotonic() - self._stats_ts < STATS_CACHE_TTL:
+            return dict(self._stats_cache)
+
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self._lock:
+                cursor = self.conn.cursor()
 
-            # Count trades
-            cursor.execute("SELECT COUNT(*) FROM trades WHERE token_id IS NOT NULL AND token_id != ''")
-            total_trades = cursor.fetchone()[0]
+                # Count trades
+                cursor.execute("SELECT COUNT(*) FROM trades WHERE token_id IS NOT NULL AND token_id != ''")
+                total_trades = cursor.fetchone()[0]
 
-            # Count unique token_ids in trades
-            cursor.execute("SELECT COUNT(DISTINCT token_id) FROM trades WHERE token_id IS NOT NULL AND token_id != ''")
-            unique_tokens = cursor.fetchone()[0]
+                # Count unique token_ids in trades
+                cursor.execute("SELECT COUNT(DISTINCT token_id) FROM trades WHERE token_id IS NOT NULL AND token_id != ''")
+                unique_tokens = cursor.fetchone()[0]
 
-            # Count token_ids with metadata
-            cursor.execute("SELECT COUNT(*) FROM token_outcomes")
-            tokens_with_metadata = cursor.fetchone()[0]
+                # Count token_ids with metadata
+                cursor.execute("SELECT COUNT(*) FROM token_outcomes")
+                tokens_with_metadata = cursor.fetchone()[0]
 
-            # Count markets
-            cursor.execute("SELECT COUNT(*) FROM markets")
-            total_markets = cursor.fetchone()[0]
+                # Count markets
+                cursor.execute("SELECT COUNT(*) FROM markets")
+                total_markets = cursor.fetchone()[0]
 
-            conn.close()
 
             coverage_pct = (tokens_with_metadata / unique_tokens * 100) if unique_tokens > 0 else 0
 
-            return {
+            stats = {
                 'total_trades': total_trades,
                 'unique_tokens': unique_tokens,
                 'tokens_with_metadata': tokens_with_metadata,
                 'total_markets': total_markets,
                 'coverage_percent': round(coverage_pct, 2)
             }
+            self._stats_cache = stats
+            self._stats_ts = time.monotonic()
+            return dict(stats)
 
         except Exception as e:
             logger.error(f"Error getting metadata stats: {e}")
@@ -2,19 +2,30 @@
 Transaction monitor for Polymarket trades - Optimized with eth_getLogs
 """
 import logging
+import math
 import os
+import random
+import re
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Set, Dict, Optional
+from typing import List, Dict, Optional
+from hexbytes import HexBytes
 from web3 import Web3
 from monitor_events import EventDecoder
 from metadata_manager import MetadataManager
 from gamma_client import GammaClient
 from trading_executor import TradingExecutor
 from clash_proxy_manager import get_proxy_manager
+from tx_bloom import RotatingBloomFilter
 
 logger = logging.getLogger(__name__)
 
+# Proxy/connection failures that warrant a Clash health check (one case-insensitive scan)
+_CONNECTION_ERROR_RE = re.compile(r"proxy|connection|ssl|timeout|refused", re.IGNORECASE)
+
 
 class PolymarketMonitor:
     """Monitor Polymarket trades for specific addresses using eth_getLogs"""
@@ -34,6 +45,30 @@ class PolymarketMonitor:
     MAX_REASONABLE_AMOUNT = 1000000.0  # Maximum reasonable token amount (after decimals)
     MIN_REASONABLE_AMOUNT = 0.000001  # Minimum reasonable token amount
 
+    # Processed tx hashes per Bloom filter generation (two are kept); older
+    # duplicates are still rejected by the trades.tx_hash UNIQUE constraint
+    MAX_PROCESSED_TXS = 100_000
+
+    # Block number -> timestamp entries kept so trades in a recent block reuse it
+    MAX_BLOCK_TS_CACHE = 4096
+
+    # eth_getLogs latency bounds for adaptive range sizing: ranges only grow
+    # while queries stay fast, and shrink once a query gets slow
+    FAST_LOG_QUERY_SECONDS = 2.0
+    SLOW_LOG_QUERY_SECONDS = 10.0
+
+    # Largest eth_getLogs chunk for single-wallet backfill queries
+    BACKFILL_CHUNK_BLOCKS = 10_000
+
+    # Upper bound (seconds) for the exponential backoff after loop errors
+    MAX_ERROR_BACKOFF = 300
+
+    # Size of an Ethereum logs Bloom filter in bits (m=2048, 3 bits per item)
+    BLOOM_BITS = 2048
+
+    # Trades older than this (seconds since their block) are not copied
+    MAX_COPY_DELAY_SECONDS = 300
+
     def __init__(
         self,
         rpc_manager,
@@ -72,10 +107,17 @@ class PolymarketMonitor:
         # Configuration
         self.poll_interval = config.get('poll_interval', 60)
         self.batch_size = config.get('batch_size', 100)
+        self.max_batch_size = max(config.get('max_batch_size', 2000), self.batch_size)
         self.request_delay = config.get('request_delay', 0.1)
         self.use_rolling_window = config.get('use_rolling_window', True)
         self.window_hours = config.get('window_hours', 24)
         self.max_consecutive_errors = config.get('max_consecutive_errors', 5)
+        self.use_log_filter = config.get('use_log_filter', True)
+        self.parallel_contracts = config.get('parallel_contracts', False)
+        self.use_bloom_prefilter = config.get('use_bloom_prefilter', False)
+        # Let the node filter by wallet topic when the watchlist is small enough
+        # for providers' topic OR-array limits (0 disables)
+        self.topic_filter_max_addresses = config.get('topic_filter_max_addresses', 20)
 
         # Initialize event decoder
         self.event_decoder = EventDecoder(self.w3, self.POLYMARKET_CONTRACTS[1])
@@ -84,7 +126,30 @@ class PolymarketMonitor:
         self.last_block_processed: Optional[int] = None
         self.start_block: Optional[int] = None
         self.is_running = False
-        self.processed_txs: Set[str] = set()  # Track processed transactions to avoid duplicates
+        self.processed_txs = RotatingBloomFilter(self.MAX_PROCESSED_TXS)  # Raw 32-byte hashes of processed txs
+        self._log_filter_id: Optional[str] = None  # eth_newFilter ID once caught up
+        self._block_ts_cache: OrderedDict = OrderedDict()  # block number -> timestamp
+        # (from_block, to_block, future) of the next eth_getLogs range, fetched
+        # in the background while the current batch is being processed
+        self._prefetched: Optional[tuple] = None
+        # Single worker for per-trade follow-up work (metadata, positions, copy
+        # trading) and checkpoints, so they run in order off the monitor thread
+        self._post_processor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trade-post")
+        # Lowest block whose trades the worker failed to store, and the epoch
+        # (bumped on every rewind) that queued jobs and checkpoints belong to
+        self._store_lock = threading.Lock()
+        self._store_failed_block: Optional[int] = None
+        self._store_epoch = 0
+        # Constant part of every OrderFilled log query; only the block range varies
+        self._base_filter = {
+            'address': self.POLYMARKET_CONTRACTS,
+            'topics': [self.ORDER_FILLED_SIGNATURE]  # topic[0]: OrderFilled event
+        }
+        # Bloom bit positions of the OrderFilled topic
+        self._bloom_topic_bits = self._bloom_bits(bytes.fromhex(self.ORDER_FILLED_SIGNATURE[2:]))
+        self._recompute_address_caches()
+        # eth_getLogs block range: grows on success, halves when the provider rejects it
+        self._current_batch = min(self.batch_size, rpc_manager.get_max_block_range())
 
         # Initialize copy trading executor
         self.copy_trading_enabled = False
@@ -108,6 +173,27 @@ class PolymarketMonitor:
         logger.info(f"Copy trading: {'ENABLED' if self.copy_trading_enabled else 'DISABLED'}")
         logger.info("=" * 60)
 
+    def _recompute_address_caches(self):
+        """
+        Rebuild every lookup derived from monitored_addresses
+
+        Called from __init__; call it again after changing monitored_addresses
+        at runtime so no stale precomputed values are used.
+        """
+        # Raw 20-byte address -> checksum lookup, matched directly against log topics
+        self._monitored_bytes: Dict[bytes, str] = {
+            bytes.fromhex(addr[2:]): addr for addr in self.monitored_addresses
+        }
+        # Lowercase 40-char hex of each address, matched against raw log topic strings
+        self._monitored_hex = frozenset(addr[2:].lower() for addr in self.monitored_addresses)
+        # Bloom bit positions of each wallet as an indexed (32-byte, left-padded) topic
+        self._bloom_wallet_bits = [
+            self._bloom_bits(bytes(12) + addr_bytes) for addr_bytes in self._monitored_bytes
+        ]
+        # Maker / taker topic filters for node-side filtering
+        self._wallet_filters = self._wallet_filter_topics(self.monitored_addresses)
+        self.use_topic_filter = 0 < len(self.monitored_addresses) <= self.topic_filter_max_addresses
+
     def _init_copy_trading(self, config: Dict):
         """
         Initialize copy trading executor from config and environment
@@ -138,7 +224,8 @@ class PolymarketMonitor:
                 min_shares=copy_config.get('min_shares', 5.0),
                 min_usd=copy_config.get('min_usd', 1.0),
                 retry_count=copy_config.get('retry_count', 3),
-                retry_delay=copy_config.get('retry_delay', 2.0)
+                retry_delay=copy_config.get('retry_delay', 2.0),
+                use_price_feed=copy_config.get('price_feed', True)
             )
 
             # Initialize the client
@@ -151,51 +238,67 @@ class PolymarketMonitor:
         except Exception as e:
             logger.error(f"Error initializing copy trading: {e}")
 
-    def _execute_copy_trade(self, trade_data: Dict, tx_hash: str, trade_type: str = 'TAKER'):
+    def _execute_copy_trades(self, copy_requests: List[tuple]):
         """
-        Execute copy trade for a detected trade
+        Execute copy trades for several detected trades concurrently
+
+        Orders go through TradingExecutor.execute_copy_trades_batch, so a batch
+        takes about as long as its slowest order instead of the sum of all.
 
         Args:
-            trade_data: Decoded trade data
-            tx_hash: Original transaction hash
-            trade_type: 'TAKER' (主动交易) or 'MAKER' (挂单被执行)
+            copy_requests: (trade_data, tx_hash, trade_type, original_trade_id, timestamp) tuples
         """
         if not self.copy_trading_enabled or not self.trading_executor:
             logger.debug("[COPY] Copy trading disabled or executor not initialized")
             return
 
-        token_id = trade_data.get('token_id')
-        side = trade_data.get('side')
+        orders = []
+        now = int(time.time())
+        for trade_data, tx_hash, trade_type, original_trade_id, timestamp in copy_requests:
+            token_id = trade_data.get('token_id')
+            side = trade_data.get('side')
 
-        if not token_id or not side:
-            logger.warning("[COPY] Cannot copy trade: missing token_id or side")
-            return
+            # Re-check the signal age: the rest of the batch was processed
+            # (metadata fetches included) since the trade was queued
+            signal_age = now - timestamp
+            if signal_age >= self.MAX_COPY_DELAY_SECONDS:
+                logger.warning(f"[COPY] Skipping stale signal {tx_hash[:10]}... (age: {signal_age}s)")
+                continue
 
-        # Trade type label
-        type_label = "挂单被执行" if trade_type == 'MAKER' else "主动交易"
-        type_emoji = "🏷️" if trade_type == 'MAKER' else "🎯"
+            if not token_id or not side:
+                logger.warning("[COPY] Cannot copy trade: missing token_id or side")
+                continue
 
-        logger.info("=" * 60)
-        logger.info(f"[COPY] 🔄 INITIATING COPY TRADE")
-        logger.info(f"[COPY] {type_emoji} Type: {trade_type} ({type_label})")
-        logger.info(f"[COPY] Original TX: {tx_hash[:20]}...")
-        logger.info(f"[COPY] Token: {token_id[:20]}...")
-        logger.info(f"[COPY] Side: {side}")
-        logger.info("=" * 60)
+            # Trade type label
+            type_label = "挂单被执行" if trade_type == 'MAKER' else "主动交易"
+            type_emoji = "🏷️" if trade_type == 'MAKER' else "🎯"
 
-        result = self.trading_executor.execute_copy_trade(
-            token_id=token_id,
-            side=side,
-            original_tx_hash=tx_hash
-        )
+            logger.info("=" * 60)
+            logger.info(f"[COPY] 🔄 INITIATING COPY TRADE")
+            logger.info(f"[COPY] {type_emoji} Type: {trade_type} ({type_label})")
+            logger.info(f"[COPY] Original TX: {tx_hash[:20]}...")
+            logger.info(f"[COPY] Token: {token_id[:20]}...")
+            logger.info(f"[COPY] Side: {side}")
+            logger.info("=" * 60)
 
-        if result['success']:
-            logger.info(f"[COPY] ✅ COPY SUCCESS: {result['amount']} shares @ ${result['price']:.4f}")
-            logger.info(f"[COPY] Order ID: {result.get('order_id', 'N/A')}")
-        else:
-            logger.error(f"[COPY] ❌ COPY FAILED: {result['error']}")
+            orders.append({
+                'token_id': token_id,
+                'side': side,
+                'original_tx_hash': tx_hash,
+                'original_trade_id': original_trade_id
+            })
 
-        logger.info("=" * 60)
+        if not orders:
+            return
+
+        for result in self.trading_executor.execute_copy_trades_batch(orders):
+            if result.success:
+                logger.info(f"[COPY] ✅ COPY SUCCESS: {result.amount} shares @ ${result.price:.4f}")
+                logger.info(f"[COPY] Order ID: {result.order_id or 'N/A'}")
+            else:
+                logger.error(f"[COPY] ❌ COPY FAILED: {result.error}")
+
+            logger.info("=" * 60)
 
     def start(self, start_block: Optional[int] = None):
         """
@@ -217,17 +320,30 @@ class PolymarketMonitor:
             self.start_block = current_block - blocks_to_subtract
             self.last_block_processed = self.start_block - 1
 
+            # Resume from the saved checkpoint if it falls inside the window,
+            # instead of re-scanning the whole window after a restart
+            checkpoint = self.db_manager.get_monitor_checkpoint()
+            if checkpoint is not None and checkpoint >= self.start_block:
+                self.last_block_processed = checkpoint
+
             logger.info("=" * 60)
             logger.info(f"🕐 {self.window_hours}-HOUR ROLLING WINDOW MODE")
             logger.info("=" * 60)
             logger.info(f"Current block: {current_block}")
             logger.info(f"Window: {self.window_hours} hours ({blocks_to_subtract:,} blocks)")
             logger.info(f"Start block: {self.start_block:,}")
-            logger.info(f"Blocks to sync: {current_block - self.start_block:,}")
+            if self.last_block_processed >= self.start_block:
+                logger.info(f"Resuming from checkpoint block: {self.last_block_processed:,}")
+            logger.info(f"Blocks to sync: {current_block - self.last_block_processed:,}")
             logger.info("=" * 60)
         else:
+            checkpoint = None if start_block else self.db_manager.get_monitor_checkpoint()
             if start_block:
                 self.start_block = start_block
+            elif checkpoint is not None:
+                # Resume right after the last fully processed batch
+                self.start_block = checkpoint + 1
+                logger.info(f"Resuming from checkpoint block: {checkpoint}")
             else:
                 # Try to resume from database
                 db_last_block = self.db_manager.get_latest_block()
@@ -248,9 +364,15 @@ class PolymarketMonitor:
     def stop(self):
         """Stop monitoring"""
         self.is_running = False
+        # Drain queued follow-up work (positions, copy trades, checkpoints)
+        # while the database and the trading executor are still open
+        self._post_processor.shutdown(wait=True)
+        if self.trading_executor:
+            # Flush queued copy-order records before the database is closed
+            self.trading_executor.close()
         logger.info("Monitor stopped")
 
-    def _validate_trade_data(self, trade_data: Dict) -> tuple[bool, List[str]]:
+    def _validate_trade_data(self, trade_data: Dict) -> tuple[bool, List[str], Optional[float], Optional[float]]:
         """
         Validate trade data before saving
 
@@ -258,38 +380,46 @@ class PolymarketMonitor:
             trade_data: Trade data dictionary
 
         Returns:
-            Tuple of (is_valid, list of warnings)
+            Tuple of (is_valid, list of warnings, price, amount); price and amount
+            are the parsed floats (None if not a finite number) so callers
+            don't convert them again
         """
+        price = self._to_finite_float(trade_data.get('price', 0))
+        amount = self._to_finite_float(trade_data.get('amount', 0))
+
+        # Fast path: well-formed trade within expected ranges, nothing to report
+        if (price is not None and amount is not None
+                and self.MIN_REASONABLE_PRICE <= price <= self.MAX_REASONABLE_PRICE
+                and self.MIN_REASONABLE_AMOUNT <= amount <= self.MAX_REASONABLE_AMOUNT
+                and trade_data.get('token_id') and trade_data.get('side')):
+            return True, [], price, amount
+
         warnings = []
         is_valid = True
 
         # Validate price
-        try:
-            price = float(trade_data.get('price', 0))
-            if price > self.MAX_REASONABLE_PRICE:
-                warnings.append(f"Unusually high price: {price:.6f} (max expected: {self.MAX_REASONABLE_PRICE})")
-            elif price < self.MIN_REASONABLE_PRICE and price > 0:
-                warnings.append(f"Unusually low price: {price:.6f} (min expected: {self.MIN_REASONABLE_PRICE})")
-            elif price <= 0:
-                warnings.append(f"Invalid price: {price}")
-                is_valid = False
-        except (ValueError, TypeError):
+        if price is None:
             warnings.append(f"Price is not a valid number: {trade_data.get('price')}")
             is_valid = False
+        elif price > self.MAX_REASONABLE_PRICE:
+            warnings.append(f"Unusually high price: {price:.6f} (max expected: {self.MAX_REASONABLE_PRICE})")
+        elif price < self.MIN_REASONABLE_PRICE and price > 0:
+            warnings.append(f"Unusually low price: {price:.6f} (min expected: {self.MIN_REASONABLE_PRICE})")
+        elif price <= 0:
+            warnings.append(f"Invalid price: {price}")
+            is_valid = False
 
         # Validate amount
-        try:
-            amount = float(trade_data.get('amount', 0))
-            if amount > self.MAX_REASONABLE_AMOUNT:
-                warnings.append(f"Unusually large amount: {amount:.6f} (max expected: {self.MAX_REASONABLE_AMOUNT})")
-            elif amount < self.MIN_REASONABLE_AMOUNT and amount > 0:
-                warnings.append(f"Unusually small amount: {amount:.6f} (min expected: {self.MIN_REASONABLE_AMOUNT})")
-            elif amount <= 0:
-                warnings.append(f"Invalid amount: {amount}")
-                is_valid = False
-        except (ValueError, TypeError):
+        if amount is None:
             warnings.append(f"Amount is not a valid number: {trade_data.get('amount')}")
             is_valid = False
+        elif amount > self.MAX_REASONABLE_AMOUNT:
+            warnings.append(f"Unusually large amount: {amount:.6f} (max expected: {self.MAX_REASONABLE_AMOUNT})")
+        elif amount < self.MIN_REASONABLE_AMOUNT and amount > 0:
+            warnings.append(f"Unusually small amount: {amount:.6f} (min expected: {self.MIN_REASONABLE_AMOUNT})")
+        elif amount <= 0:
+            warnings.append(f"Invalid amount: {amount}")
+            is_valid = False
 
         # Validate required fields
         required_fields = ['token_id', 'side']
@@ -298,7 +428,24 @@ class PolymarketMonitor:
                 warnings.append(f"Missing required field: {field}")
                 is_valid = False
 
-        return is_valid, warnings
+        return is_valid, warnings, price, amount
+
+    @staticmethod
+    def _to_finite_float(value) -> Optional[float]:
+        """
+        Convert a value to float, returning None if it isn't a finite number
+
+        Args:
+            value: Value to convert
+
+        Returns:
+            float or None
+        """
+        try:
+            number = float(value)
+        except (ValueError, TypeError):
+            return None
+        return number if math.isfinite(number) else None
 
     def _monitor_loop(self):
         """Main monitoring loop using eth_getLogs"""
@@ -306,10 +453,22 @@ class PolymarketMonitor:
         loop_count = 0
 
         logger.info("[MONITOR] Starting monitor loop...")
+        log_prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-prefetch")
 
         while self.is_running:
             loop_count += 1
             try:
+                # Go back over blocks whose trades the worker failed to store
+                self._rewind_failed_store()
+
+                # Once caught up, new trades arrive through the log filter and
+                # only the filter's changes are polled - no block range scans
+                if self._log_filter_id is not None:
+                    if self._poll_log_filter():
+                        consecutive_errors = 0
+                        time.sleep(self.poll_interval)
+                        continue
+
                 latest_block = self.rpc_manager.get_latest_block()
 
                 # Check if there are new blocks to process
@@ -317,23 +476,58 @@ class PolymarketMonitor:
                     blocks_behind = latest_block - self.last_block_processed
 
                     # Determine batch size (adaptive)
-                    max_batch = self.rpc_manager.get_max_block_range()
-                    batch_size = min(self.batch_size, max_batch, blocks_behind)
+                    batch_size = min(self._current_batch, blocks_behind)
 
-                    # Process one batch
+                    # Process one batch, using the range prefetched during the
+                    # previous iteration when it starts where we are
                     from_block = self.last_block_processed + 1
-                    to_block = min(from_block + batch_size - 1, latest_block)
+                    prefetched, self._prefetched = self._prefetched, None
+                    if prefetched and prefetched[0] == from_block:
+                        _, to_block, pending = prefetched
+                        batch_size = to_block - from_block + 1
+                    else:
+                        to_block, pending = min(from_block + batch_size - 1, latest_block), None
 
                     logger.info(f"Processing blocks {from_block:,} to {to_block:,} ({to_block - from_block + 1} blocks, {blocks_behind} behind)")
 
-                    # Query trades for all monitored addresses
-                    trades_found = self._query_trades(from_block, to_block)
+                    # Query trades for all monitored addresses; on "range too
+                    # large" style errors halve the range and retry the same blocks
+                    try:
+                        logs, fetch_seconds = pending.result() if pending else self._timed_fetch_logs(from_block, to_block)
+                    except Exception as e:
+                        if self.rpc_manager.is_range_error(e) and self._current_batch > 1:
+                            self._current_batch = max(1, batch_size // 2)
+                            logger.warning(f"[MONITOR] Block range too large ({batch_size}), "
+                                           f"shrinking to {self._current_batch}: {str(e)[:100]}")
+                            continue
+                        raise
+
+                    # Slow query - narrow the next range before the provider starts
+                    # timing out; fast full-size batch - widen it
+                    if fetch_seconds > self.SLOW_LOG_QUERY_SECONDS:
+                        self._current_batch = max(1, batch_size // 2)
+                        logger.info(f"[MONITOR] Log query took {fetch_seconds:.1f}s, "
+                                    f"shrinking range to {self._current_batch} blocks")
+                    elif batch_size == self._current_batch and fetch_seconds < self.FAST_LOG_QUERY_SECONDS:
+                        self._current_batch = min(int(self._current_batch * 1.5) + 1, self.max_batch_size)
+
+                    # While catching up, start fetching the next range now so its
+                    # RPC round-trip overlaps with storing this batch
+                    if to_block < latest_block:
+                        next_from = to_block + 1
+                        next_to = min(next_from + self._current_batch - 1, latest_block)
+                        self._prefetched = (next_from, next_to,
+                                            log_prefetcher.submit(self._timed_fetch_logs, next_from, next_to))
+
+                    trades_found = self._process_logs(logs)
 
                     if trades_found > 0:
                         logger.info(f"✅ Found {trades_found} trades in this batch")
 
-                    # Update last processed block
+                    # Update last processed block and checkpoint it for restarts once
+                    # the batch's queued follow-up work has finished
                     self.last_block_processed = to_block
+                    self._submit_post_processing(self._checkpoint, to_block, self._store_epoch)
 
                     # Reset error counter on success
                     consecutive_errors = 0
@@ -353,11 +547,15 @@ class PolymarketMonitor:
 
                     # If we're caught up, wait for next poll interval
                     if to_block >= latest_block:
+                        if self.use_log_filter:
+                            self._install_log_filter(to_block + 1)
                         logger.debug(f"Caught up to latest block. Waiting {self.poll_interval}s...")
                         time.sleep(self.poll_interval)
 
                 else:
                     # Already caught up, wait for new blocks
+                    if self.use_log_filter:
+                        self._install_log_filter(self.last_block_processed + 1)
                     time.sleep(self.poll_interval)
 
             except KeyboardInterrupt:
@@ -367,14 +565,13 @@ class PolymarketMonitor:
 
             except Exception as e:
                 consecutive_errors += 1
+                self._prefetched = None  # Re-fetch the failed range from scratch
                 logger.error(f"[MONITOR] ❌ Error in loop (attempt {consecutive_errors}/{self.max_consecutive_errors}): {e}")
                 logger.error(f"[MONITOR] Error type: {type(e).__name__}")
 
                 # If copy trading is enabled and this looks like a proxy/connection error,
                 # run Clash health check to try to recover
-                error_lower = str(e).lower()
-                is_connection_error = any(x in error_lower for x in ['proxy', 'connection', 'ssl', 'timeout', 'refused'])
-                if self.copy_trading_enabled and is_connection_error:
+                if self.copy_trading_enabled and _CONNECTION_ERROR_RE.search(str(e)):
                     try:
                         logger.info("[MONITOR] Connection error detected, running Clash health check...")
                         proxy_manager = get_proxy_manager()
@@ -387,140 +584,701 @@ class PolymarketMonitor:
                     self.stop()
                     break
 
-                logger.info(f"[MONITOR] Waiting {self.poll_interval * 2}s before retry...")
-                time.sleep(self.poll_interval * 2)  # Wait longer on error
+                delay = self._error_backoff(e, consecutive_errors)
+                logger.info(f"[MONITOR] Waiting {delay:.1f}s before retry...")
+                time.sleep(delay)
 
+        log_prefetcher.shutdown(wait=False, cancel_futures=True)
+        self._flush_post_processing()
         logger.info(f"[MONITOR] Loop ended after {loop_count} iterations")
 
-    def _query_trades(self, from_block: int, to_block: int) -> int:
+    def _error_backoff(self, error: Exception, consecutive_errors: int) -> float:
+        """
+        Compute how long to wait after a loop error
+
+        Exponential in the number of consecutive errors with random jitter, so
+        several monitors hitting the same rate limit don't retry in lockstep.
+        A provider-supplied wait (HTTP 429 Retry-After, or the backoff_seconds
+        Infura returns with -32005 "limit exceeded") is honoured when longer.
+
+        Args:
+            error: Exception raised by the loop
+            consecutive_errors: Errors in a row, including this one
+
+        Returns:
+            float: Seconds to sleep before retrying
+        """
+        delay = min(self.poll_interval * (2 ** consecutive_errors), self.MAX_ERROR_BACKOFF)
+        delay += random.uniform(0, self.poll_interval)
+
+        requested = None
+        headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+        retry_after = headers.get('Retry-After')
+        if retry_after and retry_after.strip().isdigit():
+            requested = float(retry_after)
+        else:
+            match = re.search(r"backoff_seconds['\"]?\s*:\s*([\d.]+)", str(error))
+            if match:
+                requested = float(match.group(1))
+
+        if requested is not None and requested > delay:
+            delay = min(requested, self.MAX_ERROR_BACKOFF)
+        return delay
+
+    def _query_trades(self, from_block: int, to_block: int, address: Optional[str] = None) -> int:
         """
         Query trades for all monitored addresses using eth_getLogs
-        OPTIMIZED: Query all events once, filter on client-side (reduces from 6 to 2 RPC calls)
+        OPTIMIZED: Query all events once, filter maker and taker on client-side (1 RPC call)
 
         Args:
             from_block: Starting block number
             to_block: Ending block number
+            address: Only query this wallet's trades, filtered by the node
 
         Returns:
             int: Number of trades found
+
+        Raises:
+            Exception: Range errors, so the caller can retry with a smaller range
+        """
+        try:
+            if address:
+                # Backfill windows of one wallet's positions overlap, so let the
+                # RPC manager reuse responses for finalized ranges
+                logs = self._fetch_wallet_logs(self._wallet_filter_topics([address]), from_block, to_block,
+                                               cache=True, max_stride=self.BACKFILL_CHUNK_BLOCKS)
+            elif self.use_bloom_prefilter and to_block > from_block:
+                logs = []
+                for run_from, run_to in self._bloom_hit_ranges(from_block, to_block):
+                    logs.extend(self._fetch_logs(run_from, run_to))
+            else:
+                logs = self._fetch_logs(from_block, to_block)
+        except Exception as e:
+            if self.rpc_manager.is_range_error(e):
+                raise
+            logger.warning(f"Error querying trade logs: {e}")
+            return 0
+
+        # Wait for the job: backfill callers read positions next and count
+        # only trades that were actually stored
+        return self._process_logs(logs, wait=True)
+
+    @classmethod
+    def _bloom_bits(cls, item: bytes) -> List[tuple]:
+        """
+        Get the (byte index, bit mask) pairs an item sets in a logs Bloom filter
+
+        Args:
+            item: Log address or 32-byte topic
+
+        Returns:
+            List of three (byte index, mask) pairs into the 256-byte Bloom
+        """
+        digest = Web3.keccak(item)
+        bits = []
+        for i in (0, 2, 4):
+            bit = ((digest[i] << 8) | digest[i + 1]) % cls.BLOOM_BITS
+            bits.append((cls.BLOOM_BITS // 8 - 1 - bit // 8, 1 << (bit % 8)))  # big-endian bytes
+        return bits
+
+    @staticmethod
+    def _bloom_contains(bloom: bytes, bits: List[tuple]) -> bool:
+        """Check whether all of an item's Bloom bits are set"""
+        return all(bloom[index] & mask for index, mask in bits)
+
+    def _bloom_hit_ranges(self, from_block: int, to_block: int) -> List[tuple]:
+        """
+        Narrow a block range to the blocks whose header Bloom may hold our trades
+
+        A block can only contain an OrderFilled log for a monitored wallet if its
+        logsBloom has the event topic and that wallet's topic. Bloom filters give
+        false positives but never false negatives, so skipped blocks are safe.
+        Only pays off on sparse historical windows (use_bloom_prefilter option).
+
+        Args:
+            from_block: Starting block number
+            to_block: Ending block number
+
+        Returns:
+            List of (from_block, to_block) runs of consecutive candidate blocks
+        """
+        blooms = self.rpc_manager.get_logs_blooms(list(range(from_block, to_block + 1)))
+
+        runs = []
+        for number in range(from_block, to_block + 1):
+            bloom = blooms[number]
+            if (self._bloom_contains(bloom, self._bloom_topic_bits)
+                    and any(self._bloom_contains(bloom, bits) for bits in self._bloom_wallet_bits)):
+                if runs and runs[-1][1] == number - 1:
+                    runs[-1] = (runs[-1][0], number)
+                else:
+                    runs.append((number, number))
+
+        logger.debug(f"Bloom pre-check: {sum(b - a + 1 for a, b in runs)}/{to_block - from_block + 1} "
+                     f"candidate blocks in {len(runs)} ranges")
+        return runs
+
+    def _timed_fetch_logs(self, from_block: int, to_block: int) -> tuple[List, float]:
+        """
+        Fetch OrderFilled logs and measure how long the query took
+
+        Args:
+            from_block: Starting block number
+            to_block: Ending block number
+
+        Returns:
+            (logs, seconds spent in eth_getLogs)
+        """
+        started = time.monotonic()
+        logs = self._fetch_logs(from_block, to_block)
+        return logs, time.monotonic() - started
+
+    def _fetch_logs(self, from_block: int, to_block: int) -> List:
+        """
+        Fetch all OrderFilled logs in a block range
+
+        Small watchlists are filtered by the node (one query per role);
+        otherwise maker and taker, both indexed topics of the same log, are
+        matched client-side from one unfiltered query.
+
+        Args:
+            from_block: Starting block number
+            to_block: Ending block number
+
+        Returns:
+            List of OrderFilled event logs
+        """
+        if self.use_topic_filter:
+            try:
+                return self._fetch_wallet_logs(self._wallet_filters, from_block, to_block)
+            except Exception as e:
+                if self.rpc_manager.is_range_error(e):
+                    raise
+                # Some providers reject topic OR-arrays - filter client-side instead
+                logger.warning(f"Topic-filtered log queries failed, filtering client-side from now on: {e}")
+                self.use_topic_filter = False
+                self.topic_filter_max_addresses = 0
+
+        if self.parallel_contracts:
+            try:
+                return self._fetch_logs_per_contract(from_block, to_block)
+            except Exception as e:
+                if self.rpc_manager.is_range_error(e):
+                    raise
+                # Likely rate limited by the extra concurrency - go back to one call
+                logger.warning(f"Per-contract log queries failed, using a single query from now on: {e}")
+                self.parallel_contracts = False
+
+        raw_logs = self.rpc_manager.get_logs_raw({**self._base_filter, 'fromBlock': from_block, 'toBlock': to_block})
+        return self._format_monitored_logs(raw_logs)
+
+    @classmethod
+    def _wallet_filter_topics(cls, addresses: List[str]) -> tuple:
+        """
+        Build eth_getLogs topic filters matching wallets as maker or as taker
+
+        Topic filters are ANDed across positions (ORed within one), so maker
+        and taker need one query each.
+
+        Args:
+            addresses: Wallet addresses
+
+        Returns:
+            (maker topics, taker topics)
+        """
+        padded = ['0x' + '00' * 12 + address[2:].lower() for address in addresses]
+        return ([cls.ORDER_FILLED_SIGNATURE, None, padded],
+                [cls.ORDER_FILLED_SIGNATURE, None, None, padded])
+
+    def _fetch_wallet_logs(self, wallet_filters: tuple, from_block: int, to_block: int,
+                           cache: bool = False, max_stride: Optional[int] = None) -> List:
+        """
+        Fetch OrderFilled logs where one of the given wallets is maker or taker
+
+        The wallets are matched by the node through their indexed topics, so
+        the response only holds their fills and far wider block ranges are
+        accepted than for the unfiltered query.
+
+        Args:
+            wallet_filters: Topic filters from _wallet_filter_topics
+            from_block: Starting block number
+            to_block: Ending block number
+            cache: Passed to RPCManager.get_logs_raw
+            max_stride: If given, walk the range with RPCManager.get_logs_range in
+                chunks of at most this many blocks, halving rejected ones, instead
+                of one query per filter that raises range errors to the caller
+
+        Returns:
+            List of OrderFilled event logs in chain order
+        """
+        raw_logs = []
+        for topics in wallet_filters:
+            if max_stride:
+                raw_logs.extend(self.rpc_manager.get_logs_range(
+                    from_block, to_block, addresses=self.POLYMARKET_CONTRACTS, topics=topics,
+                    cache=cache, max_stride=max_stride))
+            else:
+                raw_logs.extend(self.rpc_manager.get_logs_raw({
+                    'address': self.POLYMARKET_CONTRACTS, 'topics': topics,
+                    'fromBlock': from_block, 'toBlock': to_block
+                }, cache=cache))
+
+        # A self-fill appears in both responses
+        unique = {(log['transactionHash'], log['logIndex']): log for log in raw_logs}
+        logs = self._format_monitored_logs(list(unique.values()))
+        logs.sort(key=lambda log: (log['blockNumber'], log['logIndex']))
+        return logs
+
+    def _format_monitored_logs(self, raw_logs: List[Dict]) -> List:
+        """
+        Keep raw logs involving a monitored wallet and convert only those
+
+        Args:
+            raw_logs: Logs from RPCManager.get_logs_raw
+
+        Returns:
+            Formatted logs whose maker or taker topic is a monitored address
+        """
+        monitored = self._monitored_hex
+        format_log = self.rpc_manager.format_log
+        logs = []
+        # topic[2] = maker, topic[3] = taker; the address is the last 40 hex chars.
+        # Comparing string slices against a set avoids decoding every topic to bytes
+        for log in raw_logs:
+            topics = log['topics']
+            if len(topics) > 2 and (topics[2][-40:].lower() in monitored
+                                    or (len(topics) > 3 and topics[3][-40:].lower() in monitored)):
+                logs.append(format_log(log))
+        logger.debug(f"Log query returned {len(raw_logs)} events, {len(logs)} involve monitored addresses")
+        return logs
+
+    def _fetch_logs_per_contract(self, from_block: int, to_block: int) -> List:
+        """
+        Fetch OrderFilled logs with one concurrent eth_getLogs call per contract
+
+        Some providers handle single-address filters much faster than a
+        multi-address one; enabled with the parallel_contracts config option.
+
+        Args:
+            from_block: Starting block number
+            to_block: Ending block number
+
+        Returns:
+            List of OrderFilled event logs in chain order
+        """
+        def _contract_logs(contract: str) -> List:
+            return self._format_monitored_logs(self.rpc_manager.get_logs_raw({
+                **self._base_filter, 'address': contract, 'fromBlock': from_block, 'toBlock': to_block
+            }))
+
+        with ThreadPoolExecutor(max_workers=len(self.POLYMARKET_CONTRACTS)) as executor:
+            logs = [log for contract_logs in executor.map(_contract_logs, self.POLYMARKET_CONTRACTS)
+                    for log in contract_logs]
+
+        # Positions are updated in log order, so restore chain order across contracts
+        logs.sort(key=lambda log: (log['blockNumber'], log['logIndex']))
+        return logs
+
+    def _install_log_filter(self, from_block: int):
+        """
+        Install an OrderFilled log filter starting at from_block
+
+        Falls back to eth_getLogs polling for the rest of the run if the
+        endpoint does not support filters.
+
+        Args:
+            from_block: First block the filter should report
+        """
+        try:
+            self._log_filter_id = self.rpc_manager.new_log_filter({**self._base_filter, 'fromBlock': from_block})
+            logger.info(f"[MONITOR] Caught up - following new trades via log filter from block {from_block:,}")
+        except Exception as e:
+            logger.warning(f"[MONITOR] Log filter unavailable, staying on eth_getLogs polling: {e}")
+            self.use_log_filter = False
+
+    def _poll_log_filter(self) -> bool:
+        """
+        Process logs reported by the log filter since the last poll
+
+        Returns:
+            bool: True on success; False if the filter failed and the caller
+                should re-sync the gap with eth_getLogs
+        """
+        try:
+            logs = self.rpc_manager.get_filter_changes(self._log_filter_id)
+        except Exception as e:
+            # Filter expired or endpoint rotated - re-sync from the last processed
+            # block with eth_getLogs and install a fresh filter once caught up
+            logger.warning(f"[MONITOR] Log filter failed, re-syncing with eth_getLogs: {e}")
+            self._log_filter_id = None
+            return False
+
+        # Logs flagged 'removed' were dropped by a chain reorg
+        logs = [log for log in logs if not log.get('removed')]
+        if logs:
+            trades_found = self._process_logs(logs)
+            if trades_found > 0:
+                logger.info(f"✅ Found {trades_found} trades via log filter")
+            latest_log_block = max(log['blockNumber'] for log in logs)
+            if latest_log_block > self.last_block_processed:
+                self.last_block_processed = latest_log_block
+                self._submit_post_processing(self._checkpoint, latest_log_block, self._store_epoch)
+        return True
+
+    def _process_logs(self, logs: List, wait: bool = False) -> int:
+        """
+        Match OrderFilled logs against monitored addresses and queue storing
+        them, plus their follow-up work, on the post-processing worker
+
+        Args:
+            logs: OrderFilled event logs
+            wait: Wait for the queued job and return the number actually stored
+
+        Returns:
+            int: Number of new trades queued (stored, if wait is True)
+
+        Raises:
+            Exception: If wait is True and the trades could not be stored
         """
         trades_found = 0
+        maker_matches = []  # (log, monitored_address, 'maker')
+        taker_matches = []  # (log, monitored_address, 'taker')
+
+        # Filter logs client-side for our monitored addresses
+        # topic[2] = maker, topic[3] = taker (32 bytes, address is last 20 bytes)
+        # Most logs belong to other wallets: two hashed lookups and move on.
+        # bytes(topic)[12:] copies/slices in C, unlike slicing the HexBytes wrapper
+        monitored = self._monitored_bytes
+        for log in logs:
+            topics = log['topics']
+            if len(topics) < 3:
+                continue
+            maker_address = monitored.get(bytes(topics[2])[12:])
+            taker_address = monitored.get(bytes(topics[3])[12:]) if len(topics) >= 4 else None
+            if maker_address is None and taker_address is None:
+                continue
+
+            if maker_address:
+                maker_matches.append((log, maker_address, 'maker'))
+            if taker_address:
+                taker_matches.append((log, taker_address, 'taker'))
+
+        logger.debug(f"Matching {len(logs)} events, {len(maker_matches)} maker / "
+                     f"{len(taker_matches)} taker matches for our addresses")
+
+        # Maker matches first: a tx is stored once, so the maker record wins when
+        # a monitored address is on both sides
+        matches = maker_matches + taker_matches
+
+        # Skip transactions we've already stored before fetching anything for them,
+        # and keep only the first match per tx (multi-fill txs emit several logs)
+        unique_matches = []
+        seen_in_batch = set()
+        for match in matches:
+            tx_hash = bytes(match[0]['transactionHash'])
+            if tx_hash in seen_in_batch:
+                continue
+            seen_in_batch.add(tx_hash)
+            if not self._is_processed(tx_hash):
+                unique_matches.append(match)
+        matches = unique_matches
+        if not matches:
+            return trades_found
+
+        # Fetch receipt and block timestamp for every match in batched RPC
+        # requests (one round-trip per MAX_BATCH_CALLS) instead of 2 calls per log
+        tx_hashes = list({log['transactionHash']: None for log, _, _ in matches})
+        block_numbers = [n for n in {log['blockNumber']: None for log, _, _ in matches}
+                         if n not in self._block_ts_cache]
+        receipts, timestamps = self.rpc_manager.get_trade_context(tx_hashes, block_numbers)
+        for block_number, block_ts in timestamps.items():
+            self._block_ts_cache[block_number] = block_ts
+        while len(self._block_ts_cache) > self.MAX_BLOCK_TS_CACHE:
+            self._block_ts_cache.popitem(last=False)
+
+        # Decode every match up front so market metadata for all new tokens can
+        # be fetched concurrently instead of one Gamma request per trade
+        decoded = [self._decode_log(log) for log, _, _ in matches]
+        self._prefetch_metadata({trade.get('token_id') for trade in decoded} - {None, ''})
+
+        records = []  # (trade_record, trade_data)
+        for (log, matched_address, role), trade_data in zip(matches, decoded):
+            trade_record = self._build_trade_record(
+                log, matched_address, role,
+                receipt=receipts.get(log['transactionHash']),
+                timestamp=timestamps.get(log['blockNumber']) or self._block_ts_cache.get(log['blockNumber']),
+                trade_data=trade_data
+            )
+            if trade_record:
+                records.append((trade_record, trade_data))
+
+        if not records:
+            return trades_found
+
+        for trade_record, _ in records:
+            self._mark_processed(trade_record['tx_hash'])
+
+        # Storing and follow-up work run as one job on the single
+        # post-processing worker, queued ahead of this range's checkpoint. If
+        # the process dies before the job runs, nothing was stored and the
+        # range is re-scanned on restart; position updates stay sequential
+        # while this thread goes back to fetching logs. Callers that wait
+        # handle a failed insert themselves; otherwise the loop rewinds
+        epoch = None if wait else self._store_epoch
+        future = self._submit_post_processing(self._post_process_trades, records, epoch)
+        if wait:
+            return future.result()
+        return len(records)
+
+    def _post_process_trades(self, records: List[tuple], epoch: Optional[int] = None) -> int:
+        """
+        Store a batch of trades and run their follow-up work (post-processing worker)
+
+        Args:
+            records: (trade_record, trade_data) pairs in chain order
+            epoch: Store epoch the records were queued in; if the insert fails
+                the monitor loop re-fetches their blocks. None when the caller
+                waits for the job and handles the failure itself
 
-        # Convert addresses to lowercase set for faster lookup
-        monitored_addresses_lower = {addr.lower() for addr in self.monitored_addresses}
+        Returns:
+            int: Number of new trades stored
 
-        # Query ALL maker events (for all addresses) - 1 RPC call instead of 3
+        Raises:
+            Exception: If the batch could not be stored
+        """
+        # Save the whole batch in one transaction; duplicates (same tx_hash) are
+        # ignored by the database and come back without a trade_id
         try:
-            logs_maker = self.rpc_manager.get_logs({
-                'fromBlock': from_block,
-                'toBlock': to_block,
-                'address': self.POLYMARKET_CONTRACTS,
-                'topics': [
-                    self.ORDER_FILLED_SIGNATURE,  # topic[0]: OrderFilled event
-                    None,                          # topic[1]: orderHash (any)
-                    None                           # topic[2]: maker (any - filter client-side)
-                ]
-            })
+            self.db_manager.insert_trades_bulk([record for record, _ in records])
+        except Exception:
+            if epoch is not None:
+                self._record_store_failure(min(record['block_number'] for record, _ in records), epoch)
+            raise
+
+        stored = []
+        for trade_record, trade_data in records:
+            if 'trade_id' not in trade_record:
+                logger.debug(f"Skipping already stored tx: {trade_record['tx_hash'][:10]}...")
+                continue
+            stored.append((trade_record, trade_data))
+        if not stored:
+            return 0
+
+        processed = 0
+        tokens = set()
+        positions = set()
+        copy_requests = []
+        for trade_record, trade_data in stored:
+            if self._process_trade_log(trade_record, trade_data, copy_requests):
+                processed += 1
+                token_id = trade_data.get('token_id')
+                if token_id:
+                    tokens.add(token_id)
+                    positions.add((trade_record['from_address'], token_id))
+
+        # Copy the batch's trades concurrently once all of them are recorded
+        if copy_requests:
+            self._execute_copy_trades(copy_requests)
+
+        logger.info(f"💼 Batch processed: trades={processed}, unique_tokens={len(tokens)}, "
+                    f"positions_changed={len(positions)}")
+
+        # Bound the WAL here rather than on the insert path; PASSIVE never
+        # waits on the dashboard/analyzer readers
+        self.db_manager.checkpoint_if_due()
+
+        return len(stored)
+
+    def _record_store_failure(self, block_number: int, epoch: int):
+        """
+        Remember that trades from block_number on were not stored (post-processing worker)
 
-            # Filter logs client-side for our monitored addresses
-            for log in logs_maker:
-                # Extract maker address from topic[2] (32 bytes, address is last 20 bytes)
-                if len(log['topics']) >= 3:
-                    maker_topic = log['topics'][2].hex()
-                    maker_address = '0x' + maker_topic[-40:]  # Last 40 hex chars = 20 bytes
+        Holds back every later checkpoint until the monitor loop has rewound.
 
-                    if maker_address.lower() in monitored_addresses_lower:
-                        # Find the checksum version of the address
-                        matched_address = next(addr for addr in self.monitored_addresses if addr.lower() == maker_address.lower())
-                        if self._process_trade_log(log, matched_address, 'maker'):
-                            trades_found += 1
+        Args:
+            block_number: Lowest block of the failed batch
+            epoch: Store epoch the batch was queued in
+        """
+        with self._store_lock:
+            # Jobs queued before the last rewind cover blocks it re-fetches anyway
+            if epoch != self._store_epoch:
+                return
+            if self._store_failed_block is None or block_number < self._store_failed_block:
+                self._store_failed_block = block_number
+
+    def _checkpoint(self, block_number: int, epoch: int):
+        """
+        Checkpoint block_number for restarts unless trades below it failed to store
 
-            logger.debug(f"Maker query returned {len(logs_maker)} events, {trades_found} matched our addresses")
+        Args:
+            block_number: Last processed block
+            epoch: Store epoch the checkpoint was queued in
+        """
+        with self._store_lock:
+            if epoch != self._store_epoch or self._store_failed_block is not None:
+                logger.warning(f"[MONITOR] Not checkpointing block {block_number:,}: "
+                               f"earlier trades failed to store and will be re-fetched")
+                return
+        self.db_manager.set_monitor_checkpoint(block_number)
+
+    def _rewind_failed_store(self):
+        """
+        Re-process blocks whose trades the post-processing worker failed to store
 
-        except Exception as e:
-            logger.warning(f"Error querying maker logs: {e}")
+        The failed trades' hashes stay in the Bloom filter, but _is_processed
+        confirms every hit against the database, so they are picked up again.
+        """
+        with self._store_lock:
+            failed_block = self._store_failed_block
+            if failed_block is None:
+                return
+            # Checkpoints queued before now belong to the old epoch and are skipped
+            self._store_failed_block = None
+            self._store_epoch += 1
+
+        self.last_block_processed = min(self.last_block_processed, failed_block - 1)
+        self._prefetched = None
+        # Re-sync with eth_getLogs; a fresh filter is installed once caught up
+        self._log_filter_id = None
+        logger.warning(f"[MONITOR] Trades from block {failed_block:,} were not stored, "
+                       f"re-fetching from there")
+
+    def _submit_post_processing(self, fn, *args):
+        """
+        Queue work on the post-processing worker, logging any exception it raises
 
-        # Delay between requests to avoid rate limiting
-        time.sleep(self.request_delay)
+        Args:
+            fn: Callable to run on the worker
+            *args: Arguments for fn
 
-        # Query ALL taker events (for all addresses) - 1 RPC call instead of 3
+        Returns:
+            Future: The queued job
+        """
+        future = self._post_processor.submit(fn, *args)
+        future.add_done_callback(self._log_post_processing_failure)
+        return future
+
+    @staticmethod
+    def _log_post_processing_failure(future):
+        """
+        Done-callback for post-processing jobs: surface their exceptions
+
+        Args:
+            future: Completed job future
+        """
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            logger.error(f"[MONITOR] Post-processing job failed: {exc}", exc_info=exc)
+
+    def _flush_post_processing(self):
+        """Block until all queued trade follow-up work and checkpoints are done"""
+        self._post_processor.submit(lambda: None).result()
+
+    def _decode_log(self, log) -> Dict:
+        """
+        Decode an OrderFilled log, returning an empty dict on failure
+
+        Args:
+            log: Event log from eth_getLogs
+
+        Returns:
+            Decoded trade data dictionary
+        """
         try:
-            logs_taker = self.rpc_manager.get_logs({
-                'fromBlock': from_block,
-                'toBlock': to_block,
-                'address': self.POLYMARKET_CONTRACTS,
-                'topics': [
-                    self.ORDER_FILLED_SIGNATURE,  # topic[0]: OrderFilled event
-                    None,                          # topic[1]: orderHash (any)
-                    None,                          # topic[2]: maker (any)
-                    None                           # topic[3]: taker (any - filter client-side)
-                ]
-            })
+            return self.event_decoder.decode_order_filled(log)
+        except Exception as e:
+            logger.warning(f"Failed to decode event for {log['transactionHash'].hex()[:10]}...: {e}")
+            return {}
 
-            # Filter logs client-side for our monitored addresses
-            for log in logs_taker:
-                # Extract taker address from topic[3] (32 bytes, address is last 20 bytes)
-                if len(log['topics']) >= 4:
-                    taker_topic = log['topics'][3].hex()
-                    taker_address = '0x' + taker_topic[-40:]  # Last 40 hex chars = 20 bytes
+    def _prefetch_metadata(self, token_ids: set):
+        """
+        Fetch and save market metadata for tokens that don't have it yet
 
-                    if taker_address.lower() in monitored_addresses_lower:
-                        # Find the checksum version of the address
-                        matched_address = next(addr for addr in self.monitored_addresses if addr.lower() == taker_address.lower())
-                        if self._process_trade_log(log, matched_address, 'taker'):
-                            trades_found += 1
+        Uses GammaClient.batch_get_markets, which issues its requests concurrently.
 
-            logger.debug(f"Taker query returned {len(logs_taker)} events, {trades_found} total matched")
+        Args:
+            token_ids: Token IDs about to be processed
+        """
+        missing = [t for t in token_ids if not self.metadata_manager.get_market_for_token(t)]
+        if not missing:
+            return
 
+        try:
+            logger.debug(f"Prefetching metadata for {len(missing)} new token_ids...")
+            markets = self.metadata_manager.gamma_client.batch_get_markets(missing)
+            if markets:
+                self.metadata_manager.save_market_metadata_batch(
+                    [(market_data, token_id) for token_id, market_data in markets.items()]
+                )
         except Exception as e:
-            logger.warning(f"Error querying taker logs: {e}")
+            # Not fatal: _process_trade_log retries per token
+            logger.warning(f"Failed to prefetch metadata for {len(missing)} tokens: {e}")
+
+    def _is_processed(self, tx_hash) -> bool:
+        """
+        Check whether a transaction was already stored
+
+        The Bloom filter answers "no" for almost every new tx without touching
+        the database; its rare "maybe" is confirmed with a lookup by tx_hash.
+
+        Args:
+            tx_hash: Raw 32-byte transaction hash
+
+        Returns:
+            bool: True if the trade is already in the database
+        """
+        if tx_hash not in self.processed_txs:
+            return False
+        return self.db_manager.trade_exists(HexBytes(tx_hash).hex())
+
+    def _mark_processed(self, tx_hash: str):
+        """
+        Remember a processed tx hash in the Bloom filter
 
-        return trades_found
+        Args:
+            tx_hash: Transaction hash as stored in the trades table
+        """
+        self.processed_txs.add(bytes.fromhex(tx_hash.removeprefix('0x')))
 
-    def _process_trade_log(self, log, monitored_address: str, role: str) -> bool:
+    def _build_trade_record(self, log, monitored_address: str, role: str,
+                            receipt, timestamp: int,
+                            trade_data: Optional[Dict] = None) -> Optional[Dict]:
         """
-        Process a single trade log event
+        Validate a trade log event and build its trades table record
 
         Args:
             log: Event log from eth_getLogs
             monitored_address: The monitored address involved
             role: 'maker' or 'taker'
+            receipt: Prefetched transaction receipt for the log
+            timestamp: Prefetched timestamp of the log's block
+            trade_data: Already-decoded event data (decoded here if None)
 
         Returns:
-            bool: True if trade was processed and saved, False if skipped (duplicate)
+            Trade record dictionary, or None if skipped (invalid)
         """
         try:
             tx_hash = log['transactionHash'].hex()
 
-            # Check if already processed (avoid duplicates)
-            if tx_hash in self.processed_txs:
-                logger.debug(f"Skipping duplicate tx: {tx_hash[:10]}...")
-                return False
-
-            # Get transaction details
-            tx = self.rpc_manager.get_transaction(log['transactionHash'])
-            receipt = self.rpc_manager.get_transaction_receipt(log['transactionHash'])
-
             # Decode the event
-            try:
-                trade_data = self.event_decoder.decode_order_filled(log)
-            except Exception as e:
-                logger.warning(f"Failed to decode event for {tx_hash[:10]}...: {e}")
-                trade_data = {}
+            if trade_data is None:
+                trade_data = self._decode_log(log)
 
             # Validate trade data
-            is_valid, validation_warnings = self._validate_trade_data(trade_data)
+            is_valid, validation_warnings, price, amount = self._validate_trade_data(trade_data)
             if not is_valid:
                 logger.error(f"Invalid trade data for {tx_hash[:10]}...: {', '.join(validation_warnings)}")
                 logger.error(f"Trade data: {trade_data}")
-                return False  # Skip invalid trades
+                return None  # Skip invalid trades
 
             if validation_warnings:
                 logger.warning(f"Trade data warnings for {tx_hash[:10]}...: {', '.join(validation_warnings)}")
 
-            # Get block timestamp
-            block = self.rpc_manager.get_block(log['blockNumber'])
-            timestamp = block['timestamp']
+            # Keep the parsed numbers for position tracking
+            trade_data['price_value'] = price
+            trade_data['amount_value'] = amount
 
             # Calculate capture delay
             current_time = int(time.time())
@@ -535,25 +1293,46 @@ class PolymarketMonitor:
                 'block_number': log['blockNumber'],
                 'timestamp': timestamp,
                 'from_address': monitored_address,  # The monitored address
-                'to_address': tx['to'],
+                'to_address': receipt['to'],
                 'method': trade_data.get('side', role),
                 'token_id': trade_data.get('token_id', ''),
                 'amount': trade_data.get('amount', ''),
                 'price': trade_data.get('price', ''),
                 'side': trade_data.get('side', role),
                 'gas_used': str(receipt['gasUsed']),
-                'gas_price': str(tx['gasPrice']),
-                'value': str(tx['value']),
+                'gas_price': str(receipt.get('effectiveGasPrice', 0)),
+                'value': '0',  # Exchange fill functions are non-payable
                 'status': 'success' if receipt['status'] == 1 else 'failed',
                 'capture_delay_seconds': capture_delay,
                 'trade_type': trade_type
             }
 
-            # Save to database
-            self.db_manager.insert_trade(trade_record)
+            return trade_record
+
+        except Exception as e:
+            logger.error(f"Error building trade record: {e}")
+            return None
 
-            # Mark as processed
-            self.processed_txs.add(tx_hash)
+    def _process_trade_log(self, trade_record: Dict, trade_data: Dict,
+                           copy_requests: List[tuple]) -> bool:
+        """
+        Post-process a newly stored trade: metadata, positions, logging and copy trading
+
+        Args:
+            trade_record: Trade record as stored by insert_trades_bulk
+            trade_data: Decoded event data for the trade
+            copy_requests: The copy trade is queued here for the caller to
+                execute with the rest of the batch
+
+        Returns:
+            bool: True if trade was processed
+        """
+        try:
+            tx_hash = trade_record['tx_hash']
+            monitored_address = trade_record['from_address']
+            timestamp = trade_record['timestamp']
+            capture_delay = trade_record['capture_delay_seconds']
+            trade_type = trade_record['trade_type']
 
             # Fetch and save market metadata asynchronously
             token_id = trade_data.get('token_id')
@@ -576,13 +1355,13 @@ class PolymarketMonitor:
 
             # Update position tracking
             try:
-                amount_float = float(trade_data.get('amount', 0))
-                price_float = float(trade_data.get('price', 0))
+                amount_float = trade_data.get('amount_value') or 0.0
+                price_float = trade_data.get('price_value') or 0.0
                 side = trade_data.get('side', '')
 
                 if amount_float > 0 and price_float > 0 and token_id:
                     # Update position
-                    self.db_manager.update_position(
+                    position = self.db_manager.update_position(
                         address=monitored_address,
                         token_id=token_id,
                         side=side,
@@ -603,60 +1382,30 @@ class PolymarketMonitor:
                         if settlement_type:
                             logger.info(f"🎯 SETTLEMENT DETECTED: {settlement_type.upper()} - Price: ${price_float:.3f}")
 
-                    # Get updated position for logging
-                    position = self.db_manager.get_position(monitored_address, token_id)
-                    if position:
+                    # Log the updated position (returned by update_position, no re-read);
+                    # per-batch totals are logged at INFO by _post_process_trades
+                    if position and logger.isEnabledFor(logging.DEBUG):
                         avg_price = position['avg_buy_price'] if position['avg_buy_price'] is not None else 0.0
-                        logger.info(f"💼 Position Update: {position['current_position']:.2f} tokens "
-                                  f"(Avg: ${avg_price:.3f}, PnL: ${position['realized_pnl']:.2f})")
+                        logger.debug(f"💼 Position Update: {position['current_position']:.2f} tokens "
+                                     f"(Avg: ${avg_price:.3f}, PnL: ${position['realized_pnl']:.2f})")
 
             except Exception as e:
                 logger.warning(f"Failed to update position: {e}")
 
-            # Log the trade with delay classification
-            delay_emoji = ""
-            delay_note = ""
-            if capture_delay > 3600:  # > 1 hour (historical data)
-                delay_emoji = "⏰"
-                delay_note = f" ({capture_delay/3600:.1f}h - HISTORICAL DATA)"
-            elif capture_delay > 300:  # > 5 minutes (delayed)
-                delay_emoji = "⚠️"
-                delay_note = f" ({capture_delay/60:.1f}m - DELAYED)"
-            elif capture_delay > 60:  # > 1 minute (slow)
-                delay_emoji = "⏱️"
-                delay_note = f" ({capture_delay}s - SLOW)"
-            else:  # < 1 minute (real-time)
-                delay_emoji = "⚡"
-                delay_note = f" ({capture_delay}s - REAL-TIME)"
-
-            # Get market info for logging
-            market_info = self.metadata_manager.get_market_for_token(token_id) if token_id else None
-            market_question = market_info.get('question', 'N/A') if market_info else 'Fetching...'
-            outcome_name = market_info.get('outcome_name', 'N/A') if market_info else 'N/A'
-
-            # Trade type emoji
-            type_emoji = "🏷️" if trade_type == 'MAKER' else "🎯"
-            type_label = "MAKER (挂单被执行)" if trade_type == 'MAKER' else "TAKER (主动交易)"
-
-            logger.info("=" * 80)
-            logger.info(f"📊 TRADE DETECTED | Block: {log['blockNumber']:,}")
-            logger.info(f"   {type_emoji} Type: {type_label}")
-            logger.info(f"   Tx Hash: {tx_hash}")
-            logger.info(f"   Address: {monitored_address[:10]}...")
-            logger.info(f"   Market: {market_question[:60]}")
-            logger.info(f"   Outcome: {outcome_name}")
-            logger.info(f"   Side: {trade_data.get('side', 'unknown')}")
-            logger.info(f"   Price: {trade_data.get('price', 'N/A')} USDC")
-            logger.info(f"   Amount: {trade_data.get('amount', 'N/A')} tokens")
-            logger.info(f"   Time: {datetime.fromtimestamp(timestamp)}")
-            logger.info(f"   {delay_emoji} Capture delay: {capture_delay}s{delay_note}")
-            logger.info("=" * 80)
-
-            # Execute copy trade (only for real-time trades, not historical)
-            if capture_delay < 300:  # Only copy trades within 5 minutes
-                self._execute_copy_trade(trade_data, tx_hash, trade_type)
+            # Banner formatting, market lookup and datetime conversion only run
+            # when INFO logging is actually enabled
+            if logger.isEnabledFor(logging.INFO):
+                self._log_trade(trade_record, trade_data)
+
+            # Execute copy trade (only for real-time trades, not historical).
+            # The age is measured now, not at capture: this runs on the
+            # post-processing worker, possibly behind earlier batches' copy trades
+            signal_age = int(time.time()) - timestamp
+            if signal_age < self.MAX_COPY_DELAY_SECONDS:
+                copy_requests.append((trade_data, tx_hash, trade_type, trade_record.get('trade_id'), timestamp))
             else:
-                logger.debug(f"Skipping copy trade for historical trade (delay: {capture_delay}s)")
+                logger.debug(f"Skipping copy trade for historical trade (age: {signal_age}s, "
+                             f"capture delay: {capture_delay}s)")
 
             return True
 
@@ -664,6 +1413,63 @@ class PolymarketMonitor:
             logger.error(f"Error processing trade log: {e}")
             return False
 
+    def _log_trade(self, trade_record: Dict, trade_data: Dict):
+        """
+        Log the TRADE DETECTED banner for a stored trade
+
+        Args:
+            trade_record: Trade record as stored by insert_trades_bulk
+            trade_data: Decoded event data for the trade
+        """
+        tx_hash = trade_record['tx_hash']
+        monitored_address = trade_record['from_address']
+        token_id = trade_data.get('token_id')
+        capture_delay = trade_record['capture_delay_seconds']
+        trade_type = trade_record['trade_type']
+
+        # Log the trade with delay classification
+        delay_emoji = ""
+        delay_note = ""
+        if capture_delay > 3600:  # > 1 hour (historical data)
+            delay_emoji = "⏰"
+            delay_note = f" ({capture_delay/3600:.1f}h - HISTORICAL DATA)"
+        elif capture_delay > 300:  # > 5 minutes (delayed)
+            delay_emoji = "⚠️"
+            delay_note = f" ({capture_delay/60:.1f}m - DELAYED)"
+        elif capture_delay > 60:  # > 1 minute (slow)
+            delay_emoji = "⏱️"
+            delay_note = f" ({capture_delay}s - SLOW)"
+        else:  # < 1 minute (real-time)
+            delay_emoji = "⚡"
+            delay_note = f" ({capture_delay}s - REAL-TIME)"
+
+        # Get market info for logging
+        market_info = self.metadata_manager.get_market_for_token(token_id) if token_id else None
+        market_question = market_info.get('question', 'N/A') if market_info else 'Fetching...'
+        outcome_name = market_info.get('outcome_name', 'N/A') if market_info else 'N/A'
+
+        # Trade type emoji
+        type_emoji = "🏷️" if trade_type == 'MAKER' else "🎯"
+        type_label = "MAKER (挂单被执行)" if trade_type == 'MAKER' else "TAKER (主动交易)"
+
+        # One record for the whole banner: a single format + handler write
+        # per trade instead of one per line
+        logger.info("\n".join([
+            "=" * 80,
+            f"📊 TRADE DETECTED | Block: {trade_record['block_number']:,}",
+            f"   {type_emoji} Type: {type_label}",
+            f"   Tx Hash: {tx_hash}",
+            f"   Address: {monitored_address[:10]}...",
+            f"   Market: {market_question[:60]}",
+            f"   Outcome: {outcome_name}",
+            f"   Side: {trade_data.get('side', 'unknown')}",
+            f"   Price: {trade_data.get('price', 'N/A')} USDC",
+            f"   Amount: {trade_data.get('amount', 'N/A')} tokens",
+            f"   Time: {datetime.fromtimestamp(trade_record['timestamp'])}",
+            f"   {delay_emoji} Capture delay: {capture_delay}s{delay_note}",
+            "=" * 80,
+        ]))
+
     def backfill_incomplete_positions(self) -> Dict[str, int]:
         """
         Detect and backfill incomplete positions (where sold > bought)
@@ -785,29 +1591,13 @@ class PolymarketMonitor:
         logger.info(f"  Searching blocks {from_block:,} to {to_block:,} ({to_block - from_block:,} blocks)")
         logger.info(f"  Time range: {lookback_dt.strftime('%Y-%m-%d %H:%M')} to {first_trade_dt.strftime('%Y-%m-%d %H:%M')}")
 
-        # Query trades in batches
-        batch_size = 100
-        total_trades_found = 0
-        current_from = from_block
-
-        while current_from < to_block:
-            current_to = min(current_from + batch_size - 1, to_block)
-
-            # Query this batch
-            try:
-                trades = self._query_trades(current_from, current_to)
-                total_trades_found += trades
-
-                if trades > 0:
-                    logger.info(f"    Found {trades} trades in blocks {current_from:,}-{current_to:,}")
-
-                current_from = current_to + 1
-                time.sleep(self.request_delay)
-
-            except Exception as e:
-                logger.warning(f"    Error querying blocks {current_from:,}-{current_to:,}: {e}")
-                current_from = current_to + 1
-                continue
+        # Query this wallet's trades; RPCManager.get_logs_range walks the window
+        # in BACKFILL_CHUNK_BLOCKS chunks, halving any the provider rejects
+        try:
+            total_trades_found = self._query_trades(from_block, to_block, address=address)
+        except Exception as e:
+            logger.warning(f"    Error querying blocks {from_block:,}-{to_block:,}: {e}")
+            total_trades_found = 0
 
         logger.info(f"  Backfill complete: found {total_trades_found} historical trades")
 
@@ -1,6 +1,7 @@
 """Helper module for decoding Polymarket events"""
 import json
 import logging
+from functools import lru_cache
 from typing import Dict, List, Optional
 from web3 import Web3
 
@@ -9,6 +10,15 @@ logger = logging.getLogger(__name__)
 # Polymarket token decimals
 USDC_DECIMALS = 6  # USDC has 6 decimals
 OUTCOME_TOKEN_DECIMALS = 6  # Polymarket outcome tokens typically have 6 decimals
+_USDC_SCALE = 10 ** USDC_DECIMALS
+_TOKEN_SCALE = 10 ** OUTCOME_TOKEN_DECIMALS
+_OUTPUT_SCALE = 10 ** 6  # Amount and price strings carry 6 decimal places
+
+# Canonical OrderFilled signature; its keccak hash is the event's topic[0]
+ORDER_FILLED_EVENT_SIGNATURE = "OrderFilled(bytes32,address,address,uint256,uint256,uint256,uint256,uint256)"
+
+# Trade side indexed by is_sell + 2 * is_buy
+_SIDES = ('swap', 'sell', 'buy')
 
 # Minimal ABI for NegRisk CTF Exchange events
 NEG_RISK_ABI = [
@@ -42,6 +52,24 @@ NEG_RISK_ABI = [
     }
 ]
 
+@lru_cache(maxsize=4096)
+def _hex_id(value: int) -> str:
+    """hex() of a token id, cached since a market's ids repeat across trades"""
+    return hex(value)
+
+
+@lru_cache(maxsize=4096)
+def _dec_id(value: int) -> str:
+    """str() of an asset id (~77 digits), cached like _hex_id"""
+    return str(value)
+
+
+def _format_scaled(value: int) -> str:
+    """Format a non-negative integer in 1e-6 units as a 6-decimal string"""
+    whole, frac = divmod(value, _OUTPUT_SCALE)
+    return f"{whole}.{frac:06d}"
+
+
 class EventDecoder:
     """Decode Polymarket CTF Exchange events"""
     
@@ -55,10 +83,13 @@ class EventDecoder:
         """
         self.w3 = w3
         self.neg_risk_exchange = neg_risk_exchange.lower()
+        self.neg_risk_checksum = Web3.to_checksum_address(neg_risk_exchange)
         self.contract = w3.eth.contract(
-            address=Web3.to_checksum_address(neg_risk_exchange),
+            address=self.neg_risk_checksum,
             abi=NEG_RISK_ABI
         )
+        # topic[0] of every OrderFilled log, computed once and compared as bytes
+        self.order_filled_topic = bytes(Web3.keccak(text=ORDER_FILLED_EVENT_SIGNATURE))
     
     def decode_trade_events(self, receipt) -> List[Dict]:
         """
@@ -71,77 +102,32 @@ class EventDecoder:
             List of decoded trade data dictionaries
         """
         trades = []
+        order_filled_topic = self.order_filled_topic
+        # Receipt logs carry checksummed addresses (raw RPC logs lowercase ones),
+        # so compare against both precomputed forms instead of lowering each log
+        exchange_addresses = (self.neg_risk_checksum, self.neg_risk_exchange)
 
         for log in receipt.get('logs', []):
-            if log['address'].lower() != self.neg_risk_exchange:
+            if log['address'] not in exchange_addresses:
                 continue
 
-            try:
-                # Try to decode as OrderFilled
-                decoded = self.contract.events.OrderFilled().process_log(log)
-
-                maker_amount_raw = decoded['args']['makerAmountFilled']
-                taker_amount_raw = decoded['args']['takerAmountFilled']
-                maker_asset_id = decoded['args']['makerAssetId']
-                taker_asset_id = decoded['args']['takerAssetId']
-
-                # Determine side and calculate price correctly
-                price = None
-                amount_tokens = None
-                side = None
-                token_id = None
-
-                if maker_asset_id == 0:
-                    # Maker selling outcome tokens for USDC
-                    side = 'sell'
-                    token_id = taker_asset_id
-
-                    usdc_amount = maker_amount_raw / (10 ** USDC_DECIMALS)
-                    token_amount = taker_amount_raw / (10 ** OUTCOME_TOKEN_DECIMALS)
-                    amount_tokens = token_amount
-
-                    if token_amount > 0:
-                        price = usdc_amount / token_amount
-
-                elif taker_asset_id == 0:
-                    # Maker buying outcome tokens with USDC
-                    side = 'buy'
-                    token_id = maker_asset_id
-
-                    usdc_amount = taker_amount_raw / (10 ** USDC_DECIMALS)
-                    token_amount = maker_amount_raw / (10 ** OUTCOME_TOKEN_DECIMALS)
-                    amount_tokens = token_amount
-
-                    if token_amount > 0:
-                        price = usdc_amount / token_amount
-
-                else:
-                    # Token-to-token swap
-                    side = 'swap'
-                    token_id = maker_asset_id
-                    amount_tokens = maker_amount_raw / (10 ** OUTCOME_TOKEN_DECIMALS)
-                    price = None
-
-                trade_data = {
-                    'order_hash': decoded['args']['orderHash'].hex(),
-                    'maker': decoded['args']['maker'].lower(),
-                    'taker': decoded['args']['taker'].lower(),
-                    'token_id': hex(token_id) if token_id else None,
-                    'amount': f"{amount_tokens:.6f}" if amount_tokens else "0",
-                    'price': f"{price:.6f}" if price else None,
-                    'side': side,
-                    'fee': str(decoded['args']['fee']),
-                    'maker_asset_id': str(maker_asset_id),
-                    'taker_asset_id': str(taker_asset_id)
-                }
-
-                trades.append(trade_data)
+            # Skip other exchange events before entering the decoder
+            topics = log.get('topics')
+            if not topics or bytes(topics[0]) != order_filled_topic:
+                continue
 
+            try:
+                args = self._decode_order_filled_args(log)
             except Exception as e:
-                # Not an OrderFilled event or couldn't decode
-                logger.debug(f"Could not decode log as OrderFilled: {e}")
+                # Only a malformed OrderFilled log gets here
+                logger.warning(f"Could not decode OrderFilled log: {e}")
+                continue
+
+            if args is None:
                 continue
 
+            trades.append(self._build_trade_data(args))
+
         return trades
 
     def decode_order_filled(self, log) -> Dict:
@@ -155,75 +141,106 @@ class EventDecoder:
             Dictionary with decoded trade data
         """
         try:
-            # Decode using contract ABI
-            decoded = self.contract.events.OrderFilled().process_log(log)
-
-            maker_amount_raw = decoded['args']['makerAmountFilled']
-            taker_amount_raw = decoded['args']['takerAmountFilled']
-            maker_asset_id = decoded['args']['makerAssetId']
-            taker_asset_id = decoded['args']['takerAssetId']
-
-            # Determine side and calculate price correctly
-            # Price should always be in USDC per outcome token
-            price = None
-            amount_tokens = None
-            side = None
-            token_id = None
-
-            if maker_asset_id == 0:
-                # Maker selling outcome tokens for USDC
-                # maker_amount_raw = USDC received (raw, 6 decimals)
-                # taker_amount_raw = outcome tokens sold (raw, 6 decimals)
-                side = 'sell'
-                token_id = taker_asset_id
-
-                # Convert amounts from raw values
-                usdc_amount = maker_amount_raw / (10 ** USDC_DECIMALS)
-                token_amount = taker_amount_raw / (10 ** OUTCOME_TOKEN_DECIMALS)
-                amount_tokens = token_amount
-
-                # Price = USDC per token
-                if token_amount > 0:
-                    price = usdc_amount / token_amount
-
-            elif taker_asset_id == 0:
-                # Maker buying outcome tokens with USDC
-                # maker_amount_raw = outcome tokens bought (raw, 6 decimals)
-                # taker_amount_raw = USDC paid (raw, 6 decimals)
-                side = 'buy'
-                token_id = maker_asset_id
-
-                # Convert amounts from raw values
-                usdc_amount = taker_amount_raw / (10 ** USDC_DECIMALS)
-                token_amount = maker_amount_raw / (10 ** OUTCOME_TOKEN_DECIMALS)
-                amount_tokens = token_amount
-
-                # Price = USDC per token
-                if token_amount > 0:
-                    price = usdc_amount / token_amount
-
-            else:
-                # Token-to-token swap (rare)
-                side = 'swap'
-                token_id = maker_asset_id
-                amount_tokens = maker_amount_raw / (10 ** OUTCOME_TOKEN_DECIMALS)
-                price = None  # Can't determine price without knowing which is USDC
-
-            trade_data = {
-                'order_hash': decoded['args']['orderHash'].hex(),
-                'maker': decoded['args']['maker'].lower(),
-                'taker': decoded['args']['taker'].lower(),
-                'token_id': hex(token_id) if token_id else None,
-                'amount': f"{amount_tokens:.6f}" if amount_tokens else "0",
-                'price': f"{price:.6f}" if price else None,
-                'side': side,
-                'fee': str(decoded['args']['fee']),
-                'maker_asset_id': str(maker_asset_id),
-                'taker_asset_id': str(taker_asset_id)
-            }
-
-            return trade_data
+            args = self._decode_order_filled_args(log)
+            if args is None:
+                raise ValueError("log is not an OrderFilled event")
+            return self._build_trade_data(args)
 
         except Exception as e:
             logger.warning(f"Failed to decode OrderFilled event: {e}")
             return {}
+
+    def _decode_order_filled_args(self, log) -> Optional[Dict]:
+        """
+        Decode OrderFilled arguments straight from the log's topics and data
+
+        The event layout is fixed: orderHash, maker and taker are indexed
+        (topics 1-3) and the data field holds five static uint256 words, so no
+        ABI machinery is needed.
+
+        Args:
+            log: Event log (from eth_getLogs or a receipt)
+
+        Returns:
+            Dictionary of event arguments, or None if the log is not OrderFilled
+
+        Raises:
+            ValueError: If an OrderFilled log has malformed data
+        """
+        topics = log['topics']
+        if len(topics) != 4 or bytes(topics[0]) != self.order_filled_topic:
+            return None
+
+        data = bytes(log['data'])
+        if len(data) != 5 * 32:
+            raise ValueError(f"unexpected OrderFilled data length: {len(data)}")
+        maker_asset_id, taker_asset_id, maker_amount, taker_amount, fee = (
+            int.from_bytes(data[i:i + 32], 'big') for i in range(0, 5 * 32, 32)
+        )
+
+        return {
+            'orderHash': bytes(topics[1]),
+            'maker': '0x' + bytes(topics[2])[12:].hex(),
+            'taker': '0x' + bytes(topics[3])[12:].hex(),
+            'makerAssetId': maker_asset_id,
+            'takerAssetId': taker_asset_id,
+            'makerAmountFilled': maker_amount,
+            'takerAmountFilled': taker_amount,
+            'fee': fee,
+        }
+
+    def _build_trade_data(self, args: Dict) -> Dict:
+        """
+        Turn decoded OrderFilled arguments into trade data
+
+        Args:
+            args: Event arguments from _decode_order_filled_args
+
+        Returns:
+            Dictionary with decoded trade data
+        """
+        maker_amount_raw = args['makerAmountFilled']
+        taker_amount_raw = args['takerAmountFilled']
+        maker_asset_id = args['makerAssetId']
+        taker_asset_id = args['takerAssetId']
+
+        # Determine side and calculate price correctly
+        # Price should always be in USDC per outcome token. Amounts and prices
+        # are kept as integers in 1e-6 units, so the output strings are exact
+        # and no float division or pow() runs per trade
+        #
+        # makerAssetId == 0: maker sells outcome tokens for USDC
+        #   (maker amount = USDC received, taker amount = tokens sold)
+        # takerAssetId == 0: maker buys outcome tokens with USDC
+        #   (maker amount = tokens bought, taker amount = USDC paid)
+        # neither: token-to-token swap (rare); no USDC leg, so no price
+        is_sell = maker_asset_id == 0
+        is_buy = not is_sell and taker_asset_id == 0
+        side = _SIDES[is_sell + 2 * is_buy]
+
+        token_id, token_raw, usdc_raw = (
+            (taker_asset_id, taker_amount_raw, maker_amount_raw) if is_sell
+            else (maker_asset_id, maker_amount_raw, taker_amount_raw)
+        )
+
+        amount_scaled = token_raw * _OUTPUT_SCALE // _TOKEN_SCALE
+
+        # Price = USDC per token, rounded half-up to 1e-6
+        price_scaled = None
+        if (is_sell or is_buy) and token_raw > 0:
+            numerator = 2 * usdc_raw * _TOKEN_SCALE * _OUTPUT_SCALE
+            denominator = 2 * token_raw * _USDC_SCALE
+            price_scaled = (numerator + token_raw * _USDC_SCALE) // denominator
+
+        return {
+            'order_hash': args['orderHash'].hex(),
+            'maker': args['maker'],
+            'taker': args['taker'],
+            'token_id': _hex_id(token_id) if token_id else None,
+            'amount': _format_scaled(amount_scaled) if amount_scaled else "0",
+            'price': _format_scaled(price_scaled) if price_scaled else None,
+            'side': side,
+            'fee': str(args['fee']),
+            'maker_asset_id': _dec_id(maker_asset_id),
+            'taker_asset_id': _dec_id(taker_asset_id)
+        }
@@ -6,17 +6,22 @@ Polymarket Data API Client
 
 import logging
 import time
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Trade:
-    """交易数据结构"""
+    """交易数据结构 (不可变, 使用 __slots__ 节省内存)"""
     id: str
     timestamp: int
     side: str  # 'BUY' or 'SELL'
@@ -49,6 +54,14 @@ class PolymarketDataAPI:
     """
 
     BASE_URL = "https://data-api.polymarket.com"
+    GAMMA_URL = "https://gamma-api.polymarket.com"
+
+    # 最多记住的已处理交易 ID 数量 (超出后淘汰最早的)
+    MAX_PROCESSED_TRADE_IDS = 10_000
+
+    # 市场元数据缓存 (token_id -> 元数据), 容量和有效期 (秒)
+    MARKET_CACHE_SIZE = 10_000
+    MARKET_CACHE_TTL = 3600
 
     def __init__(
         self,
@@ -68,12 +81,18 @@ class PolymarketDataAPI:
         self.poll_interval = poll_interval
         self.use_proxy = use_proxy
 
-        # 已处理的交易 ID 集合 (防止重复)
-        self.processed_trade_ids: Set[str] = set()
+        # 已处理的交易 ID (防止重复), 按插入顺序保存, 容量有上限
+        self.processed_trade_ids: OrderedDict[str, None] = OrderedDict()
 
         # 上次获取到的最新交易时间戳
         self.last_trade_timestamp: int = 0
 
+        # 市场元数据缓存: token_id -> (缓存时间, 元数据), 按最近使用排序
+        self._market_cache: OrderedDict[str, tuple] = OrderedDict()
+
+        # 是否让服务端按时间过滤 /trades (被拒绝后自动关闭, 回退到客户端过滤)
+        self.server_time_filter: bool = True
+
         # Session for connection pooling
         self.session = requests.Session()
         self.session.headers.update({
@@ -81,6 +100,18 @@ class PolymarketDataAPI:
             'Accept': 'application/json'
         })
 
+        # 复用连接, 对限流和网关错误自动重试 (最终失败的响应仍交给 raise_for_status)
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=['GET'],
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
     def _get_proxies(self) -> Optional[Dict[str, str]]:
         """获取代理配置"""
         if not self.use_proxy:
@@ -90,53 +121,191 @@ class PolymarketDataAPI:
             'https': 'http://127.0.0.1:7890'
         }
 
-    def get_trades(self, limit: int = 50) -> List[Trade]:
+    def _get_json(self, path: str, params, base_url: Optional[str] = None):
+        """
+        GET 请求 Data API 并解析 JSON
+
+        Args:
+            path: 接口路径, 如 '/trades'
+            params: 查询参数 (dict 或 (key, value) 列表)
+            base_url: 接口根地址, 默认为 Data API
+
+        Returns:
+            解析后的 JSON 数据
+
+        Raises:
+            requests.RequestException: 请求失败或返回错误状态码
+        """
+        resp = self.session.get(
+            f"{base_url or self.BASE_URL}{path}",
+            params=params,
+            proxies=self._get_proxies(),
+            timeout=15
+        )
+        resp.raise_for_status()
+        return orjson.loads(resp.content)
+
+    def _mark_processed(self, trade_id: str):
+        """记录已处理的交易 ID, 超出容量时淘汰最早的记录"""
+        self.processed_trade_ids[trade_id] = None
+        if len(self.processed_trade_ids) > self.MAX_PROCESSED_TRADE_IDS:
+            self.processed_trade_ids.popitem(last=False)
+
+    def get_trades(self, limit: int = 50, after: Optional[int] = None) -> List[Trade]:
         """
         获取用户最近的交易列表
 
         Args:
             limit: 返回数量限制
+            after: 只返回该时间戳之后的交易 (由服务端过滤)
 
         Returns:
             List[Trade]: 交易列表
         """
         try:
-            url = f"{self.BASE_URL}/trades"
-            params = {
-                'user': self.user_address,
-                'limit': limit
-            }
+            return self._fetch_trades(limit, after)
+
+        except Exception as e:
+            logger.error(f"[DATA-API] Failed to get trades: {e}")
+            return []
 
-            resp = self.session.get(
-                url,
-                params=params,
-                proxies=self._get_proxies(),
-                timeout=15
+    def _fetch_trades(self, limit: int, after: Optional[int] = None) -> List[Trade]:
+        """
+        请求 /trades 并转换为 Trade 列表 (异常向上抛出)
+
+        Args:
+            limit: 返回数量限制
+            after: 只返回该时间戳之后的交易 (由服务端过滤)
+
+        Returns:
+            List[Trade]: 交易列表
+        """
+        params = {
+            'user': self.user_address,
+            'limit': limit
+        }
+        if after:
+            params['after'] = after
+
+        data = self._get_json('/trades', params)
+
+        # 响应缺少标题时, 一次批量补全所有缺失市场的元数据
+        missing = {t.get('asset', '') or t.get('tokenId', '') for t in data if not t.get('title')}
+        missing.discard('')
+        market_meta = self.get_markets_meta(list(missing)) if missing else {}
+
+        trades = []
+
+        for t in data:
+            trade = Trade(
+                id=t.get('id', ''),
+                timestamp=t.get('timestamp', 0),
+                side=t.get('side', '').upper(),
+                size=float(t.get('size', 0)),
+                price=float(t.get('price', 0)),
+                is_maker=t.get('isMaker', False),
+                title=t.get('title') or market_meta.get(
+                    t.get('asset', '') or t.get('tokenId', ''), {}
+                ).get('title', ''),
+                token_id=t.get('asset', '') or t.get('tokenId', ''),
+                tx_hash=t.get('transactionHash')
             )
-            resp.raise_for_status()
-
-            data = resp.json()
-            trades = []
-
-            for t in data:
-                trade = Trade(
-                    id=t.get('id', ''),
-                    timestamp=t.get('timestamp', 0),
-                    side=t.get('side', '').upper(),
-                    size=float(t.get('size', 0)),
-                    price=float(t.get('price', 0)),
-                    is_maker=t.get('isMaker', False),
-                    title=t.get('title', ''),
-                    token_id=t.get('asset', '') or t.get('tokenId', ''),
-                    tx_hash=t.get('transactionHash')
-                )
-                trades.append(trade)
+            trades.append(trade)
+
+        return trades
+
+    def get_market_meta(self, token_id: str) -> Optional[Dict]:
+        """
+        获取 token 所属市场的元数据 (带缓存)
+
+        Args:
+            token_id: 十进制 token ID (即 Data API 的 asset 字段)
 
-            return trades
+        Returns:
+            Dict: {'title', 'outcome', 'condition_id', 'slug'}, 未找到返回 None
+        """
+        return self.get_markets_meta([token_id]).get(token_id)
 
+    def get_markets_meta(self, token_ids: List[str]) -> Dict[str, Dict]:
+        """
+        批量获取市场元数据
+
+        先查进程内缓存, 未命中的 token 合并成一次 Gamma /markets 请求
+
+        Args:
+            token_ids: 十进制 token ID 列表
+
+        Returns:
+            Dict[str, Dict]: token_id -> 元数据 (查询失败的 token 不包含在内)
+        """
+        now = time.monotonic()
+        results = {}
+        missing = []
+        for token_id in token_ids:
+            cached = self._market_cache.get(token_id)
+            if cached is not None and now - cached[0] < self.MARKET_CACHE_TTL:
+                self._market_cache.move_to_end(token_id)
+                results[token_id] = cached[1]
+            else:
+                missing.append(token_id)
+
+        if not missing:
+            return results
+
+        try:
+            params = [('clob_token_ids', token_id) for token_id in missing]
+            params.append(('limit', len(missing) * 2))  # 多结果市场会返回多个 token
+            markets = self._get_json('/markets', params, base_url=self.GAMMA_URL)
         except Exception as e:
-            logger.error(f"[DATA-API] Failed to get trades: {e}")
-            return []
+            logger.error(f"[DATA-API] Failed to get market metadata: {e}")
+            return results
+
+        wanted = set(missing)
+        for market in markets:
+            market_token_ids = orjson.loads(market.get('clobTokenIds') or '[]')
+            outcomes = orjson.loads(market.get('outcomes') or '[]')
+            for index, token_id in enumerate(market_token_ids):
+                if token_id not in wanted:
+                    continue
+                meta = {
+                    'title': market.get('question', ''),
+                    'outcome': outcomes[index] if index < len(outcomes) else '',
+                    'condition_id': market.get('conditionId', ''),
+                    'slug': market.get('slug', '')
+                }
+                results[token_id] = meta
+                self._market_cache[token_id] = (now, meta)
+                self._market_cache.move_to_end(token_id)
+
+        while len(self._market_cache) > self.MARKET_CACHE_SIZE:
+            self._market_cache.popitem(last=False)
+
+        return results
+
+    def _fetch_recent_trades(self) -> List[Trade]:
+        """
+        获取上次时间戳之后的交易
+
+        优先让服务端按时间过滤, 稳定状态下通常只返回空数组;
+        如果服务端拒绝该参数, 则关闭过滤并回退到拉取最近 20 笔
+
+        Returns:
+            List[Trade]: 交易列表
+        """
+        if self.server_time_filter and self.last_trade_timestamp:
+            try:
+                return self._fetch_trades(20, after=self.last_trade_timestamp)
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status is None or not 400 <= status < 500:
+                    raise
+                self.server_time_filter = False
+                logger.warning(
+                    f"[DATA-API] Server rejected 'after' filter ({status}), "
+                    f"falling back to client-side filtering"
+                )
+
+        return self._fetch_trades(20)
 
     def get_new_trades(self) -> List[Trade]:
         """
@@ -145,36 +314,44 @@ class PolymarketDataAPI:
         Returns:
             List[Trade]: 新交易列表
         """
-        all_trades = self.get_trades(limit=20)
+        try:
+            all_trades = self._fetch_recent_trades()
+        except Exception as e:
+            logger.error(f"[DATA-API] Failed to get trades: {e}")
+            return []
 
+        if not all_trades:
+            return []
+
+        last_ts = self.last_trade_timestamp
+        max_ts = last_ts
         new_trades = []
         for trade in all_trades:
+            if trade.timestamp > max_ts:
+                max_ts = trade.timestamp
+
             # 跳过已处理的交易
             if trade.id in self.processed_trade_ids:
                 continue
 
             # 跳过旧交易 (首次运行时初始化)
-            if self.last_trade_timestamp == 0:
+            if last_ts == 0:
                 # 首次运行，记录当前最新时间戳，不处理历史交易
-                self.processed_trade_ids.add(trade.id)
+                self._mark_processed(trade.id)
                 continue
 
-            # 检查是否是新交易
-            if trade.timestamp > self.last_trade_timestamp:
+            # 检查是否是新交易 (服务端忽略过滤参数时仍需在客户端过滤)
+            if trade.timestamp > last_ts:
                 new_trades.append(trade)
-                self.processed_trade_ids.add(trade.id)
+                self._mark_processed(trade.id)
 
         # 更新最新时间戳
-        if all_trades:
-            max_ts = max(t.timestamp for t in all_trades)
-            if max_ts > self.last_trade_timestamp:
-                self.last_trade_timestamp = max_ts
-
-        # 首次运行时设置初始时间戳
-        if self.last_trade_timestamp == 0 and all_trades:
-            self.last_trade_timestamp = max(t.timestamp for t in all_trades)
+        self.last_trade_timestamp = max_ts
+
+        # 首次运行时记录初始状态
+        if last_ts == 0 and max_ts:
             logger.info(f"[DATA-API] Initialized with {len(all_trades)} historical trades")
-            logger.info(f"[DATA-API] Latest trade at: {datetime.fromtimestamp(self.last_trade_timestamp)}")
+            logger.info(f"[DATA-API] Latest trade at: {datetime.fromtimestamp(max_ts)}")
 
         return new_trades
 
@@ -186,18 +363,7 @@ class PolymarketDataAPI:
             List[Dict]: 持仓列表
         """
         try:
-            url = f"{self.BASE_URL}/positions"
-            params = {'user': self.user_address}
-
-            resp = self.session.get(
-                url,
-                params=params,
-                proxies=self._get_proxies(),
-                timeout=15
-            )
-            resp.raise_for_status()
-
-            return resp.json()
+            return self._get_json('/positions', {'user': self.user_address})
 
         except Exception as e:
             logger.error(f"[DATA-API] Failed to get positions: {e}")
@@ -214,21 +380,10 @@ class PolymarketDataAPI:
             List[Dict]: 活动列表
         """
         try:
-            url = f"{self.BASE_URL}/activity"
-            params = {
+            return self._get_json('/activity', {
                 'user': self.user_address,
                 'limit': limit
-            }
-
-            resp = self.session.get(
-                url,
-                params=params,
-                proxies=self._get_proxies(),
-                timeout=15
-            )
-            resp.raise_for_status()
-
-            return resp.json()
+            })
 
         except Exception as e:
             logger.error(f"[DATA-API] Failed to get activity: {e}")
@@ -250,19 +405,7 @@ class PolymarketDataAPI:
 
         while True:
             try:
-                new_trades = self.get_new_trades()
-
-                for trade in new_trades:
-                    logger.info(
-                        f"[DATA-API] 📊 NEW TRADE: {trade.trade_type} | "
-                        f"{trade.side} {trade.size:.2f} @ ${trade.price:.4f} | "
-                        f"{trade.title[:30]}..."
-                    )
-
-                    try:
-                        callback(trade)
-                    except Exception as e:
-                        logger.error(f"[DATA-API] Callback error: {e}")
+                _announce_trades(self, self.get_new_trades(), callback)
 
                 time.sleep(self.poll_interval)
 
@@ -274,6 +417,60 @@ class PolymarketDataAPI:
                 time.sleep(self.poll_interval * 2)  # 错误时延长等待
 
 
+def _announce_trades(api: PolymarketDataAPI, new_trades: List[Trade], callback):
+    """对一个用户的新交易逐条记录日志并调用回调"""
+    for trade in new_trades:
+        logger.info(
+            f"[DATA-API] 📊 NEW TRADE: {api.user_address[:10]}... | {trade.trade_type} | "
+            f"{trade.side} {trade.size:.2f} @ ${trade.price:.4f} | "
+            f"{trade.title[:30]}..."
+        )
+
+        try:
+            callback(trade)
+        except Exception as e:
+            logger.error(f"[DATA-API] Callback error: {e}")
+
+
+def poll_users(apis: List[PolymarketDataAPI], callback, poll_interval: float = 5.0):
+    """
+    并发轮询多个用户的新交易
+
+    每轮在线程池中同时请求所有用户的 /trades, 单轮耗时取决于最慢的请求,
+    而不是所有请求耗时之和
+
+    Args:
+        apis: 每个监控用户对应的 PolymarketDataAPI 实例
+        callback: 发现新交易时调用的回调函数
+                  签名: callback(trade: Trade) -> None
+        poll_interval: 轮询间隔 (秒)
+    """
+    if not apis:
+        return
+
+    logger.info(f"[DATA-API] Starting concurrent trade polling for {len(apis)} users")
+    logger.info(f"[DATA-API] Poll interval: {poll_interval}s")
+
+    with ThreadPoolExecutor(max_workers=len(apis), thread_name_prefix="data-api") as executor:
+        # 初始化 - 获取当前交易状态
+        list(executor.map(PolymarketDataAPI.get_new_trades, apis))
+
+        while True:
+            try:
+                results = list(executor.map(PolymarketDataAPI.get_new_trades, apis))
+                for api, new_trades in zip(apis, results):
+                    _announce_trades(api, new_trades, callback)
+
+                time.sleep(poll_interval)
+
+            except KeyboardInterrupt:
+                logger.info("[DATA-API] Polling stopped by user")
+                break
+            except Exception as e:
+                logger.error(f"[DATA-API] Polling error: {e}")
+                time.sleep(poll_interval * 2)  # 错误时延长等待
+
+
 def test_api():
     """测试 API 功能"""
     address = "0x0f37Cb80DEe49D55B5F6d9E595D52591D6371410"
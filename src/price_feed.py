@@ -0,0 +1,212 @@
+"""
+Polymarket CLOB 行情推送（WebSocket market 频道）
+在本地维护已订阅 token 的最优卖价，下单前定价无需每次经代理请求订单簿
+"""
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set
+
+import orjson
+
+try:
+    from websockets.sync.client import connect
+except ImportError:  # 未安装 websockets 时只用 REST 定价
+    connect = None
+
+logger = logging.getLogger(__name__)
+
+
+class PriceFeed:
+    """
+    订阅 CLOB market 频道，按 book / price_change 事件维护每个 token 的卖单簿
+
+    后台线程持有连接并自动重连；断线期间清空行情，get() 返回 None，
+    调用方退回 REST 查询
+    """
+
+    WS_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+
+    # 服务端要求定期发送 PING 保活（秒）
+    PING_INTERVAL = 10.0
+
+    # 单次 recv 的最长等待（秒），决定新订阅最迟多久发出
+    RECV_TIMEOUT = 1.0
+
+    # 断线重连的初始/最长等待（秒），每次失败翻倍
+    RECONNECT_DELAY = 1.0
+    MAX_RECONNECT_DELAY = 30.0
+
+    def __init__(self):
+        """初始化行情推送（首次 subscribe 时才连接）"""
+        # token_id -> {价格: 数量}（仅卖单）
+        self._asks: Dict[str, Dict[float, float]] = {}
+        # token_id -> 最优卖价
+        self._best_ask: Dict[str, float] = {}
+
+        self._tokens: Set[str] = set()
+        # 已加入但尚未发送订阅的 token
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+
+        self._ws = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def available(self) -> bool:
+        """是否可用（已安装 websockets）"""
+        return connect is not None
+
+    def subscribe(self, token_ids: Iterable[str]):
+        """
+        订阅 token 的行情（已订阅的忽略），首次订阅时启动后台线程
+
+        Args:
+            token_ids: 代币 ID（十进制字符串）
+        """
+        if connect is None:
+            return
+
+        with self._lock:
+            new_tokens = set(token_ids) - self._tokens
+            if not new_tokens:
+                return
+            self._tokens |= new_tokens
+            self._pending |= new_tokens
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="price-feed", daemon=True)
+                self._thread.start()
+
+    def get(self, token_id: str) -> Optional[float]:
+        """
+        获取推送维护的最优卖价
+
+        Args:
+            token_id: 代币 ID（十进制字符串）
+
+        Returns:
+            float: 最优卖价，未订阅、尚无快照或断线时返回 None
+        """
+        return self._best_ask.get(token_id)
+
+    def close(self):
+        """关闭连接并停止后台线程"""
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            ws.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        """后台循环：连接、订阅、接收事件，断线后指数退避重连"""
+        delay = self.RECONNECT_DELAY
+        while not self._stop.is_set():
+            try:
+                with connect(self.WS_URL, open_timeout=10) as ws:
+                    self._ws = ws
+                    logger.info("[PRICE] Connected to CLOB market feed")
+                    delay = self.RECONNECT_DELAY
+                    self._serve(ws)
+
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.warning(f"[PRICE] Market feed disconnected: {e}, reconnecting in {delay:.0f}s")
+
+            finally:
+                self._ws = None
+                # 断线期间的增量会丢失，清空行情让调用方走 REST
+                self._asks.clear()
+                self._best_ask.clear()
+
+            if self._stop.wait(delay):
+                break
+            delay = min(delay * 2, self.MAX_RECONNECT_DELAY)
+
+    def _serve(self, ws):
+        """
+        在一条连接上收发消息，直到断开或停止
+
+        Args:
+            ws: 已建立的 WebSocket 连接
+        """
+        # 新连接需重新订阅全部 token：首条消息声明频道，之后增量订阅
+        with self._lock:
+            self._pending = set(self._tokens)
+        initial = True
+        next_ping = time.monotonic() + self.PING_INTERVAL
+
+        while not self._stop.is_set():
+            with self._lock:
+                pending, self._pending = self._pending, set()
+            if pending:
+                if initial:
+                    ws.send(orjson.dumps({"assets_ids": sorted(pending), "type": "market"}).decode())
+                    initial = False
+                else:
+                    ws.send(orjson.dumps({"assets_ids": sorted(pending), "operation": "subscribe"}).decode())
+
+            try:
+                message = ws.recv(timeout=self.RECV_TIMEOUT)
+            except TimeoutError:
+                message = None
+            if message:
+                self._handle_message(message)
+
+            if time.monotonic() >= next_ping:
+                ws.send("PING")
+                next_ping = time.monotonic() + self.PING_INTERVAL
+
+    def _handle_message(self, message):
+        """
+        按 book（全量快照）/ price_change（增量）事件更新卖单簿
+
+        Args:
+            message: 收到的文本消息（JSON 对象或数组，或 PONG）
+        """
+        try:
+            data = orjson.loads(message)
+        except orjson.JSONDecodeError:
+            return  # PONG 等非 JSON 消息
+
+        touched = set()
+        for event in data if isinstance(data, list) else (data,):
+            if not isinstance(event, dict):
+                continue
+            event_type = event.get('event_type')
+
+            if event_type == 'book':
+                asset_id = event.get('asset_id')
+                self._asks[asset_id] = {
+                    float(level['price']): float(level['size']) for level in event.get('asks') or ()
+                }
+                touched.add(asset_id)
+
+            elif event_type == 'price_change':
+                # 新格式为 price_changes（每项带 asset_id），旧格式为 changes
+                changes = event.get('price_changes')
+                if changes is None:
+                    changes = event.get('changes') or ()
+                for change in changes:
+                    if change.get('side') != 'SELL':
+                        continue
+                    asset_id = change.get('asset_id') or event.get('asset_id')
+                    book = self._asks.get(asset_id)
+                    if book is None:
+                        continue  # 尚未收到快照
+                    price, size = float(change['price']), float(change['size'])
+                    if size > 0:
+                        book[price] = size
+                    else:
+                        book.pop(price, None)
+                    touched.add(asset_id)
+
+        for asset_id in touched:
+            book = self._asks.get(asset_id)
+            if book:
+                self._best_ask[asset_id] = min(book)
+            else:
+                self._best_ask.pop(asset_id, None)
@@ -4,9 +4,16 @@ Optimized for Infura + eth_getLogs
 """
 import logging
 import os
+import re
+import threading
 import time
-from typing import List, Optional, Dict, Any
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Tuple
+import requests
+from hexbytes import HexBytes
+from requests.adapters import HTTPAdapter
 from web3 import Web3
+from web3.datastructures import AttributeDict
 from web3.exceptions import Web3Exception
 from web3.middleware import ExtraDataToPOAMiddleware
 
@@ -16,6 +23,34 @@ logger = logging.getLogger(__name__)
 class RPCManager:
     """Manages multiple RPC endpoints with automatic failover"""
 
+    MAX_BATCH_CALLS = 100  # JSON-RPC calls per batched HTTP request
+    HTTP_POOL_SIZE = 20  # Keep-alive connections per endpoint (prefetch/worker threads share them)
+
+    # Blocks behind the head after which eth_getLogs results are cached
+    # (Polygon reorgs stay well within this depth)
+    FINALITY_DEPTH = 128
+    LOG_CACHE_SIZE = 256  # Cached eth_getLogs responses (opt-in per call)
+    RECEIPT_CACHE_SIZE = 4096  # Cached transaction receipts
+
+    # Error fragments providers use when an eth_getLogs range/result set is too big
+    RANGE_ERROR_MARKERS = (
+        'block range', 'range too', 'too wide', 'more than', 'too many logs',
+        'response size', 'query timeout'
+    )
+
+    # Errors worth retrying: provider/JSON-RPC errors (Web3Exception, or
+    # ValueError from web3 < 7 and get_logs_raw) and network failures (OSError
+    # covers requests' ConnectionError/Timeout/HTTPError). Anything else is a
+    # bug in the caller and is raised immediately.
+    RETRYABLE_ERRORS = (Web3Exception, OSError, ValueError)
+    # Failover picks the endpoint with the lowest recent latency; each
+    # consecutive failure adds ERROR_PENALTY seconds to an endpoint's score
+    LATENCY_EWMA_ALPHA = 0.2
+    ERROR_PENALTY = 5.0
+
+    RATE_LIMIT_RPC_CODE = -32005  # JSON-RPC "limit exceeded" (Infura)
+    _RATE_LIMIT_PATTERN = re.compile(r'429|too many requests|rate limit', re.IGNORECASE)
+
     def __init__(self, rpc_endpoints: List[str], max_retry: int = 3, retry_delay: int = 5):
         """
         Initialize RPC Manager
@@ -26,6 +61,8 @@ class RPCManager:
             retry_delay: Delay between retries in seconds
         """
         self.rpc_endpoints = self._process_endpoints(rpc_endpoints)
+        # Endpoint URLs with API keys masked, for logging
+        self._display_endpoints = [self._mask_api_key(e) for e in self.rpc_endpoints]
         self.max_retry = max_retry
         self.retry_delay = retry_delay
         self.current_index = 0
@@ -34,6 +71,21 @@ class RPCManager:
         # Track max block range for each endpoint
         self.max_ranges = [100, 50, 50, 50, 50]  # Infura=100, others=50
 
+        # Per-endpoint health: EWMA of call latency in seconds (None until
+        # measured) and consecutive failures, used to choose failover targets
+        self.latency_ewma: List[Optional[float]] = [None] * len(self.rpc_endpoints)
+        self.error_count = [0] * len(self.rpc_endpoints)
+
+        # Immutable chain data, kept in LRU order (the lock covers callers on
+        # prefetch / per-contract worker threads)
+        self._latest_block: Optional[int] = None
+        self._log_cache: OrderedDict = OrderedDict()
+        self._receipt_cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        # One HTTP session per endpoint, kept across reconnects and failovers
+        self._sessions: Dict[str, requests.Session] = {}
+
         self._connect()
 
     def _process_endpoints(self, endpoints: List[str]) -> List[str]:
@@ -73,9 +125,9 @@ class RPCManager:
         """
         for _ in range(len(self.rpc_endpoints)):
             endpoint = self.rpc_endpoints[self.current_index]
+            # Mask API key in logs
+            display_endpoint = self._display_endpoints[self.current_index]
             try:
-                # Mask API key in logs
-                display_endpoint = self._mask_api_key(endpoint)
                 logger.info(f"Attempting to connect to RPC: {display_endpoint}")
 
                 # Explicitly bypass proxy - RPC should always go direct
@@ -84,7 +136,8 @@ class RPCManager:
                     request_kwargs={
                         'timeout': 30,
                         'proxies': {}  # Force no proxy
-                    }
+                    },
+                    session=self._get_session(endpoint)
                 ))
 
                 # Inject POA middleware for Polygon compatibility
@@ -98,7 +151,6 @@ class RPCManager:
                 else:
                     logger.warning(f"✗ Failed to connect to RPC: {display_endpoint}")
             except Exception as e:
-                display_endpoint = self._mask_api_key(endpoint)
                 logger.warning(f"✗ Error connecting to RPC {display_endpoint}: {str(e)}")
 
             # Rotate to next endpoint
@@ -107,6 +159,26 @@ class RPCManager:
         logger.error("Failed to connect to any RPC endpoint")
         return False
 
+    def _get_session(self, endpoint: str) -> requests.Session:
+        """
+        Get the pooled HTTP session for an endpoint, creating it on first use
+
+        Args:
+            endpoint: RPC endpoint URL
+
+        Returns:
+            requests.Session with a keep-alive connection pool
+        """
+        session = self._sessions.get(endpoint)
+        if session is None:
+            session = requests.Session()
+            # Retries are handled by execute_with_retry, not at the transport level
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.HTTP_POOL_SIZE, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._sessions[endpoint] = session
+        return session
+
     def _mask_api_key(self, url: str) -> str:
         """Mask API key in URL for logging"""
         if 'infura.io/v3/' in url:
@@ -115,10 +187,53 @@ class RPCManager:
                 return f"{parts[0]}/v3/***{parts[1][-4:]}"
         return url
 
+    def _endpoint_score(self, index: int) -> float:
+        """
+        Score an endpoint for failover (lower is better)
+
+        Endpoints that have not been measured yet score 0 so they get tried.
+
+        Args:
+            index: Endpoint index
+
+        Returns:
+            float: Latency EWMA plus a penalty per consecutive failure
+        """
+        latency = self.latency_ewma[index] or 0.0
+        return latency + self.error_count[index] * self.ERROR_PENALTY
+
+    def _record_result(self, index: int, latency: Optional[float] = None):
+        """
+        Update an endpoint's health after a call
+
+        Args:
+            index: Endpoint index the call ran on
+            latency: Call duration in seconds, or None if the call failed
+        """
+        if latency is None:
+            self.error_count[index] += 1
+            return
+
+        self.error_count[index] = 0
+        previous = self.latency_ewma[index]
+        if previous is None:
+            self.latency_ewma[index] = latency
+        else:
+            alpha = self.LATENCY_EWMA_ALPHA
+            self.latency_ewma[index] = (1 - alpha) * previous + alpha * latency
+
     def _rotate_endpoint(self):
-        """Rotate to the next RPC endpoint"""
-        self.current_index = (self.current_index + 1) % len(self.rpc_endpoints)
-        logger.info(f"Rotating to RPC endpoint {self.current_index + 1}/{len(self.rpc_endpoints)}")
+        """Switch to the healthiest other RPC endpoint"""
+        count = len(self.rpc_endpoints)
+        if count > 1:
+            self._record_result(self.current_index)
+            # Candidates in round-robin order, so ties keep the old rotation
+            candidates = [(self.current_index + offset) % count for offset in range(1, count)]
+            self.current_index = min(candidates, key=self._endpoint_score)
+
+        latency = self.latency_ewma[self.current_index]
+        latency_info = f" (avg {latency * 1000:.0f}ms)" if latency is not None else ""
+        logger.info(f"Rotating to RPC endpoint {self.current_index + 1}/{count}{latency_info}")
 
     def get_max_block_range(self) -> int:
         """Get maximum block range for current endpoint"""
@@ -126,6 +241,47 @@ class RPCManager:
             return self.max_ranges[self.current_index]
         return 50  # Default for unknown endpoints
 
+    @classmethod
+    def is_range_error(cls, error: Exception) -> bool:
+        """
+        Check whether an error means the requested block range was too large
+
+        Args:
+            error: Exception raised by an eth_getLogs call
+
+        Returns:
+            bool: True if retrying with a smaller range may succeed
+        """
+        error_msg = str(error).lower()
+        return any(marker in error_msg for marker in cls.RANGE_ERROR_MARKERS)
+
+    @classmethod
+    def is_rate_limit_error(cls, error: Exception) -> bool:
+        """
+        Check whether an error is a provider rate limit
+
+        Looks at the HTTP status and the JSON-RPC error code first and only
+        falls back to matching the message when neither is available.
+
+        Args:
+            error: Exception raised by an RPC call
+
+        Returns:
+            bool: True if the endpoint is throttling requests
+        """
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+        if status is not None:
+            return status == 429
+
+        rpc_response = getattr(error, 'rpc_response', None)
+        rpc_errors = [rpc_response.get('error')] if isinstance(rpc_response, dict) else []
+        rpc_errors += [arg for arg in error.args if isinstance(arg, dict)]
+        for rpc_error in rpc_errors:
+            if isinstance(rpc_error, dict) and 'code' in rpc_error:
+                return rpc_error['code'] == cls.RATE_LIMIT_RPC_CODE
+
+        return cls._RATE_LIMIT_PATTERN.search(str(error)) is not None
+
     def execute_with_retry(self, func, *args, **kwargs):
         """
         Execute a function with retry logic and automatic failover
@@ -137,6 +293,10 @@ class RPCManager:
 
         Returns:
             Result of the function execution
+
+        Raises:
+            Exception: Range errors and non-retryable errors immediately, or the
+                last retryable error once all retries and the fallback failed
         """
         last_exception = None
 
@@ -147,15 +307,22 @@ class RPCManager:
                     if not self._connect():
                         raise ConnectionError("Failed to connect to RPC")
 
+                index = self.current_index
+                started = time.perf_counter()
                 result = func(*args, **kwargs)
+                self._record_result(index, time.perf_counter() - started)
                 return result
 
-            except (Web3Exception, ConnectionError, Exception) as e:
+            except self.RETRYABLE_ERRORS as e:
                 last_exception = e
                 error_msg = str(e)
 
+                # Same request will fail again - let the caller shrink the range
+                if self.is_range_error(e):
+                    raise
+
                 # Check if it's a rate limit error - switch back to Infura immediately
-                if '429' in error_msg or 'Too many requests' in error_msg or 'rate limit' in error_msg.lower():
+                if self.is_rate_limit_error(e):
                     logger.warning(f"⚠️ Rate limit detected on attempt {attempt + 1}/{self.max_retry}: {error_msg[:150]}")
 
                     # If not on Infura (endpoint 0), switch to it immediately
@@ -184,11 +351,15 @@ class RPCManager:
             self._connect()
 
             # Try once on new endpoint
+            index = self.current_index
             try:
+                started = time.perf_counter()
                 result = func(*args, **kwargs)
+                self._record_result(index, time.perf_counter() - started)
                 logger.info("✓ Successfully executed on fallback RPC endpoint")
                 return result
-            except Exception as e:
+            except self.RETRYABLE_ERRORS as e:
+                self._record_result(index)
                 logger.error(f"Fallback endpoint also failed: {str(e)[:200]}")
                 last_exception = e
 
@@ -214,7 +385,24 @@ class RPCManager:
         Returns:
             int: Latest block number
         """
-        return self.execute_with_retry(lambda: self.w3.eth.block_number)
+        self._latest_block = self.execute_with_retry(lambda: self.w3.eth.block_number)
+        return self._latest_block
+
+    def _cache_get(self, cache: OrderedDict, key):
+        """Look up a cache entry, marking it most recently used"""
+        with self._cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, cache: OrderedDict, key, value, max_size: int):
+        """Store a cache entry, evicting the least recently used beyond max_size"""
+        with self._cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > max_size:
+                cache.popitem(last=False)
 
     def get_block(self, block_number: int):
         """
@@ -250,7 +438,11 @@ class RPCManager:
         Returns:
             Transaction receipt
         """
-        return self.execute_with_retry(lambda: self.w3.eth.get_transaction_receipt(tx_hash))
+        receipt = self._cache_get(self._receipt_cache, tx_hash)
+        if receipt is None:
+            receipt = self.execute_with_retry(lambda: self.w3.eth.get_transaction_receipt(tx_hash))
+            self._cache_put(self._receipt_cache, tx_hash, receipt, self.RECEIPT_CACHE_SIZE)
+        return receipt
 
     def get_logs(self, filter_params: Dict[str, Any]) -> List:
         """
@@ -266,3 +458,228 @@ class RPCManager:
             return self.w3.eth.get_logs(filter_params)
 
         return self.execute_with_retry(_get_logs)
+
+    def get_logs_raw(self, filter_params: Dict[str, Any], cache: bool = False) -> List[Dict]:
+        """
+        Get logs using eth_getLogs without web3's result formatting
+
+        Logs come back exactly as the node sent them (hex strings), skipping the
+        per-field HexBytes/AttributeDict conversion of every log. Use
+        format_log on the few logs that are actually needed.
+
+        Args:
+            filter_params: Filter parameters for eth_getLogs
+            cache: Remember the result if the range is FINALITY_DEPTH behind the
+                head, for callers that re-query the same historical ranges
+
+        Returns:
+            List of raw log dictionaries
+        """
+        to_block = filter_params.get('toBlock')
+        cache_key = None
+        if (cache and isinstance(to_block, int) and self._latest_block is not None
+                and to_block <= self._latest_block - self.FINALITY_DEPTH):
+            cache_key = repr(sorted(filter_params.items()))
+            cached = self._cache_get(self._log_cache, cache_key)
+            if cached is not None:
+                return cached
+
+        params = dict(filter_params)
+        for key in ('fromBlock', 'toBlock'):
+            if isinstance(params.get(key), int):
+                params[key] = hex(params[key])
+
+        def _get_logs_raw():
+            response = self.w3.provider.make_request('eth_getLogs', [params])
+            if response.get('error'):
+                raise ValueError(response['error'])
+            return response['result']
+
+        logs = self.execute_with_retry(_get_logs_raw)
+        if cache_key is not None:
+            self._cache_put(self._log_cache, cache_key, logs, self.LOG_CACHE_SIZE)
+        return logs
+
+    def get_logs_range(self, from_block: int, to_block: int,
+                       addresses: Optional[List[str]] = None,
+                       topics: Optional[List] = None,
+                       cache: bool = False,
+                       max_stride: Optional[int] = None) -> List[Dict]:
+        """
+        Get raw logs for an arbitrarily wide block range
+
+        The range is walked in chunks of at most max_stride blocks. A chunk
+        the provider rejects as too large is retried at half the stride, and
+        the stride grows back after each successful chunk.
+
+        Args:
+            from_block: First block (inclusive)
+            to_block: Last block (inclusive)
+            addresses: Contract addresses to filter on server-side
+            topics: Topic filter list for eth_getLogs
+            cache: Passed through to get_logs_raw
+            max_stride: Largest chunk to request (defaults to get_max_block_range();
+                topic-filtered queries are usually accepted over far wider ranges)
+
+        Returns:
+            List of raw log dictionaries, in block order
+        """
+        max_stride = max_stride or self.get_max_block_range()
+        stride = max_stride
+        logs = []
+
+        current = from_block
+        while current <= to_block:
+            chunk_end = min(current + stride - 1, to_block)
+            filter_params = {'fromBlock': current, 'toBlock': chunk_end}
+            if addresses:
+                filter_params['address'] = addresses
+            if topics:
+                filter_params['topics'] = topics
+
+            try:
+                logs.extend(self.get_logs_raw(filter_params, cache=cache))
+            except Exception as e:
+                if stride == 1 or not self.is_range_error(e):
+                    raise
+                stride = max(1, stride // 2)
+                logger.debug(f"Log range {current}-{chunk_end} too large, retrying with {stride} blocks")
+                continue
+
+            current = chunk_end + 1
+            stride = min(stride * 2, max_stride)
+
+        return logs
+
+    @staticmethod
+    def format_log(raw_log: Dict) -> AttributeDict:
+        """
+        Convert a raw eth_getLogs entry into the form web3's get_logs returns
+
+        Args:
+            raw_log: Log dictionary from get_logs_raw
+
+        Returns:
+            AttributeDict log, as accepted by contract event decoding
+        """
+        return AttributeDict({
+            'address': Web3.to_checksum_address(raw_log['address']),
+            'topics': [HexBytes(topic) for topic in raw_log['topics']],
+            'data': HexBytes(raw_log['data']),
+            'blockNumber': int(raw_log['blockNumber'], 16),
+            'blockHash': HexBytes(raw_log['blockHash']),
+            'transactionHash': HexBytes(raw_log['transactionHash']),
+            'transactionIndex': int(raw_log['transactionIndex'], 16),
+            'logIndex': int(raw_log['logIndex'], 16),
+            'removed': raw_log.get('removed', False),
+        })
+
+    def new_log_filter(self, filter_params: Dict[str, Any]) -> str:
+        """
+        Install a server-side log filter (eth_newFilter)
+
+        Args:
+            filter_params: Filter parameters, as for eth_getLogs
+
+        Returns:
+            str: Filter ID to pass to get_filter_changes
+        """
+        return self.execute_with_retry(lambda: self.w3.eth.filter(filter_params).filter_id)
+
+    def get_filter_changes(self, filter_id: str) -> List:
+        """
+        Get logs matched by a log filter since the last poll (eth_getFilterChanges)
+
+        Not retried: filters live on a single node, so a failure usually means
+        the filter is gone and the caller should fall back to eth_getLogs.
+
+        Args:
+            filter_id: ID returned by new_log_filter
+
+        Returns:
+            List of new log entries
+        """
+        return self.w3.eth.get_filter_changes(filter_id)
+
+    def get_logs_blooms(self, block_numbers: List[int]) -> Dict[int, bytes]:
+        """
+        Fetch the logsBloom of each block header using JSON-RPC batching
+
+        Args:
+            block_numbers: Block numbers to fetch (headers only)
+
+        Returns:
+            Dict of block_number -> 256-byte logs Bloom filter
+        """
+        blooms = {}
+        for i in range(0, len(block_numbers), self.MAX_BATCH_CALLS):
+            chunk = block_numbers[i:i + self.MAX_BATCH_CALLS]
+
+            def _batch():
+                with self.w3.batch_requests() as batch:
+                    for number in chunk:
+                        batch.add(self.w3.eth.get_block(number))
+                    return batch.execute()
+
+            for number, block in zip(chunk, self.execute_with_retry(_batch)):
+                blooms[number] = bytes(block['logsBloom'])
+
+        return blooms
+
+    def get_trade_context(self, tx_hashes: List, block_numbers: List[int]) -> Tuple[Dict, Dict]:
+        """
+        Fetch receipts and block timestamps using JSON-RPC batching
+
+        All eth_getTransactionReceipt / eth_getBlockByNumber calls are sent in
+        as few HTTP requests as possible. Falls back to individual calls if the
+        endpoint rejects batches.
+
+        Args:
+            tx_hashes: Unique transaction hashes
+            block_numbers: Unique block numbers
+
+        Returns:
+            Tuple of (tx_hash -> receipt, block_number -> timestamp)
+        """
+        receipts, timestamps = {}, {}
+        for tx_hash in tx_hashes:
+            receipt = self._cache_get(self._receipt_cache, tx_hash)
+            if receipt is not None:
+                receipts[tx_hash] = receipt
+
+        calls = [('receipt', h) for h in tx_hashes if h not in receipts]
+        calls += [('block', n) for n in block_numbers]
+
+        def _store(call, result):
+            kind, key = call
+            if kind == 'receipt':
+                receipts[key] = result
+                self._cache_put(self._receipt_cache, key, result, self.RECEIPT_CACHE_SIZE)
+            else:
+                timestamps[key] = result['timestamp']
+
+        for i in range(0, len(calls), self.MAX_BATCH_CALLS):
+            chunk = calls[i:i + self.MAX_BATCH_CALLS]
+
+            def _batch():
+                with self.w3.batch_requests() as batch:
+                    for kind, key in chunk:
+                        if kind == 'receipt':
+                            batch.add(self.w3.eth.get_transaction_receipt(key))
+                        else:
+                            batch.add(self.w3.eth.get_block(key))
+                    return batch.execute()
+
+            try:
+                for call, result in zip(chunk, self.execute_with_retry(_batch)):
+                    _store(call, result)
+            except Exception as e:
+                logger.warning(f"Batch request failed, falling back to individual calls: {str(e)[:150]}")
+                for call in chunk:
+                    kind, key = call
+                    if kind == 'receipt':
+                        _store(call, self.get_transaction_receipt(key))
+                    else:
+                        _store(call, self.execute_with_retry(lambda: self.w3.eth.get_block(key)))
+
+        return receipts, timestamps
@@ -5,20 +5,137 @@ Polymarket 跟单执行器
 """
 
 import logging
-import math
 import os
+import queue
+import random
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, Dict, Any, Tuple
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple
 
 from py_clob_client.client import ClobClient
 from py_clob_client.clob_types import MarketOrderArgs, OrderType
 from py_clob_client.order_builder.constants import BUY, SELL
 
 from clash_proxy_manager import get_proxy_manager, ClashProxyManager
+from price_feed import PriceFeed
 
 logger = logging.getLogger(__name__)
 
+# 下单错误分类（预编译，一次扫描，无需 lower() 复制字符串）
+_CLOUDFLARE_RE = re.compile(r"cloudflare|blocked|<!doctype html|security service", re.IGNORECASE)
+_NETWORK_RE = re.compile(
+    r"connection|timeout|proxy|refused|network|unreachable|ssl|reset|request exception",
+    re.IGNORECASE
+)
+
+# 通知后台写库线程写完剩余记录后退出
+_DB_STOP = object()
+
+
+@lru_cache(maxsize=4096)
+def _token_to_decimal(token_id: str) -> str:
+    """token_id 转为十进制字符串（0x 十六进制换算，十进制原样返回；同一 token 反复出现，结果缓存）"""
+    return str(int(token_id, 16)) if token_id.startswith('0x') else token_id
+
+
+@dataclass(slots=True)
+class CopyOrderResult:
+    """单笔跟单交易的执行结果"""
+    token_id: str
+    side: str
+    success: bool = False
+    order_id: Optional[str] = None
+    amount: float = 0
+    price: float = 0
+    error: Optional[str] = None
+    original_tx_hash: Optional[str] = None
+    original_trade_id: Optional[int] = None
+
+
+class CircuitOpenError(Exception):
+    """区域熔断器处于打开状态，请求被直接拒绝"""
+
+
+@dataclass
+class CircuitBreaker:
+    """
+    单个代理区域的熔断器
+
+    closed: 正常放行，连续失败 FAIL_THRESHOLD 次后打开
+    open: 直接拒绝，冷却 cooldown 秒后进入 half_open
+    half_open: 只放行一个探测请求，成功则关闭，失败则以加倍的冷却时间重新打开
+    """
+    FAIL_THRESHOLD = 3
+    BASE_COOLDOWN = 30.0
+    MAX_COOLDOWN = 600.0
+
+    state: str = 'closed'
+    failures: int = 0
+    opened_at: float = 0.0
+    cooldown: float = BASE_COOLDOWN
+    half_open_inflight: bool = False
+
+    def is_open(self, now: float) -> bool:
+        """是否处于打开状态且仍在冷却中"""
+        return self.state == 'open' and now - self.opened_at < self.cooldown
+
+    def allow(self, now: float) -> bool:
+        """
+        判断是否放行一次请求
+
+        Args:
+            now: 当前时间 (time.monotonic())
+
+        Returns:
+            bool: 是否放行
+        """
+        if self.state == 'open':
+            if self.is_open(now):
+                return False
+            self.state = 'half_open'
+            self.half_open_inflight = False
+
+        if self.state == 'half_open':
+            if self.half_open_inflight:
+                return False
+            self.half_open_inflight = True
+
+        return True
+
+    def record_success(self):
+        """请求成功（或到达了服务端），关闭熔断器"""
+        self.state = 'closed'
+        self.failures = 0
+        self.cooldown = self.BASE_COOLDOWN
+        self.half_open_inflight = False
+
+    def record_failure(self, now: float):
+        """
+        记录一次网络/Cloudflare 失败
+
+        Args:
+            now: 当前时间 (time.monotonic())
+        """
+        if self.state == 'half_open':
+            # 探测失败，冷却时间加倍后重新打开
+            self.cooldown = min(self.cooldown * 2, self.MAX_COOLDOWN)
+            self._open(now)
+            return
+
+        self.failures += 1
+        if self.failures >= self.FAIL_THRESHOLD:
+            self._open(now)
+
+    def _open(self, now: float):
+        self.state = 'open'
+        self.opened_at = now
+        self.half_open_inflight = False
+
 
 class TradingExecutor:
     """Polymarket 跟单执行器（带 Clash 代理管理）"""
@@ -26,6 +143,23 @@ class TradingExecutor:
     CLOB_API_URL = "https://clob.polymarket.com"
     POLYGON_CHAIN_ID = 137
 
+    # 价格缓存有效期（秒），同一 token 短时间内的重复查询复用订单簿结果
+    PRICE_CACHE_TTL = 0.5
+
+    # 价格按 0.0001 为单位换算成整数（不小于 Polymarket 的最小 tick），
+    # 用整数向上取整计算份额，避免浮点除法在 tick 边界上多算一份
+    PRICE_UNITS = 10_000
+
+    # 批量跟单的最大并发数
+    MAX_COPY_WORKERS = 8
+
+    # 后台写库线程每个事务最多写入的跟单记录数，及凑批的最长等待（秒）
+    DB_BATCH_SIZE = 64
+    DB_BATCH_WAIT = 0.05
+
+    # 重试退避（decorrelated jitter）的最短等待（秒）；上限为 retry_delay
+    BACKOFF_BASE = 0.1
+
     def __init__(
         self,
         private_key: str,
@@ -35,7 +169,8 @@ class TradingExecutor:
         min_usd: float = 1.0,
         retry_count: int = 3,
         retry_delay: float = 2.0,
-        use_proxy: bool = True
+        use_proxy: bool = True,
+        use_price_feed: bool = True
     ):
         """
         初始化跟单执行器
@@ -47,26 +182,62 @@ class TradingExecutor:
             min_shares: 最小跟单份额（默认 5）
             min_usd: 最小美元金额（默认 1.0）
             retry_count: 重试次数
-            retry_delay: 重试延迟（秒）
+            retry_delay: 重试退避的最长等待（秒）
             use_proxy: 是否使用 Clash 代理
+            use_price_feed: 是否通过 WebSocket 推送维护价格（不可用时只用 REST）
         """
         self.private_key = private_key
         self.funder_address = funder_address
         self.database = database
         self.min_shares = min_shares
         self.min_usd = min_usd
+        self._min_usd_units = round(min_usd * self.PRICE_UNITS)
         self.retry_count = retry_count
         self.retry_delay = retry_delay
         self.use_proxy = use_proxy
 
-        self.client: Optional[ClobClient] = None
-        self._initialized = False
+        # CLOB 客户端，经 client 属性访问（首次访问时初始化）
+        self._client: Optional[ClobClient] = None
+        # 首次派生后缓存 API 凭证，重建客户端时不再发签名请求
+        self._api_creds = None
 
         # 代理管理器
         self.proxy_manager: Optional[ClashProxyManager] = None
+        self._regions_ranked = False
         if use_proxy:
             self.proxy_manager = get_proxy_manager()
 
+        # token_id -> (价格, 过期时间)
+        self._price_cache: Dict[str, Tuple[float, float]] = {}
+
+        # WebSocket 行情推送：查过价格的 token 自动订阅，之后直接读本地最优卖价
+        self._price_feed: Optional[PriceFeed] = None
+        if use_price_feed:
+            self._price_feed = PriceFeed()
+            if not self._price_feed.available:
+                logger.info("websockets not installed, prices come from REST only")
+                self._price_feed = None
+
+        # 所有区域都尝试过时的位掩码（每个区域一位）
+        self._all_regions_mask = (1 << len(ClashProxyManager.REGIONS)) - 1
+
+        # 每个代理区域一个熔断器（跨交易保留，已知被封的区域直接跳过）
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+        # 批量跟单线程池（常驻复用）；锁保护客户端初始化、熔断器状态和代理切换
+        self._executor = ThreadPoolExecutor(max_workers=self.MAX_COPY_WORKERS, thread_name_prefix="copy")
+        self._lock = threading.RLock()
+
+        # 跟单记录由后台线程批量写库（一次事务一次提交），下单路径不等待磁盘同步
+        self._db_queue: Optional[queue.Queue] = None
+        self._db_thread: Optional[threading.Thread] = None
+        if database is not None:
+            self._db_queue = queue.Queue()
+            self._db_thread = threading.Thread(
+                target=self._db_writer, name="copy-order-writer", daemon=True
+            )
+            self._db_thread.start()
+
     def initialize(self) -> bool:
         """
         初始化 CLOB 客户端和 API 凭证
@@ -75,9 +246,31 @@ class TradingExecutor:
         Returns:
             bool: 初始化是否成功
         """
-        if self._initialized:
+        if self._client is not None:
             return True
 
+        with self._lock:
+            if self._client is not None:
+                return True
+            return self._initialize_locked()
+
+    @property
+    def client(self) -> ClobClient:
+        """
+        已初始化的 CLOB 客户端（首次访问时初始化）
+
+        Raises:
+            RuntimeError: 客户端初始化失败
+        """
+        client = self._client
+        if client is None:
+            if not self.initialize():
+                raise RuntimeError("Failed to initialize client")
+            client = self._client
+        return client
+
+    def _initialize_locked(self) -> bool:
+        """initialize() 的实际实现（调用方持有 self._lock）"""
         try:
             # 如果使用代理，先确保连通性
             if self.use_proxy and self.proxy_manager:
@@ -87,27 +280,17 @@ class TradingExecutor:
                     logger.error("Cannot establish proxy connectivity")
                     return False
 
+                # 首次初始化时并行测量各区域延迟，改用最快区域并按延迟排定轮换顺序
+                if not self._regions_ranked:
+                    self._regions_ranked = True
+                    self.proxy_manager.use_fastest_region()
+
                 # 设置环境变量代理（py-clob-client 会使用）
                 self.proxy_manager.set_env_proxy()
                 logger.info(f"Proxy enabled: {self.proxy_manager.CLASH_PROXY_HTTP}")
 
             logger.info("Initializing CLOB client...")
-
-            # 创建客户端 (signature_type=2 for Gnosis Safe Proxy wallet)
-            # 当用户通过 Polymarket UI 存款时，资金在 proxy wallet 中
-            self.client = ClobClient(
-                self.CLOB_API_URL,
-                key=self.private_key,
-                chain_id=self.POLYGON_CHAIN_ID,
-                signature_type=2,  # Gnosis Safe Proxy (browser wallet)
-                funder=self.funder_address  # Proxy wallet address from polymarket.com/settings
-            )
-
-            # 创建或派生 API 凭证
-            api_creds = self.client.create_or_derive_api_creds()
-            self.client.set_api_creds(api_creds)
-
-            self._initialized = True
+            self._create_client()
             logger.info("CLOB client initialized successfully")
             return True
 
@@ -129,19 +312,7 @@ class TradingExecutor:
         """重试初始化（切换区域后）"""
         try:
             self.proxy_manager.set_env_proxy()
-
-            self.client = ClobClient(
-                self.CLOB_API_URL,
-                key=self.private_key,
-                chain_id=self.POLYGON_CHAIN_ID,
-                signature_type=2,
-                funder=self.funder_address
-            )
-
-            api_creds = self.client.create_or_derive_api_creds()
-            self.client.set_api_creds(api_creds)
-
-            self._initialized = True
+            self._create_client()
             logger.info("CLOB client initialized successfully after region switch")
             return True
 
@@ -149,6 +320,173 @@ class TradingExecutor:
             logger.error(f"Retry initialization failed: {e}")
             return False
 
+    def _create_client(self):
+        """创建 CLOB 客户端并设置 API 凭证（优先使用缓存的凭证），成功后才赋给 self._client"""
+        # 创建客户端 (signature_type=2 for Gnosis Safe Proxy wallet)
+        # 当用户通过 Polymarket UI 存款时，资金在 proxy wallet 中
+        client = ClobClient(
+            self.CLOB_API_URL,
+            key=self.private_key,
+            chain_id=self.POLYGON_CHAIN_ID,
+            signature_type=2,  # Gnosis Safe Proxy (browser wallet)
+            funder=self.funder_address  # Proxy wallet address from polymarket.com/settings
+        )
+
+        # 创建或派生 API 凭证
+        if self._api_creds is None:
+            self._api_creds = client.create_or_derive_api_creds()
+        client.set_api_creds(self._api_creds)
+        self._client = client
+
+    def _swap_proxy(self) -> bool:
+        """
+        区域切换（或 Clash 重启）后继续使用代理
+
+        Clash 在本地固定端口上切换出口节点，代理地址不变，因此保留现有的
+        CLOB 客户端和 API 凭证，只刷新代理环境变量；客户端尚未初始化时才完整初始化
+
+        Returns:
+            bool: 客户端是否可用
+        """
+        self.proxy_manager.set_env_proxy()
+        return self.initialize()
+
+    @staticmethod
+    def _classify_error(error_msg: str) -> Tuple[bool, bool]:
+        """
+        对下单错误分类
+
+        Args:
+            error_msg: 异常信息
+
+        Returns:
+            Tuple[bool, bool]: (是否 Cloudflare 阻止, 是否网络错误)
+        """
+        # 检查是否是Cloudflare阻止 (403 + HTML响应)
+        is_cloudflare_block = "403" in error_msg and _CLOUDFLARE_RE.search(error_msg) is not None
+
+        # 检查是否是网络相关错误
+        is_network_error = _NETWORK_RE.search(error_msg) is not None
+
+        return is_cloudflare_block, is_network_error
+
+    def _current_region(self) -> Optional[str]:
+        """当前代理区域（未使用代理时为 None）"""
+        if not (self.use_proxy and self.proxy_manager):
+            return None
+        return self.proxy_manager.current_region
+
+    def _region_available(self, region: str) -> bool:
+        """区域熔断器是否允许尝试（供 rotate_region 跳过熔断中的区域）"""
+        breaker = self._breakers.get(region)
+        return breaker is None or not breaker.is_open(time.monotonic())
+
+    def _call_with_breaker(self, region: Optional[str], func):
+        """
+        在区域熔断器保护下执行 CLOB 调用
+
+        只有 Cloudflare 阻止和网络错误计入失败；业务错误说明请求已到达服务端，
+        视为区域可用
+
+        Args:
+            region: 代理区域（None 表示不使用熔断器）
+            func: 要执行的无参函数
+
+        Returns:
+            func 的返回值
+
+        Raises:
+            CircuitOpenError: 区域熔断器打开，未发出请求
+        """
+        if region is None:
+            return func()
+
+        with self._lock:
+            breaker = self._breakers.setdefault(region, CircuitBreaker())
+            if not breaker.allow(time.monotonic()):
+                raise CircuitOpenError(f"circuit open for region {region}")
+
+        try:
+            result = func()
+        except Exception as e:
+            is_cloudflare_block, is_network_error = self._classify_error(str(e))
+            with self._lock:
+                if is_cloudflare_block or is_network_error:
+                    breaker.record_failure(time.monotonic())
+                    if breaker.state == 'open':
+                        logger.warning(f"[COPY] ⛔ Circuit opened for region {region} "
+                                       f"(cooldown {breaker.cooldown:.0f}s)")
+                else:
+                    breaker.record_success()
+            raise
+
+        with self._lock:
+            breaker.record_success()
+        return result
+
+    def _rotate_region(self, skip_mask: int = 0) -> Tuple[bool, str]:
+        """
+        切换到下一个未熔断的区域（并发跟单时串行执行）
+
+        Args:
+            skip_mask: 要跳过的区域位掩码（第 i 位对应 REGIONS[i]，如已被 Cloudflare 阻止的区域）
+
+        Returns:
+            Tuple[bool, str]: (是否成功, 当前区域)
+        """
+        def is_available(region: str) -> bool:
+            if skip_mask >> ClashProxyManager.REGION_INDEX[region] & 1:
+                return False
+            return self._region_available(region)
+
+        with self._lock:
+            return self.proxy_manager.rotate_region(is_available=is_available)
+
+    def _restart_clash(self) -> bool:
+        """重启 Clash（并发跟单时串行执行）"""
+        with self._lock:
+            return self.proxy_manager.restart_clash()
+
+    def _backoff(self, prev_sleep: float) -> float:
+        """
+        重试前退避等待（decorrelated jitter）
+
+        等待时长在 [BACKOFF_BASE, min(上次 * 3, retry_delay)] 内随机取值：
+        偶发错误很快重试，持续失败时逐渐放慢，并发跟单的重试也自然错开
+
+        Args:
+            prev_sleep: 上次的等待时长（首次为 BACKOFF_BASE）
+
+        Returns:
+            float: 本次等待时长（下次调用时传入）
+        """
+        cap = max(self.retry_delay, self.BACKOFF_BASE)
+        delay = random.uniform(self.BACKOFF_BASE, min(prev_sleep * 3, cap))
+        logger.debug(f"[COPY] Waiting {delay:.2f}s before next attempt...")
+        time.sleep(delay)
+        return delay
+
+    def _wait_until_connected(self, timeout: float = 10.0, interval: float = 0.2) -> bool:
+        """
+        Clash 重启后轮询代理连通性，连通即返回（代替固定等待）
+
+        Args:
+            timeout: 最长等待时间（秒）
+            interval: 轮询间隔（秒）
+
+        Returns:
+            bool: 超时前是否已连通
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            is_connected, _ = self.proxy_manager.test_connectivity(
+                timeout=max(1, int(deadline - time.monotonic()))
+            )
+            if is_connected:
+                return True
+            time.sleep(interval)
+        return False
+
     def get_current_price(self, token_id: str) -> Optional[float]:
         """
         获取 token 的当前价格
@@ -159,33 +497,44 @@ class TradingExecutor:
         Returns:
             float: 当前价格，失败返回 None
         """
+        # 优先使用推送维护的最优卖价；首次查询的 token 订阅推送，本次走 REST
+        if self._price_feed is not None:
+            price = self._price_feed.get(token_id)
+            if price is not None:
+                return price
+            self._price_feed.subscribe((token_id,))
+
+        cached = self._price_cache.get(token_id)
+        if cached is not None and time.monotonic() < cached[1]:
+            return cached[0]
+
         try:
-            if not self._initialized:
-                self.initialize()
+            price = None
 
             # 从订单簿获取最佳价格
             orderbook = self.client.get_order_book(token_id)
 
             # OrderBookSummary 是对象，用属性访问
             if orderbook and hasattr(orderbook, 'asks') and orderbook.asks:
-                best_ask = float(orderbook.asks[0].price)
-                return best_ask
-
-            # 尝试获取最后成交价
-            try:
-                last_trade = self.client.get_last_trade_price(token_id)
-                if last_trade and 'price' in last_trade:
-                    return float(last_trade['price'])
-            except Exception:
-                pass
+                price = float(orderbook.asks[0].price)
+            else:
+                # 尝试获取最后成交价
+                try:
+                    last_trade = self.client.get_last_trade_price(token_id)
+                    if last_trade and 'price' in last_trade:
+                        price = float(last_trade['price'])
+                except Exception:
+                    pass
 
-            return None
+            if price is not None:
+                self._price_cache[token_id] = (price, time.monotonic() + self.PRICE_CACHE_TTL)
+            return price
 
         except Exception as e:
             logger.error(f"Failed to get price for token {token_id}: {e}")
             return None
 
-    def calculate_min_order(self, token_id: str, side: str) -> Tuple[float, float]:
+    def calculate_min_order(self, token_id: str, side: str) -> Tuple[float, float, Optional[float]]:
         """
         计算最小订单数量
 
@@ -198,31 +547,33 @@ class TradingExecutor:
             side: 'buy' 或 'sell'
 
         Returns:
-            Tuple[shares, usd_amount]: 份额和美元金额
+            Tuple[shares, usd_amount, price]: 份额、美元金额和所用价格（获取失败为 None）
         """
         price = self.get_current_price(token_id)
 
         if price is None:
             logger.warning(f"Cannot get price for {token_id}, using min_shares={self.min_shares}")
-            return self.min_shares, 0.0
+            return self.min_shares, 0.0, None
 
         shares = self.min_shares
         usd_amount = shares * price
 
         # 如果金额不足 $1，增加份额
         if usd_amount < self.min_usd:
-            shares = math.ceil(self.min_usd / price)
+            price_units = max(1, round(price * self.PRICE_UNITS))
+            shares = -(-self._min_usd_units // price_units)
             usd_amount = shares * price
 
         logger.info(f"Calculated min order: {shares} shares @ ${price:.4f} = ${usd_amount:.2f}")
-        return shares, usd_amount
+        return shares, usd_amount, price
 
     def execute_copy_trade(
         self,
         token_id: str,
         side: str,
-        original_tx_hash: str = None
-    ) -> Dict[str, Any]:
+        original_tx_hash: str = None,
+        original_trade_id: int = None
+    ) -> CopyOrderResult:
         """
         执行跟单交易
 
@@ -230,41 +581,40 @@ class TradingExecutor:
             token_id: 代币 ID（十六进制或十进制）
             side: 'buy' 或 'sell'
             original_tx_hash: 原始交易哈希（用于记录）
+            original_trade_id: 原始交易在 trades 表中的 id（用于关联）
 
         Returns:
-            dict: 执行结果
+            CopyOrderResult: 执行结果
         """
-        result = {
-            'success': False,
-            'order_id': None,
-            'token_id': token_id,
-            'side': side,
-            'amount': 0,
-            'price': 0,
-            'error': None,
-            'original_tx_hash': original_tx_hash
-        }
-
-        # 重置区域追踪（每次新交易都从头开始尝试）
-        self._regions_tried = set()
+        result = CopyOrderResult(
+            token_id=token_id,
+            side=side,
+            original_tx_hash=original_tx_hash,
+            original_trade_id=original_trade_id
+        )
+
+        # 已尝试区域的位掩码（第 i 位对应 REGIONS[i]；每次新交易从 0 开始，
+        # 局部变量，并发跟单互不影响）
+        regions_tried_mask = 0
+        # 上次退避等待时长（局部变量，每笔交易从最短等待开始）
+        prev_sleep = self.BACKOFF_BASE
+        # 每笔交易最多因区域耗尽重启一次 Clash；耗尽后立即结束，不再等待重试
+        restart_attempted = False
+        exhausted = False
 
         try:
-            # 确保已初始化
-            if not self._initialized:
-                if not self.initialize():
-                    result['error'] = "Failed to initialize client"
-                    self._save_copy_order(result)
-                    return result
+            # 确保已初始化（已初始化时立即返回）
+            if not self.initialize():
+                result.error = "Failed to initialize client"
+                self._save_copy_order(result)
+                return result
 
             # 转换 token_id 格式（如果是十六进制）
-            if token_id.startswith('0x'):
-                token_id_decimal = str(int(token_id, 16))
-            else:
-                token_id_decimal = token_id
+            token_id_decimal = _token_to_decimal(token_id)
 
             # 计算最小订单
-            shares, usd_amount = self.calculate_min_order(token_id_decimal, side)
-            result['amount'] = shares
+            shares, usd_amount, order_price = self.calculate_min_order(token_id_decimal, side)
+            result.amount = shares
 
             # 确定订单方向
             order_side = BUY if side.lower() == 'buy' else SELL
@@ -295,82 +645,87 @@ class TradingExecutor:
                 try:
                     logger.debug(f"[COPY] Attempt {attempt + 1}/{total_attempts} - creating signed order...")
 
-                    # 创建签名订单
-                    signed_order = self.client.create_market_order(order_args)
-                    logger.debug(f"[COPY] Signed order created, posting to CLOB...")
+                    def _submit_order():
+                        # 创建签名订单
+                        signed_order = self.client.create_market_order(order_args)
+                        logger.debug(f"[COPY] Signed order created, posting to CLOB...")
 
-                    # 提交订单 (FOK - Fill or Kill)
-                    response = self.client.post_order(signed_order, OrderType.FOK)
+                        # 提交订单 (FOK - Fill or Kill)
+                        return self.client.post_order(signed_order, OrderType.FOK)
+
+                    response = self._call_with_breaker(self._current_region(), _submit_order)
 
                     if response:
-                        result['success'] = True
-                        result['order_id'] = response.get('orderID') or response.get('id')
-                        result['price'] = self.get_current_price(token_id_decimal) or 0
+                        result.success = True
+                        result.order_id = response.get('orderID') or response.get('id')
+                        # 复用下单前查到的价格，不再额外请求订单簿
+                        if order_price is not None:
+                            result.price = order_price
+                        else:
+                            result.price = self.get_current_price(token_id_decimal) or 0
+                        # 成交后订单簿已变化，下一笔交易重新获取价格
+                        self._price_cache.pop(token_id_decimal, None)
+
+                        logger.info(f"[COPY] ✅ SUCCESS - Order ID: {result.order_id}")
+                        logger.info(f"[COPY] Filled: {shares} shares @ ${result.price:.4f}")
+                        break
 
-                        logger.info(f"[COPY] ✅ SUCCESS - Order ID: {result['order_id']}")
-                        logger.info(f"[COPY] Filled: {shares} shares @ ${result['price']:.4f}")
+                except CircuitOpenError as e:
+                    # 熔断中的区域不发请求，直接换到未熔断的区域（无需等待）
+                    last_error = str(e)
+                    logger.warning(f"[COPY] ⛔ {e}, rotating without request...")
+                    success, new_region = self._rotate_region()
+                    if not success:
+                        logger.error("[COPY] No region with a closed circuit is reachable!")
+                        break
+                    if not self._swap_proxy():
+                        logger.error("[COPY] Failed to reinitialize after region switch")
                         break
+                    continue
 
                 except Exception as e:
                     last_error = str(e)
-                    error_lower = last_error.lower()
                     logger.warning(f"[COPY] ❌ Attempt {attempt + 1}/{total_attempts} FAILED: {e}")
 
-                    # 检查是否是Cloudflare阻止 (403 + HTML响应)
-                    is_cloudflare_block = (
-                        "403" in last_error and
-                        ("cloudflare" in error_lower or
-                         "blocked" in error_lower or
-                         "<!doctype html" in error_lower or
-                         "security service" in error_lower)
-                    )
-
-                    # 检查是否是网络相关错误
-                    network_errors = ["connection", "timeout", "proxy", "refused",
-                                     "network", "unreachable", "ssl", "reset", "request exception"]
-                    is_network_error = any(err in error_lower for err in network_errors)
+                    is_cloudflare_block, is_network_error = self._classify_error(last_error)
 
                     # Cloudflare阻止需要立即轮换，不需要测试连通性
                     if is_cloudflare_block and self.use_proxy and self.proxy_manager:
                         logger.warning(f"[COPY] 🚫 Cloudflare blocking detected! Current region may be banned for POST requests")
 
-                        # 检查是否已经尝试了所有区域
-                        regions_tried = getattr(self, '_regions_tried', set())
-                        current_region = self.proxy_manager.get_current_proxy()
-                        if current_region:
-                            regions_tried.add(current_region)
-                        self._regions_tried = regions_tried
+                        # 记录当前区域已被阻止
+                        current_region = self.proxy_manager.current_region
+                        regions_tried_mask |= 1 << ClashProxyManager.REGION_INDEX[current_region]
 
-                        if len(regions_tried) >= len(ClashProxyManager.REGIONS):
-                            logger.warning(f"[COPY] All {len(regions_tried)} regions tried and blocked by Cloudflare!")
+                        # 还有未尝试的区域：只轮换到这些区域
+                        if regions_tried_mask != self._all_regions_mask:
+                            logger.info("[COPY] Rotating to next untried region...")
+                            success, new_region = self._rotate_region(skip_mask=regions_tried_mask)
+
+                            if success:
+                                logger.info(f"[COPY] Switched to {new_region}, waiting 5s before retry...")
+                                time.sleep(5)  # 等待让 Cloudflare 刷新 IP 信誉
+                                if not self._swap_proxy():
+                                    logger.error("[COPY] Failed to reinitialize after region switch")
+                                    break
+                                continue
+                            logger.warning("[COPY] No untried region is reachable!")
+
+                        # 所有区域都已尝试（或剩余区域不可达）：重启 Clash 换 IP，每笔交易只重启一次
+                        if not restart_attempted:
+                            restart_attempted = True
+                            logger.warning("[COPY] All regions tried and blocked by Cloudflare!")
                             logger.info("[COPY] Attempting Clash restart to get new IPs...")
-                            if self.proxy_manager.restart_clash():
-                                self._regions_tried = set()  # 重置尝试记录
-                                logger.info("[COPY] Clash restarted, waiting 10s for IP refresh...")
-                                time.sleep(10)
-                                self.proxy_manager.set_env_proxy()
-                                self._initialized = False
-                                if self.initialize():
+                            if self._restart_clash():
+                                regions_tried_mask = 0  # 重置尝试记录
+                                logger.info("[COPY] Clash restarted, waiting for connectivity...")
+                                self._wait_until_connected()
+                                if self._swap_proxy():
                                     continue
-                            logger.error("[COPY] All proxy regions exhausted after restart!")
-                            break
-
-                        logger.info("[COPY] Rotating to next region...")
-                        success, new_region = self.proxy_manager.rotate_region()
-
-                        if success:
-                            logger.info(f"[COPY] Switched to {new_region}, waiting 5s before retry...")
-                            time.sleep(5)  # 等待让 Cloudflare 刷新 IP 信誉
-                            self.proxy_manager.set_env_proxy()
-                            # 重新初始化client以使用新代理
-                            self._initialized = False
-                            if not self.initialize():
-                                logger.error("[COPY] Failed to reinitialize after region switch")
-                                break
-                            continue
-                        else:
-                            logger.error("[COPY] Region rotation failed!")
-                            break
+
+                        logger.error("[COPY] All proxy regions exhausted, giving up without further retries")
+                        exhausted = True
+                        break
 
                     elif is_network_error and self.use_proxy and self.proxy_manager:
                         logger.info(f"[COPY] Network error detected, testing proxy connectivity...")
@@ -380,21 +735,18 @@ class TradingExecutor:
                         if not is_connected:
                             logger.warning(f"[COPY] Proxy connectivity lost: {conn_error}")
                             logger.info("[COPY] Rotating to next region...")
-                            success, new_region = self.proxy_manager.rotate_region()
+                            success, new_region = self._rotate_region()
 
                             if success:
                                 logger.info(f"[COPY] Switched to {new_region}, retrying...")
-                                self.proxy_manager.set_env_proxy()
+                                self._swap_proxy()
                                 continue
                             else:
                                 # 所有区域都失败，尝试重启 Clash
                                 logger.warning("[COPY] All proxy regions exhausted! Attempting Clash restart...")
-                                if self.proxy_manager.restart_clash():
+                                if self._restart_clash():
                                     logger.info("[COPY] Clash restarted successfully, retrying...")
-                                    self.proxy_manager.set_env_proxy()
-                                    # 重新初始化 client
-                                    self._initialized = False
-                                    if self.initialize():
+                                    if self._swap_proxy():
                                         continue
                                 logger.error("[COPY] Clash restart failed, giving up")
                                 break
@@ -403,22 +755,22 @@ class TradingExecutor:
                             # 如果连续多次 "connected but error"，可能 Clash 状态异常
                             if attempt > 0 and (attempt + 1) % 4 == 0:
                                 logger.warning("[COPY] Multiple API errors with proxy connected, trying Clash restart...")
-                                if self.proxy_manager.restart_clash():
+                                if self._restart_clash():
                                     logger.info("[COPY] Clash restarted, retrying...")
-                                    self.proxy_manager.set_env_proxy()
-                                    self._initialized = False
-                                    self.initialize()
+                                    self._swap_proxy()
 
                     if attempt < total_attempts - 1:
-                        logger.debug(f"[COPY] Waiting {self.retry_delay}s before next attempt...")
-                        time.sleep(self.retry_delay)
+                        prev_sleep = self._backoff(prev_sleep)
 
-            if not result['success']:
-                result['error'] = last_error or "Order execution failed"
-                logger.error(f"[COPY] ❌ FINAL FAILURE after {total_attempts} attempts: {result['error']}")
+            if not result.success:
+                if exhausted:
+                    result.error = "all_regions_exhausted"
+                else:
+                    result.error = last_error or "Order execution failed"
+                logger.error(f"[COPY] ❌ FINAL FAILURE after {total_attempts} attempts: {result.error}")
 
         except Exception as e:
-            result['error'] = str(e)
+            result.error = str(e)
             logger.error(f"[COPY] ❌ Copy trade exception: {e}")
 
         # 保存跟单记录
@@ -426,38 +778,81 @@ class TradingExecutor:
 
         return result
 
-    def _save_copy_order(self, result: Dict[str, Any]):
-        """保存跟单订单到数据库"""
-        if self.database is None:
+    def execute_copy_trades_batch(self, trades: List[Dict[str, Any]]) -> List[CopyOrderResult]:
+        """
+        并发执行多笔跟单交易
+
+        每笔交易的耗时主要是经代理的网络往返，并发执行后总耗时约等于最慢的一笔
+
+        Args:
+            trades: 每项包含 execute_copy_trade 的参数
+                    (token_id, side, 可选 original_tx_hash / original_trade_id)
+
+        Returns:
+            List[CopyOrderResult]: 与 trades 顺序一致的执行结果
+        """
+        if len(trades) == 1:
+            return [self.execute_copy_trade(**trades[0])]
+
+        futures = [self._executor.submit(self.execute_copy_trade, **trade) for trade in trades]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """关闭批量跟单线程池（等待进行中的跟单完成）、行情推送，并写完排队中的跟单记录"""
+        self._executor.shutdown(wait=True)
+
+        if self._price_feed is not None:
+            self._price_feed.close()
+
+        if self._db_thread is not None and self._db_thread.is_alive():
+            self._db_queue.put(_DB_STOP)
+            self._db_thread.join(timeout=5)
+        self._db_thread = None
+
+    def _save_copy_order(self, result: CopyOrderResult):
+        """保存跟单订单到数据库（交给后台写库线程）"""
+        if self._db_queue is None:
             return
 
-        try:
-            status = 'success' if result['success'] else 'failed'
-
-            self.database.save_copy_order(
-                original_tx_hash=result.get('original_tx_hash'),
-                token_id=result['token_id'],
-                side=result['side'],
-                amount=result['amount'],
-                price=result.get('price', 0),
-                order_id=result.get('order_id'),
-                status=status,
-                error_message=result.get('error')
-            )
+        self._db_queue.put({
+            'original_tx_hash': result.original_tx_hash,
+            'token_id': result.token_id,
+            'side': result.side,
+            'amount': result.amount,
+            'price': result.price,
+            'order_id': result.order_id,
+            'status': 'success' if result.success else 'failed',
+            'error_message': result.error,
+            'original_trade_id': result.original_trade_id,
+        })
+
+    def _db_writer(self):
+        """后台循环：取出排队的跟单记录，每批最多 DB_BATCH_SIZE 条，一次事务写入"""
+        db_queue = self._db_queue
+        stop = False
+        while not stop:
+            item = db_queue.get()
+            if item is _DB_STOP:
+                break
+
+            batch = [item]
+            while len(batch) < self.DB_BATCH_SIZE:
+                try:
+                    item = db_queue.get(timeout=self.DB_BATCH_WAIT)
+                except queue.Empty:
+                    break
+                if item is _DB_STOP:
+                    stop = True
+                    break
+                batch.append(item)
 
-        except Exception as e:
-            logger.error(f"Failed to save copy order: {e}")
+            try:
+                self.database.save_copy_orders_batch(batch)
+            except Exception as e:
+                logger.error(f"Failed to save copy orders: {e}")
 
     def get_balance(self) -> Optional[float]:
         """获取 USDC 余额"""
-        try:
-            if not self._initialized:
-                self.initialize()
-
-            # py-clob-client 可能没有直接获取余额的方法
-            # 这里返回 None，实际使用时需要通过 web3 查询
-            return None
-
-        except Exception as e:
-            logger.error(f"Failed to get balance: {e}")
-            return None
+        # py-clob-client 可能没有直接获取余额的方法
+        # 这里返回 None，实际使用时需要通过 web3 查询
+        return None
@@ -0,0 +1,63 @@
+"""
+Constant-memory Bloom filter for deduplicating transaction hashes
+"""
+import hashlib
+import math
+
+
+class RotatingBloomFilter:
+    """
+    Pair of Bloom filters holding roughly the last 2 * capacity items
+
+    New items go into the active filter; once it holds `capacity` items it
+    becomes the inactive one and a fresh active filter is started, so memory
+    stays fixed while recent items are always remembered. Membership tests may
+    return false positives (about 2 * error_rate) but never false negatives.
+    """
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 1e-6):
+        """
+        Initialize the filter pair
+
+        Args:
+            capacity: Items per filter before rotating
+            error_rate: Target false positive rate of a single full filter
+        """
+        self.capacity = capacity
+        # Optimal size m = -n*ln(p)/ln(2)^2 bits and k = m/n*ln(2) hash functions
+        self.num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._active = bytearray((self.num_bits + 7) // 8)
+        self._inactive = bytearray(len(self._active))
+        self._count = 0
+
+    def _positions(self, item: bytes):
+        """Bit positions for an item (double hashing over one BLAKE2b digest)"""
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item: bytes):
+        """
+        Add an item, rotating the filters when the active one is full
+
+        Args:
+            item: Raw bytes to remember (e.g. a 32-byte tx hash)
+        """
+        active = self._active
+        for pos in self._positions(item):
+            active[pos >> 3] |= 1 << (pos & 7)
+
+        self._count += 1
+        if self._count >= self.capacity:
+            self._inactive = self._active
+            self._active = bytearray(len(self._inactive))
+            self._count = 0
+
+    def __contains__(self, item: bytes) -> bool:
+        positions = self._positions(item)
+        return any(
+            all(bits[pos >> 3] & (1 << (pos & 7)) for pos in positions)
+            for bits in (self._active, self._inactive)
+        )
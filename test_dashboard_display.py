@@ -3,6 +3,8 @@
 Test dashboard display improvements
 """
 import sys
+import time
+from bisect import bisect_right
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
@@ -11,6 +13,11 @@ from database import DatabaseManager
 from metadata_manager import MetadataManager
 from gamma_client import GammaClient
 
+# Capture delay (seconds) below each threshold -> emoji; missing delays and
+# anything past the last threshold get the final one
+_DELAY_THRESH = [60, 300, 3600]
+_DELAY_EMOJI = ['⚡', '⏱️', '⚠️', '⏰']
+
 # Initialize
 db_manager = DatabaseManager('data/trades.db', 'data/trades.csv', auto_export=False)
 gamma_client = GammaClient(timeout=30)
@@ -21,26 +28,14 @@ print("📋 RECENT TRADES TEST (Improved Display)")
 print("=" * 100)
 
 # Get recent trades
-import sqlite3
-conn = sqlite3.connect('data/trades.db')
-conn.row_factory = sqlite3.Row
-cursor = conn.cursor()
-
-cursor.execute("""
-    SELECT tx_hash, timestamp, from_address, token_id, amount, price, side, capture_delay_seconds
-    FROM trades
-    ORDER BY timestamp DESC
-    LIMIT 5
-""")
+trades = db_manager.get_recent_trades(5)
 
-trades = [dict(row) for row in cursor.fetchall()]
-conn.close()
-
-from datetime import datetime
+# One batched metadata query for all displayed tokens
+markets = metadata_manager.get_markets_for_tokens([t['token_id'] for t in trades])
 
 for trade in trades:
     token_id = trade['token_id']
-    market_info = metadata_manager.get_market_for_token(token_id) if token_id else None
+    market_info = markets.get(token_id) if token_id else None
 
     # Show full question (up to 80 chars) with ellipsis if needed
     if market_info:
@@ -51,11 +46,10 @@ for trade in trades:
 
     outcome = market_info.get('outcome_name', 'N/A') if market_info else 'N/A'
 
-    delay_emoji = "⚡" if trade['capture_delay_seconds'] and trade['capture_delay_seconds'] < 60 else \
-                 "⏱️" if trade['capture_delay_seconds'] and trade['capture_delay_seconds'] < 300 else \
-                 "⚠️" if trade['capture_delay_seconds'] and trade['capture_delay_seconds'] < 3600 else "⏰"
+    delay = trade['capture_delay_seconds']
+    delay_emoji = _DELAY_EMOJI[bisect_right(_DELAY_THRESH, delay) if delay else -1]
 
-    timestamp = datetime.fromtimestamp(trade['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+    timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(trade['timestamp']))
 
     print(f"{delay_emoji} {timestamp} | {trade['side'].upper():4} | "
           f"{trade['amount']:>10} @ ${trade['price']:<6} | {outcome:8}")
@@ -69,9 +63,12 @@ print("=" * 100)
 positions = db_manager.get_active_positions()
 incomplete_count = 0
 
-for pos in positions[:3]:  # Show first 3
+shown_positions = positions[:3]  # Show first 3
+markets = metadata_manager.get_markets_for_tokens([p['token_id'] for p in shown_positions])
+
+for pos in shown_positions:
     token_id = pos['token_id']
-    market_info = metadata_manager.get_market_for_token(token_id) if token_id else None
+    market_info = markets.get(token_id) if token_id else None
 
     if market_info:
         question = market_info.get('question', 'N/A')
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Test EventDecoder's direct OrderFilled decoding against web3's ABI decoding
+
+Fetches real OrderFilled logs (buy, sell and swap fills) and checks that
+decode_order_filled / decode_trade_events produce the same side, token_id,
+amount, price, maker and taker as contract.events.OrderFilled().process_log
+followed by the original float-based trade formatting.
+"""
+import sys
+import sqlite3
+import logging
+import argparse
+import yaml
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from rpc_manager import RPCManager
+from monitor import PolymarketMonitor
+from monitor_events import EventDecoder, USDC_DECIMALS, OUTCOME_TOKEN_DECIMALS
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s | %(levelname)-8s | %(name)-20s | %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+COMPARED_FIELDS = ('side', 'token_id', 'amount', 'price', 'maker', 'taker')
+SIDES = ('buy', 'sell', 'swap')
+
+
+def reference_trade_data(decoder: EventDecoder, log) -> dict:
+    """
+    Decode a log the original way: ABI process_log plus float formatting
+
+    Args:
+        decoder: EventDecoder whose contract carries the OrderFilled ABI
+        log: OrderFilled event log
+
+    Returns:
+        Dictionary with the compared trade fields
+    """
+    args = decoder.contract.events.OrderFilled().process_log(log)['args']
+    maker_amount_raw = args['makerAmountFilled']
+    taker_amount_raw = args['takerAmountFilled']
+    maker_asset_id = args['makerAssetId']
+    taker_asset_id = args['takerAssetId']
+
+    price = None
+    if maker_asset_id == 0:
+        side = 'sell'
+        token_id = taker_asset_id
+        usdc_amount = maker_amount_raw / (10 ** USDC_DECIMALS)
+        amount_tokens = taker_amount_raw / (10 ** OUTCOME_TOKEN_DECIMALS)
+        if amount_tokens > 0:
+            price = usdc_amount / amount_tokens
+    elif taker_asset_id == 0:
+        side = 'buy'
+        token_id = maker_asset_id
+        usdc_amount = taker_amount_raw / (10 ** USDC_DECIMALS)
+        amount_tokens = maker_amount_raw / (10 ** OUTCOME_TOKEN_DECIMALS)
+        if amount_tokens > 0:
+            price = usdc_amount / amount_tokens
+    else:
+        side = 'swap'
+        token_id = maker_asset_id
+        amount_tokens = maker_amount_raw / (10 ** OUTCOME_TOKEN_DECIMALS)
+
+    return {
+        'side': side,
+        'token_id': hex(token_id) if token_id else None,
+        'amount': f"{amount_tokens:.6f}" if amount_tokens else "0",
+        'price': f"{price:.6f}" if price else None,
+        'maker': args['maker'].lower(),
+        'taker': args['taker'].lower(),
+    }
+
+
+def compare(label: str, expected: dict, actual: dict) -> bool:
+    """
+    Compare the checked fields of two decodings and report mismatches
+
+    Args:
+        label: Log identifier for the report
+        expected: Reference decoding
+        actual: EventDecoder decoding
+
+    Returns:
+        bool: True if every compared field matches
+    """
+    mismatches = [f for f in COMPARED_FIELDS if expected.get(f) != actual.get(f)]
+    if mismatches:
+        for field in mismatches:
+            print(f"   ❌ {label} {field}: expected {expected.get(field)!r}, got {actual.get(field)!r}")
+        return False
+    print(f"   ✓ {label} {expected['side']:<4} {expected['amount']} @ {expected['price']}")
+    return True
+
+
+def collect_logs(rpc_manager: RPCManager, per_side: int, range_blocks: int, max_ranges: int) -> dict:
+    """
+    Walk back from the latest block collecting OrderFilled logs of each side
+
+    Args:
+        rpc_manager: RPC manager
+        per_side: Logs wanted per side
+        range_blocks: Blocks per eth_getLogs query
+        max_ranges: Maximum number of queries
+
+    Returns:
+        Dict of side -> list of logs
+    """
+    found = {side: [] for side in SIDES}
+    to_block = rpc_manager.get_latest_block()
+
+    for _ in range(max_ranges):
+        from_block = to_block - range_blocks + 1
+        logs = rpc_manager.get_logs({
+            'address': PolymarketMonitor.POLYMARKET_CONTRACTS,
+            'topics': [PolymarketMonitor.ORDER_FILLED_SIGNATURE],
+            'fromBlock': from_block,
+            'toBlock': to_block
+        })
+
+        for log in logs:
+            data = bytes(log['data'])
+            maker_asset_id = int.from_bytes(data[0:32], 'big')
+            taker_asset_id = int.from_bytes(data[32:64], 'big')
+            side = 'sell' if maker_asset_id == 0 else 'buy' if taker_asset_id == 0 else 'swap'
+            if len(found[side]) < per_side:
+                found[side].append(log)
+
+        if all(len(found[side]) >= per_side for side in SIDES):
+            break
+        to_block = from_block - 1
+
+    return found
+
+
+def stored_tx_hashes(db_path: str) -> list:
+    """
+    Pick one stored buy and one stored sell transaction for the receipt path
+
+    Args:
+        db_path: Path to the trades database
+
+    Returns:
+        List of 0x-prefixed transaction hashes
+    """
+    if not Path(db_path).exists():
+        return []
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("""
+            SELECT MIN(tx_hash) FROM trades WHERE side IN ('buy', 'sell') GROUP BY side
+        """).fetchall()
+    finally:
+        conn.close()
+    return [h if h.startswith('0x') else '0x' + h for (h,) in rows if h]
+
+
+def main():
+    """Test OrderFilled decoding"""
+    parser = argparse.ArgumentParser(description='Compare direct OrderFilled decoding with web3 ABI decoding')
+    parser.add_argument('--per-side', type=int, default=3, help='Logs to check per side (buy/sell/swap)')
+    parser.add_argument('--range-blocks', type=int, default=50, help='Blocks per eth_getLogs query')
+    parser.add_argument('--max-ranges', type=int, default=200, help='Maximum eth_getLogs queries')
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("TESTING ORDERFILLED DECODING")
+    print("=" * 80)
+
+    # Load config
+    with open('config.yaml', 'r') as f:
+        config = yaml.safe_load(f)
+
+    rpc_manager = RPCManager(
+        rpc_endpoints=config['rpc_endpoints'],
+        max_retry=config['monitoring'].get('max_retry', 3),
+        retry_delay=config['monitoring'].get('retry_delay', 5)
+    )
+    decoder = EventDecoder(rpc_manager.w3, PolymarketMonitor.POLYMARKET_CONTRACTS[1])
+
+    ok = True
+
+    # 1. eth_getLogs path (decode_order_filled)
+    print("\n1. Logs from eth_getLogs (decode_order_filled)")
+    found = collect_logs(rpc_manager, args.per_side, args.range_blocks, args.max_ranges)
+    for side in SIDES:
+        if not found[side]:
+            print(f"   ❌ No {side} fill found in the scanned blocks")
+            ok = False
+        for log in found[side]:
+            label = f"{log['transactionHash'].hex()[:12]}.../{log['logIndex']}"
+            ok &= compare(label, reference_trade_data(decoder, log), decoder.decode_order_filled(log))
+
+    # 2. Receipt path (decode_trade_events) for stored trades
+    print("\n2. Receipts of stored trades (decode_trade_events)")
+    for tx_hash in stored_tx_hashes(config['database']['path']):
+        receipt = rpc_manager.get_transaction_receipt(tx_hash)
+        expected = [
+            reference_trade_data(decoder, log) for log in receipt['logs']
+            if log['address'] in (decoder.neg_risk_checksum, decoder.neg_risk_exchange)
+            and log['topics'] and bytes(log['topics'][0]) == decoder.order_filled_topic
+        ]
+        actual = decoder.decode_trade_events(receipt)
+        if len(expected) != len(actual):
+            print(f"   ❌ {tx_hash[:12]}...: expected {len(expected)} fills, got {len(actual)}")
+            ok = False
+            continue
+        for i, (exp, act) in enumerate(zip(expected, actual)):
+            ok &= compare(f"{tx_hash[:12]}.../{i}", exp, act)
+
+    print("\n" + "=" * 80)
+    if ok:
+        print("✓ Direct decoding matches web3 ABI decoding")
+    else:
+        print("❌ Decoding mismatches found")
+    print("=" * 80)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
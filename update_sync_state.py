@@ -1,56 +1,31 @@
-"""Update sync state based on current trades"""
-import sqlite3
-from datetime import datetime, timezone
+"""Update the monitor checkpoint based on current trades"""
+import sys
+from pathlib import Path
 
-db_path = 'data/trades.db'
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
-
-# Create sync_state table if it doesn't exist
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS sync_state (
-        id INTEGER PRIMARY KEY,
-        last_block_processed INTEGER,
-        last_update_time INTEGER,
-        monitor_instance TEXT,
-        updated_at TEXT
-    )
-""")
-
-# Insert initial row if table is empty
-cursor.execute("SELECT COUNT(*) FROM sync_state")
-if cursor.fetchone()[0] == 0:
-    cursor.execute("""
-        INSERT INTO sync_state (id, last_block_processed, last_update_time, monitor_instance, updated_at)
-        VALUES (1, 0, 0, 'init', '')
-    """)
-    conn.commit()
-
-# Get the highest block number from trades
-cursor.execute("SELECT MAX(block_number) FROM trades")
-max_block = cursor.fetchone()[0]
+# Add src directory to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
-if max_block:
-    now = datetime.now(timezone.utc)
-    cursor.execute("""
-        UPDATE sync_state
-        SET last_block_processed = ?,
-            last_update_time = ?,
-            monitor_instance = 'manual_update',
-            updated_at = ?
-        WHERE id = 1
-    """, (max_block, int(now.timestamp()), now.isoformat()))
+from database import DatabaseManager
 
-    conn.commit()
-    print(f"✓ Updated sync state to block {max_block:,}")
-
-    cursor.execute("SELECT * FROM sync_state")
-    row = cursor.fetchone()
-    print(f"\nCurrent sync state:")
-    print(f"  Last block processed: {row[1]:,}")
-    print(f"  Last update: {datetime.fromtimestamp(row[2])}")
-    print(f"  Instance: {row[3]}")
-else:
-    print("No trades found in database")
-
-conn.close()
+db_path = 'data/trades.db'
+# Same checkpoint the monitor resumes from (monitor_checkpoints table)
+db_manager = DatabaseManager(db_path, 'data/trades.csv', auto_export=False)
+
+try:
+    # Get the highest block number from trades
+    max_block = db_manager.get_latest_block()
+    previous = db_manager.get_monitor_checkpoint()
+
+    if not max_block:
+        print("No trades found in database")
+    elif db_manager.set_monitor_checkpoint(max_block):
+        print(f"✓ Updated monitor checkpoint to block {max_block:,}")
+
+        print(f"\nCurrent sync state:")
+        print(f"  Last block processed: {db_manager.get_monitor_checkpoint():,}")
+        print(f"  Previous checkpoint:  {f'{previous:,}' if previous is not None else 'none'}")
+    else:
+        print("Failed to update monitor checkpoint")
+        sys.exit(1)
+finally:
+    db_manager.close()